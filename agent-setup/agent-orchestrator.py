@@ -6,13 +6,22 @@ Manages multiple AI agents working with ERPNext backend
 import requests
 import json
 import time
-from typing import Dict, List, Optional
+import asyncio
+from typing import Any, Dict, Iterator, List, Optional
 from dataclasses import dataclass
 from datetime import datetime
 import threading
-from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty
 import logging
 
+from task_queue import PriorityTaskQueue
+from async_erpnext_client import as_async_client, DEFAULT_PAGE_SIZE, DEFAULT_ORDER_BY
+from erpnext_cache import ERPNextResponseCache, get_erpnext_cache, MISS
+from erpnext_batch import ERPNextBatchWriter, INSERT_MANY_LIMIT, BULK_UPDATE_LIMIT, VALIDATION_STATUS_CODES
+from single_flight import get_erpnext_single_flight
+from circuit_breaker import get_circuit_breaker
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -36,77 +45,300 @@ class ERPNextTask:
     action: str
     resource_type: str
     payload: Dict
-    priority: int = 5
+    priority: int = 5  # Higher runs first
     status: str = "pending"
     created_at: datetime = None
+    deadline: Optional[datetime] = None  # Dropped as "expired" if still queued after this
 
 
 class ERPNextClient:
     """Client for interacting with ERPNext API"""
 
-    def __init__(self, base_url: str, api_key: str, api_secret: str):
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        api_secret: str,
+        timeout: float = 30.0,
+        tenant_id: Optional[str] = None,
+        cache: Optional[ERPNextResponseCache] = None,
+        use_cache: bool = True
+    ):
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
         self.api_secret = api_secret
+        self.timeout = timeout
         self.session = requests.Session()
         self.session.headers.update({
             'Authorization': f'token {api_key}:{api_secret}',
             'Content-Type': 'application/json'
         })
+        # GETs are cached per tenant (per site and key without one) and
+        # invalidated by this client's writes and by ERPNext webhooks
+        self.tenant_id = tenant_id
+        self.cache_scope = tenant_id or f"{self.base_url}|{api_key}"
+        self.cache = (cache or get_erpnext_cache()) if use_cache else None
+        self._batch_writer: Optional[ERPNextBatchWriter] = None
+        # Shared by every client of the same ERPNext site
+        self.breaker = get_circuit_breaker(self.base_url)
+        self._batch_writer_lock = threading.Lock()
+
+    def get(
+        self,
+        resource_type: str,
+        filters: Optional[Dict] = None,
+        fields: Optional[List] = None,
+        use_cache: bool = True
+    ):
+        """GET resource from ERPNext (read-through cached)"""
+        key = ERPNextResponseCache.make_key(self.cache_scope, resource_type, filters, fields)
+        if not self.cache:
+            # Without a cache there are no write generations, so reads aren't shared
+            return self._get(resource_type, filters, fields)[0]
+        if not use_cache:
+            token = self.cache.begin_load(self.cache_scope, resource_type)
+            return self._get_shared(key, token, resource_type, filters, fields)[0]
+
+        value, refresh = self.cache.lookup(key)
+        if value is not MISS:
+            if refresh:
+                token = self.cache.begin_load(self.cache_scope, resource_type)
+                self.cache.refresh_in_background(
+                    key, lambda: self._get_shared(key, token, resource_type, filters, fields)
+                )
+            return value
+
+        token = self.cache.begin_load(self.cache_scope, resource_type)
+        value, size = self._get_shared(key, token, resource_type, filters, fields)
+        self.cache.put(key, value, size, token)
+        return value
+
+    def _get_shared(self, key: tuple, token: int, resource_type: str, filters: Optional[Dict], fields: Optional[List]):
+        """GET from ERPNext, sharing the request with identical concurrent GETs
 
-    def get(self, resource_type: str, filters: Optional[Dict] = None, fields: Optional[List] = None):
-        """GET resource from ERPNext"""
+        The cache generation is part of the key, so a read issued after a
+        write never joins a request that started before it.
+        """
+        return get_erpnext_single_flight().do((key, token), lambda: self._get(resource_type, filters, fields))
+
+    def _get(self, resource_type: str, filters: Optional[Dict], fields: Optional[List], params: Optional[Dict] = None):
+        """GET from ERPNext, returns (response, size in bytes)"""
         url = f"{self.base_url}/api/resource/{resource_type}"
-        params = {}
+        params = dict(params or {})
         if filters:
             params['filters'] = json.dumps(filters)
         if fields:
             params['fields'] = json.dumps(fields)
 
-        response = self.session.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
+        response = self._request("GET", url, params=params)
+        return response.json(), len(response.content)
+
+    def get_page(
+        self,
+        resource_type: str,
+        filters: Optional[Dict] = None,
+        fields: Optional[List] = None,
+        start: int = 0,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        order_by: str = DEFAULT_ORDER_BY
+    ) -> List[Dict]:
+        """GET one page of a list (not cached)"""
+        params = {"limit_start": start, "limit_page_length": page_size, "order_by": order_by}
+        return self._get(resource_type, filters, fields, params)[0].get("data", [])
+
+    def iter_resource(
+        self,
+        resource_type: str,
+        filters: Optional[Dict] = None,
+        fields: Optional[List] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        order_by: str = DEFAULT_ORDER_BY,
+        prefetch: bool = True
+    ) -> Iterator[Dict]:
+        """Yield every matching record, one page in memory at a time
+
+        Unlike get(), results aren't truncated at Frappe's default page
+        length. While the caller works through a page the next one is
+        fetched in the background. order_by should be unique (the default
+        is the document name) so pages don't overlap or skip records.
+        """
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="erpnext-prefetch") if prefetch else None
+        try:
+            start = 0
+            page = self.get_page(resource_type, filters, fields, start, page_size, order_by)
+            while page:
+                more = len(page) >= page_size
+                next_page = None
+                if more and executor:
+                    next_page = executor.submit(
+                        self.get_page, resource_type, filters, fields, start + page_size, page_size, order_by
+                    )
+
+                yield from page
+                if not more:
+                    return
+
+                start += page_size
+                if next_page:
+                    page = next_page.result()
+                else:
+                    page = self.get_page(resource_type, filters, fields, start, page_size, order_by)
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
 
     def post(self, resource_type: str, data: Dict):
         """POST (create) resource in ERPNext"""
         url = f"{self.base_url}/api/resource/{resource_type}"
-        response = self.session.post(url, json=data)
-        response.raise_for_status()
+        try:
+            response = self._request("POST", url, json=data)
+        finally:
+            self.invalidate_cache(resource_type)
         return response.json()
 
     def put(self, resource_type: str, name: str, data: Dict):
         """PUT (update) resource in ERPNext"""
         url = f"{self.base_url}/api/resource/{resource_type}/{name}"
-        response = self.session.put(url, json=data)
-        response.raise_for_status()
+        try:
+            response = self._request("PUT", url, json=data)
+        finally:
+            self.invalidate_cache(resource_type)
         return response.json()
 
     def delete(self, resource_type: str, name: str):
         """DELETE resource from ERPNext"""
         url = f"{self.base_url}/api/resource/{resource_type}/{name}"
-        response = self.session.delete(url)
-        response.raise_for_status()
+        try:
+            response = self._request("DELETE", url)
+        finally:
+            self.invalidate_cache(resource_type)
         return response.json()
 
     def execute_method(self, method_path: str, params: Optional[Dict] = None):
         """Execute a Frappe method"""
         url = f"{self.base_url}/api/method/{method_path}"
-        response = self.session.post(url, json=params or {})
-        response.raise_for_status()
+        response = self._request("POST", url, json=params or {})
         return response.json()
 
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request through the site's circuit breaker and bulkhead
+
+        Raises CircuitOpenError while the site is failing and
+        BulkheadFullError when too many calls to it are already in flight,
+        instead of tying up the calling thread.
+        """
+        with self.breaker.call():
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            response.raise_for_status()
+        return response
+
+    def insert_many(self, resource_type: str, docs: List[Dict]) -> List[Dict]:
+        """Create many documents in one call per INSERT_MANY_LIMIT docs
+
+        Returns a result per doc in the order given, {"success": True,
+        "name": ...} or {"success": False, "error": ...}. Frappe inserts a
+        chunk in one transaction, so if ERPNext rejects a chunk as invalid
+        its docs are retried one by one to find out which of them failed. A
+        chunk refused for load (429, 5xx) fails as a whole rather than
+        multiplying calls, as does one answered with a name count that
+        doesn't match its docs, since names can't be paired with docs then.
+        """
+        results = []
+        for i in range(0, len(docs), INSERT_MANY_LIMIT):
+            chunk = [{**doc, "doctype": resource_type} for doc in docs[i:i + INSERT_MANY_LIMIT]]
+            try:
+                response = self.execute_method("frappe.client.insert_many", {"docs": json.dumps(chunk, default=str)})
+                names = response.get("message") or []
+                if len(names) != len(chunk):
+                    error = f"insert_many returned {len(names)} names for {len(chunk)} docs"
+                    logger.error(f"Bulk insert of {resource_type}: {error}")
+                    results.extend({"success": False, "error": error} for _ in chunk)
+                    continue
+                results.extend({"success": True, "name": name} for name in names)
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code not in VALIDATION_STATUS_CODES:
+                    results.extend({"success": False, "error": str(e)} for _ in chunk)
+                    continue
+                logger.warning(f"Bulk insert of {len(chunk)} {resource_type} rejected, inserting one by one: {str(e)}")
+                for doc in chunk:
+                    try:
+                        response = self.post(resource_type, doc)
+                        results.append({"success": True, "name": response.get("data", {}).get("name")})
+                    except Exception as item_error:
+                        results.append({"success": False, "error": str(item_error)})
+            except Exception as e:
+                results.extend({"success": False, "error": str(e)} for _ in chunk)
+            finally:
+                self.invalidate_cache(resource_type)
+        return results
+
+    def bulk_update(self, resource_type: str, docs: List[Dict]) -> List[Dict]:
+        """Update many documents (each with a "docname") in one call per BULK_UPDATE_LIMIT docs
+
+        Returns a result per doc, {"success": True, "name": ...} or
+        {"success": False, "error": ...}.
+        """
+        results = []
+        for i in range(0, len(docs), BULK_UPDATE_LIMIT):
+            chunk = [{**doc, "doctype": resource_type} for doc in docs[i:i + BULK_UPDATE_LIMIT]]
+            try:
+                response = self.execute_method("frappe.client.bulk_update", {"docs": json.dumps(chunk, default=str)})
+                failed = {
+                    item.get("doc", {}).get("docname"): item.get("exc")
+                    for item in (response.get("message") or {}).get("failed_docs", [])
+                }
+                for doc in chunk:
+                    if doc["docname"] in failed:
+                        results.append({"success": False, "name": doc["docname"], "error": failed[doc["docname"]]})
+                    else:
+                        results.append({"success": True, "name": doc["docname"]})
+            except Exception as e:
+                results.extend({"success": False, "name": doc["docname"], "error": str(e)} for doc in chunk)
+            finally:
+                self.invalidate_cache(resource_type)
+        return results
+
+    @property
+    def batch_writer(self) -> ERPNextBatchWriter:
+        """Writer coalescing this client's queued creates and updates into bulk calls"""
+        if self._batch_writer is None:
+            with self._batch_writer_lock:
+                if self._batch_writer is None:
+                    self._batch_writer = ERPNextBatchWriter(self)
+        return self._batch_writer
+
+    def flush_writes(self):
+        """Write any creates and updates still queued on the batch writer"""
+        if self._batch_writer is not None:
+            self._batch_writer.flush()
+
+    def invalidate_cache(self, resource_type: Optional[str] = None):
+        """Drop this client's cached GETs for a doctype (all doctypes if None)"""
+        if self.cache:
+            self.cache.invalidate(self.cache_scope, resource_type)
+
 
 class AgentOrchestrator:
     """Orchestrates multiple agents working with ERPNext"""
 
-    def __init__(self, erpnext_client: ERPNextClient, max_agents: int = 10):
+    def __init__(
+        self,
+        erpnext_client: ERPNextClient,
+        max_agents: int = 10,
+        task_pool: Optional[Any] = None,
+        tenant_id: Optional[str] = None
+    ):
         self.erpnext = erpnext_client
         self.agents: Dict[str, Agent] = {}
-        self.tasks: Queue = Queue()
+        self.tasks = PriorityTaskQueue(on_expire=self._on_task_expired)
         self.active_tasks: Dict[str, ERPNextTask] = {}
         self.max_agents = max_agents
         self.lock = threading.Lock()
         self.running = False
+        # With a shared TaskPool, tasks run on its workers instead of our own threads
+        self.task_pool = task_pool
+        self.tenant_id = tenant_id or "default"
+        self._async_erpnext = None
 
     def register_agent(self, agent: Agent):
         """Register a new agent"""
@@ -124,79 +356,173 @@ class AgentOrchestrator:
                 logger.info(f"Agent {agent_id} unregistered")
 
     def submit_task(self, task: ERPNextTask):
-        """Submit a task for execution"""
+        """Submit a task for execution (returns a Future when using a task pool)"""
         if task.created_at is None:
             task.created_at = datetime.now()
-        self.tasks.put(task)
         logger.info(f"Task {task.task_id} submitted by agent {task.agent_id}")
+        deadline = task.deadline.timestamp() if task.deadline else None
+        if self.task_pool:
+            future = self.task_pool.submit(
+                self.tenant_id, self._run_task, task,
+                priority=task.priority, task_id=task.task_id, deadline=deadline
+            )
+            future.add_done_callback(lambda f: self._on_pool_task_done(task, f))
+            return future
+        self.tasks.put(task, priority=task.priority, task_id=task.task_id, deadline=deadline)
+
+    def cancel_task(self, task_id: str) -> bool:
+        """Cancel a queued task, returns False if it already started or is unknown"""
+        if self.task_pool:
+            cancelled = self.task_pool.cancel(self.tenant_id, task_id)
+        else:
+            task = self.tasks.cancel(task_id)
+            cancelled = task is not None
+            if task:
+                task.status = "cancelled"
+        if cancelled:
+            logger.info(f"Task {task_id} cancelled")
+        return cancelled
+
+    def _on_task_expired(self, task: ERPNextTask):
+        """Queue callback: a task's deadline passed before it ran"""
+        task.status = "expired"
+        logger.warning(f"Task {task.task_id} expired before execution (deadline {task.deadline})")
+
+    def _on_pool_task_done(self, task: ERPNextTask, future):
+        """Record tasks the shared pool dropped without running"""
+        if future.cancelled():
+            task.status = "cancelled"
+        elif isinstance(future.exception(), TimeoutError):
+            self._on_task_expired(task)
+
+    def _run_task(self, task: ERPNextTask) -> Dict:
+        """Execute a task, tracking it as active while it runs"""
+        self.active_tasks[task.task_id] = task
+        try:
+            return self.execute_task(task)
+        finally:
+            self.active_tasks.pop(task.task_id, None)
+
+    def has_pending_work(self) -> bool:
+        """Check whether tasks are queued or running"""
+        if self.active_tasks:
+            return True
+        if self.task_pool:
+            return self.task_pool.pending(self.tenant_id) > 0
+        return not self.tasks.empty()
 
     def execute_task(self, task: ERPNextTask) -> Dict:
         """Execute a task in ERPNext"""
         try:
-            task.status = "executing"
-            agent = self.agents.get(task.agent_id)
-            if not agent:
-                raise ValueError(f"Agent {task.agent_id} not found")
-
-            agent.status = "busy"
-            agent.last_activity = datetime.now()
-
-            result = None
-            if task.action == "get":
-                result = self.erpnext.get(
-                    task.resource_type,
-                    filters=task.payload.get("filters"),
-                    fields=task.payload.get("fields")
-                )
-            elif task.action == "create":
-                result = self.erpnext.post(task.resource_type, task.payload.get("data", {}))
-            elif task.action == "update":
-                result = self.erpnext.put(
-                    task.resource_type,
-                    task.payload.get("name"),
-                    task.payload.get("data", {})
-                )
-            elif task.action == "delete":
-                result = self.erpnext.delete(
-                    task.resource_type,
-                    task.payload.get("name")
-                )
-            elif task.action == "method":
-                result = self.erpnext.execute_method(
-                    task.payload.get("method_path"),
-                    task.payload.get("params")
-                )
-            else:
-                raise ValueError(f"Unknown action: {task.action}")
-
-            task.status = "completed"
-            agent.status = "idle"
-            logger.info(f"Task {task.task_id} completed successfully")
-            return {"success": True, "result": result, "task_id": task.task_id}
+            self._begin_task(task)
+            result = self._call_erpnext(self.erpnext, task)
+            return self._complete_task(task, result)
+        except Exception as e:
+            return self._fail_task(task, e)
 
+    async def execute_task_async(self, task: ERPNextTask) -> Dict:
+        """Execute a task in ERPNext without blocking a thread on the network"""
+        try:
+            self._begin_task(task)
+            result = await self._call_erpnext(self.async_erpnext, task)
+            return self._complete_task(task, result)
         except Exception as e:
-            task.status = "failed"
-            if task.agent_id in self.agents:
-                self.agents[task.agent_id].status = "idle"
-            logger.error(f"Task {task.task_id} failed: {str(e)}")
-            return {"success": False, "error": str(e), "task_id": task.task_id}
+            return self._fail_task(task, e)
+
+    async def execute_tasks_async(self, tasks: List[ERPNextTask], max_concurrency: int = 1000) -> List[Dict]:
+        """Execute many tasks concurrently on the running event loop"""
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(task: ERPNextTask) -> Dict:
+            async with semaphore:
+                return await self.execute_task_async(task)
+
+        # Highest priority first, so they get connections first
+        ordered = sorted(tasks, key=lambda task: -task.priority)
+        results = await asyncio.gather(*[run(task) for task in ordered])
+        by_id = {result["task_id"]: result for result in results}
+        return [by_id[task.task_id] for task in tasks]
+
+    @property
+    def async_erpnext(self):
+        """Async client sharing this orchestrator's ERPNext site and credentials"""
+        if self._async_erpnext is None:
+            self._async_erpnext = as_async_client(self.erpnext)
+        return self._async_erpnext
+
+    def _begin_task(self, task: ERPNextTask):
+        """Mark a task and its agent as busy"""
+        task.status = "executing"
+        agent = self.agents.get(task.agent_id)
+        if not agent:
+            raise ValueError(f"Agent {task.agent_id} not found")
+
+        agent.status = "busy"
+        agent.last_activity = datetime.now()
+
+    def _call_erpnext(self, client, task: ERPNextTask):
+        """Issue a task's ERPNext call (returns an awaitable for async clients)"""
+        if task.action == "get":
+            return client.get(
+                task.resource_type,
+                filters=task.payload.get("filters"),
+                fields=task.payload.get("fields")
+            )
+        elif task.action == "create":
+            return client.post(task.resource_type, task.payload.get("data", {}))
+        elif task.action == "update":
+            return client.put(
+                task.resource_type,
+                task.payload.get("name"),
+                task.payload.get("data", {})
+            )
+        elif task.action == "delete":
+            return client.delete(
+                task.resource_type,
+                task.payload.get("name")
+            )
+        elif task.action == "method":
+            return client.execute_method(
+                task.payload.get("method_path"),
+                task.payload.get("params")
+            )
+        else:
+            raise ValueError(f"Unknown action: {task.action}")
+
+    def _complete_task(self, task: ERPNextTask, result) -> Dict:
+        """Record a successful task"""
+        task.status = "completed"
+        if task.agent_id in self.agents:
+            self.agents[task.agent_id].status = "idle"
+        logger.info(f"Task {task.task_id} completed successfully")
+        return {"success": True, "result": result, "task_id": task.task_id}
+
+    def _fail_task(self, task: ERPNextTask, error: Exception) -> Dict:
+        """Record a failed task"""
+        task.status = "failed"
+        if task.agent_id in self.agents:
+            self.agents[task.agent_id].status = "idle"
+        logger.error(f"Task {task.task_id} failed: {str(error)}")
+        return {"success": False, "error": str(error), "task_id": task.task_id}
 
     def worker_thread(self):
         """Worker thread that processes tasks"""
         while self.running:
             try:
                 task = self.tasks.get(timeout=1)
-                self.active_tasks[task.task_id] = task
-                result = self.execute_task(task)
+                result = self._run_task(task)
                 # Store result or send callback
-                self.active_tasks.pop(task.task_id, None)
-                self.tasks.task_done()
-            except:
+            except Empty:
                 continue
+            except Exception as e:
+                logger.error(f"Error in worker thread: {str(e)}")
 
     def start(self, num_workers: int = 5):
         """Start the orchestrator"""
         self.running = True
+        if self.task_pool:
+            logger.info(f"Orchestrator started on the shared task pool (tenant {self.tenant_id})")
+            return
         for i in range(num_workers):
             thread = threading.Thread(target=self.worker_thread, daemon=True)
             thread.start()
@@ -205,6 +531,10 @@ class AgentOrchestrator:
     def stop(self):
         """Stop the orchestrator"""
         self.running = False
+        if self.task_pool:
+            cancelled = self.task_pool.remove_tenant(self.tenant_id)
+            if cancelled:
+                logger.info(f"Cancelled {cancelled} queued tasks for tenant {self.tenant_id}")
         logger.info("Orchestrator stopped")
 
     def get_agent_status(self, agent_id: str) -> Dict:
@@ -224,6 +554,16 @@ class AgentOrchestrator:
         """Get status of all agents"""
         return [self.get_agent_status(agent_id) for agent_id in self.agents.keys()]
 
+    def get_queue_stats(self) -> Dict:
+        """Get queue depth and wait time per priority band"""
+        if self.task_pool:
+            return self.task_pool.get_tenant_stats(self.tenant_id)
+        return {
+            "queued": self.tasks.qsize(),
+            "running": len(self.active_tasks),
+            "bands": self.tasks.get_stats()
+        }
+
 
 # Example usage
 if __name__ == "__main__":
@@ -6,7 +6,9 @@ Integrated with Unified Orchestrator
 
 from fastapi import FastAPI, Request, HTTPException, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from typing import Optional
+import asyncio
 import logging
 import time
 import os
@@ -17,7 +19,18 @@ from tenant_isolation import TenantIsolation
 from tenant_router import TenantRouter, get_tenant_id
 from usage_tracker import UsageTracker, UsageMetric
 from metrics_collector import MetricsCollector
+from quota_engine import QuotaEngine
+from rate_limiter import RateLimiter, RedisRateLimitBackend
+from subscription_plans import SubscriptionPlanManager
 from unified_orchestrator import UnifiedOrchestrator, UnifiedSystemConfig
+from platform_db import close_all_pools
+from async_db import AsyncFacade, get_db_executor, shutdown_db_executor
+from task_pool import shutdown_task_pool
+from workflow_scheduler import shutdown_workflow_scheduler
+from workflow_runtime import shutdown_workflow_runtime
+from event_bus import EventBus
+from tenant_cache import bind_tenant_cache_to_event_bus
+from erpnext_cache import get_erpnext_cache, bind_erpnext_cache_to_event_bus
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
@@ -32,7 +45,7 @@ app.add_middleware(
     allow_origins=allowed_origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization", "X-Tenant-ID", "X-Requested-With"],
+    allow_headers=["Content-Type", "Authorization", "X-Tenant-ID", "X-API-Key", "X-Requested-With"],
 )
 
 # Initialize managers
@@ -44,9 +57,35 @@ tenant_isolation = TenantIsolation(
     tenant_db_dir=os.getenv("TENANT_DB_DIR", "tenant_databases")
 )
 tenant_router = TenantRouter(tenant_manager, tenant_isolation)
-usage_tracker = UsageTracker(tenant_manager)
+
+# Event bus (Redis when configured) keeps tenant caches coherent across gateway nodes
+event_bus = EventBus(
+    tenant_isolation,
+    redis_host=os.getenv("REDIS_HOST"),
+    redis_port=int(os.getenv("REDIS_PORT", "6379")),
+    redis_password=os.getenv("REDIS_PASSWORD")
+)
+bind_tenant_cache_to_event_bus(tenant_manager.cache, event_bus)
+# ...and applies ERPNext cache invalidations from webhooks received elsewhere
+erpnext_cache = get_erpnext_cache()
+if erpnext_cache:
+    bind_erpnext_cache_to_event_bus(erpnext_cache, event_bus)
+usage_tracker = UsageTracker(tenant_manager, write_behind=True)
+quota_engine = QuotaEngine(tenant_manager, usage_tracker)
+enforce_api_quota = os.getenv("ENFORCE_API_QUOTA", "true").lower() == "true"
+
+# Token buckets per tenant and API key, shared across nodes when Redis is configured
+rate_limiter = RateLimiter(
+    SubscriptionPlanManager(),
+    backend=RedisRateLimitBackend(event_bus.redis_client) if event_bus.redis_client else None
+)
 metrics_collector = MetricsCollector(tenant_isolation)
 
+# Blocking sqlite calls run on a bounded thread pool, never on the event loop
+db_executor = get_db_executor()
+async_tenant_manager = AsyncFacade(tenant_manager, db_executor)
+async_usage_tracker = AsyncFacade(usage_tracker, db_executor)
+
 # Initialize unified orchestrator
 unified_config = UnifiedSystemConfig(
     platform_db_path=os.getenv("PLATFORM_DB_PATH", "platform.db"),
@@ -65,16 +104,22 @@ unified_config = UnifiedSystemConfig(
     enable_email_processing=True,
     enable_employee_agents=True,
     enable_ksa_localization=True,
-    enable_monitoring=True
+    enable_monitoring=True,
+    max_active_tenants=int(os.getenv("MAX_ACTIVE_TENANTS", "100")),
+    tenant_idle_timeout=int(os.getenv("TENANT_IDLE_TIMEOUT", "900"))
 )
 
 unified_orchestrator = UnifiedOrchestrator(unified_config)
+# Tenant orchestrators are activated on demand, including by their events
+unified_orchestrator.bind_event_bus(event_bus)
 
 # Start unified orchestrator on startup
 @app.on_event("startup")
 async def startup_event():
     """Start unified orchestrator on API gateway startup"""
     logger.info("Starting unified orchestrator...")
+    event_bus.start()
+    quota_engine.start()
     unified_orchestrator.start()
     logger.info("Unified orchestrator started")
 
@@ -83,28 +128,79 @@ async def shutdown_event():
     """Stop unified orchestrator on API gateway shutdown"""
     logger.info("Stopping unified orchestrator...")
     unified_orchestrator.stop()
+    event_bus.stop()
+    quota_engine.stop()
+    usage_tracker.close()
+    shutdown_task_pool(cancel_pending=True)
+    shutdown_workflow_scheduler(wait=False)
+    shutdown_workflow_runtime()
+    if erpnext_cache:
+        erpnext_cache.shutdown()
+    shutdown_db_executor()
+    close_all_pools()
     logger.info("Unified orchestrator stopped")
 
 
+def _get_api_key(request: Request) -> Optional[str]:
+    """Get the API key from X-API-Key or an "Authorization: Bearer" header"""
+    api_key = request.headers.get("X-API-Key")
+    if api_key:
+        return api_key
+    
+    authorization = request.headers.get("Authorization", "")
+    if authorization.startswith("Bearer "):
+        return authorization[7:].strip() or None
+    return None
+
+
 @app.middleware("http")
 async def tenant_middleware(request: Request, call_next):
     """Middleware to set tenant context"""
     start_time = time.time()
     
     try:
-        # Get tenant from request
-        tenant_id = tenant_router.get_tenant_from_request(request)
+        # Get tenant from request and set tenant context
+        tenant_id = await tenant_router.resolve_tenant(request, db_executor)
+        
+        if tenant_id and not quota_engine.is_loaded(tenant_id):
+            # Quota state (and tier) is kept in memory; only a tenant's first request loads it
+            await db_executor.run(quota_engine.load_tenant, tenant_id)
         
         if tenant_id:
-            # Set tenant context
-            tenant_router.set_tenant_context(tenant_id)
+            # Rate limit per tenant and per API key
+            rate_limit_args = (tenant_id, quota_engine.get_tier(tenant_id), _get_api_key(request))
+            if rate_limiter.backend.is_local:
+                decision = rate_limiter.check(*rate_limit_args)
+            else:
+                decision = await db_executor.run(rate_limiter.check, *rate_limit_args)
             
-            # Track API call
+            if not decision.allowed:
+                return JSONResponse(
+                    status_code=429,
+                    content={"detail": f"Rate limit exceeded ({decision.scope})"},
+                    headers=decision.headers()
+                )
+        
+        if tenant_id and enforce_api_quota:
+            quota_check = quota_engine.check(tenant_id, [UsageMetric.API_CALLS.value])
+            if quota_check["exceeded"]:
+                return JSONResponse(
+                    status_code=429,
+                    content={"detail": "API call quota exceeded", "violations": quota_check["violations"]}
+                )
+        
+        if tenant_id:
+            # Track API call (buffered, flushed in the background)
             usage_tracker.increment_api_call(tenant_id)
+            # Traffic keeps an active tenant orchestrator from being stopped as idle
+            unified_orchestrator.touch_tenant(tenant_id)
         
         # Process request
         response = await call_next(request)
         
+        if tenant_id:
+            response.headers.update(decision.headers())
+        
         # Record metrics
         if tenant_id:
             response_time = time.time() - start_time
@@ -151,7 +247,7 @@ async def health_check():
 @app.get("/api/v1/tenant/info")
 async def get_tenant_info(tenant_id: str = Depends(get_tenant_id)):
     """Get current tenant information"""
-    tenant = tenant_manager.get_tenant(tenant_id)
+    tenant = await async_tenant_manager.get_tenant(tenant_id)
     if not tenant:
         raise HTTPException(status_code=404, detail="Tenant not found")
     
@@ -167,8 +263,10 @@ async def get_tenant_info(tenant_id: str = Depends(get_tenant_id)):
 @app.get("/api/v1/tenant/quota")
 async def get_quota(tenant_id: str = Depends(get_tenant_id)):
     """Get tenant quotas"""
-    quota = tenant_manager.get_tenant_quota(tenant_id)
-    usage = usage_tracker.get_current_month_usage(tenant_id)
+    quota, usage = await asyncio.gather(
+        async_tenant_manager.get_tenant_quota(tenant_id),
+        async_usage_tracker.get_current_month_usage(tenant_id)
+    )
     
     return {
         "tenant_id": tenant_id,
@@ -180,15 +278,26 @@ async def get_quota(tenant_id: str = Depends(get_tenant_id)):
 @app.get("/api/v1/system/status")
 async def get_system_status():
     """Get unified system status"""
-    return unified_orchestrator.get_system_status()
+    return await db_executor.run(unified_orchestrator.get_system_status)
+
+
+@app.get("/api/v1/system/rate-limits")
+async def get_rate_limit_stats():
+    """Get rate limiter and quota engine statistics"""
+    return {
+        "rate_limiter": rate_limiter.get_stats(),
+        "quota_engine": quota_engine.get_stats()
+    }
 
 
 @app.get("/api/v1/{tenant_id}/orchestrator/status")
 async def get_tenant_orchestrator_status(tenant_id: str):
     """Get tenant orchestrator status"""
     try:
-        orchestrator = unified_orchestrator.get_or_create_tenant_orchestrator(tenant_id)
-        return orchestrator.get_status()
+        orchestrator = await db_executor.run(
+            unified_orchestrator.get_or_create_tenant_orchestrator, tenant_id
+        )
+        return await db_executor.run(orchestrator.get_status)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -0,0 +1,131 @@
+"""
+Async DB - Bounded database thread pool with async facades
+Lets async FastAPI handlers call the blocking sqlite-backed managers
+without stalling the event loop
+"""
+
+import os
+import asyncio
+import logging
+import threading
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class DBExecutor:
+    """Bounded thread pool that runs blocking database calls for async code
+
+    Each worker thread keeps its own pooled platform DB connection, so the
+    pool size also bounds the number of open connections.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, name: str = "db"):
+        self.max_workers = max_workers or int(os.getenv("DB_EXECUTOR_WORKERS", "8"))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=name
+        )
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+        # Statistics
+        self.completed = 0
+        self.failed = 0
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking call on the pool and await its result"""
+        loop = asyncio.get_running_loop()
+        # Carry context variables into the worker, like asyncio.to_thread
+        ctx = contextvars.copy_context()
+        call = functools.partial(ctx.run, self._call, func, args, kwargs)
+        return await loop.run_in_executor(self._executor, call)
+
+    def _call(self, func: Callable, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        """Execute a call on a worker thread and keep statistics"""
+        with self._lock:
+            self._in_flight += 1
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and wait for running calls"""
+        self._executor.shutdown(wait=wait)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get executor statistics"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "in_flight": self._in_flight,
+                "completed": self.completed,
+                "failed": self.failed
+            }
+
+
+class AsyncFacade:
+    """Async view of a blocking manager
+
+    Every method call is run on the DB executor and returns an awaitable;
+    plain attributes are passed through unchanged.
+
+        tenants = AsyncFacade(tenant_manager, get_db_executor())
+        tenant = await tenants.get_tenant(tenant_id)
+    """
+
+    def __init__(self, target: Any, executor: DBExecutor):
+        self._target = target
+        self._executor = executor
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        executor = self._executor
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await executor.run(attr, *args, **kwargs)
+
+        # Cache the wrapper so later lookups skip __getattr__
+        self.__dict__[name] = call
+        return call
+
+
+_executor: Optional[DBExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_db_executor() -> DBExecutor:
+    """Get the shared process-wide DB executor"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = DBExecutor()
+                logger.info(f"DB executor started with {_executor.max_workers} workers")
+    return _executor
+
+
+def shutdown_db_executor():
+    """Shut down the shared DB executor (call on shutdown)"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor:
+        executor.shutdown()
@@ -0,0 +1,623 @@
+"""
+Async ERPNext Client - asyncio client for the ERPNext REST API
+Same surface as ERPNextClient (get, post, put, delete, execute_method) with
+a bounded keep-alive connection pool, HTTP/2 where available, per-call
+timeouts and retries with jittered exponential backoff
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+import functools
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+from erpnext_cache import ERPNextResponseCache, MISS
+from single_flight import get_async_erpnext_single_flight
+from circuit_breaker import get_circuit_breaker
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Responses worth retrying: throttling and gateway/upstream failures
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+# Methods that are safe to resend after the server may have seen them
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+# List paging: Frappe's own default page length is 20
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_ORDER_BY = "name asc"
+
+
+class AsyncERPNextClient:
+    """asyncio ERPNext client with pooled keep-alive connections
+
+    Each event loop gets its own connection pool (httpx pools can't be
+    shared across loops), so the client also works from code that calls
+    asyncio.run() repeatedly. Within one loop thousands of calls can be in
+    flight; beyond max_connections they wait for a free connection.
+
+    Non-idempotent calls (post, execute_method) are only retried when the
+    request never reached the server or was rejected with 429/503.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        api_secret: str,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: Optional[float] = None,
+        connect_timeout: float = 5.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.25,
+        backoff_max: float = 8.0,
+        http2: bool = True,
+        cache: Optional[ERPNextResponseCache] = None,
+        cache_scope: Optional[str] = None
+    ):
+        if not HTTPX_AVAILABLE:
+            raise ImportError("httpx is required for AsyncERPNextClient. Install with: pip install 'httpx[http2]'")
+
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.max_connections = max_connections or int(os.getenv("ERPNEXT_MAX_CONNECTIONS", "100"))
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout or float(os.getenv("ERPNEXT_TIMEOUT", "30"))
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.headers = {
+            'Authorization': f'token {api_key}:{api_secret}',
+            'Content-Type': 'application/json'
+        }
+        self._clients: Dict[asyncio.AbstractEventLoop, Any] = {}
+        self._closers: Dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        # Shared with the blocking clients of the same site; the connection
+        # pool (max_connections) is this client's bulkhead
+        self.breaker = get_circuit_breaker(self.base_url)
+        # Shares the response cache (and scope) of the blocking client it wraps
+        self.cache = cache
+        self.cache_scope = cache_scope or f"{self.base_url}|{api_key}"
+        self._refreshes: set = set()
+
+        # Statistics (updated from every loop using the client)
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.in_flight = 0
+
+    def _client(self) -> "httpx.AsyncClient":
+        """Get the connection pool for the running event loop"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            with self._lock:
+                self._prune_closed_loops()
+                client = self._clients.get(loop)
+                if client is not None:
+                    return client
+                client = httpx.AsyncClient(
+                    base_url=self.base_url,
+                    headers=self.headers,
+                    http2=self.http2,
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_keepalive_connections,
+                        keepalive_expiry=self.keepalive_expiry
+                    ),
+                    timeout=self._timeout(None)
+                )
+                self._clients[loop] = client
+                self._closers[loop] = loop.create_task(self._close_on_shutdown(loop, client))
+        return client
+
+    async def _close_on_shutdown(self, loop: asyncio.AbstractEventLoop, client: "httpx.AsyncClient"):
+        """Close a loop's pool when the loop cancels its tasks on shutdown
+
+        asyncio.run() and WorkflowRuntime.shutdown() cancel every task before
+        closing the loop, which is the last point the pool's connections can
+        still be closed on it.
+        """
+        try:
+            await loop.create_future()
+        finally:
+            with self._lock:
+                owned = self._clients.get(loop) is client
+                if owned:
+                    del self._clients[loop]
+                    self._closers.pop(loop, None)
+            # aclose() closes (and unregisters) the pool itself
+            if owned:
+                await client.aclose()
+
+    def _prune_closed_loops(self):
+        """Drop pools of loops that have closed (caller holds _lock)"""
+        for closed in [l for l in self._clients if l.is_closed()]:
+            del self._clients[closed]
+            closer = self._closers.pop(closed, None)
+            if closer is not None and not closer.done():
+                # The loop was closed with its tasks still pending, so its
+                # sockets can only be reclaimed by the garbage collector
+                logger.warning("Event loop closed without cancelling its tasks; its ERPNext connections were not closed")
+
+    def _timeout(self, timeout: Optional[float]) -> "httpx.Timeout":
+        """Per-call timeout; waiting for a pooled connection isn't bounded"""
+        return httpx.Timeout(timeout or self.timeout, connect=self.connect_timeout, pool=None)
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Full-jitter exponential backoff, honoring Retry-After when given"""
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict] = None,
+        json_data: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+        raise_for_status: bool = True,
+        use_breaker: bool = True
+    ) -> "httpx.Response":
+        """Send a request (path relative to base_url, or an absolute URL) with retries
+
+        Every attempt goes through the site's circuit breaker, so calls fail
+        fast with CircuitOpenError while the site is failing. Health checks
+        pass use_breaker=False to probe the site regardless.
+        """
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        client = self._client()
+        attempt = 0
+
+        with self._stats_lock:
+            self.requests += 1
+            self.in_flight += 1
+        try:
+            while True:
+                if use_breaker:
+                    self.breaker.before_call()
+                start = time.monotonic()
+                try:
+                    response = await client.request(
+                        method, path, params=params, json=json_data, timeout=self._timeout(timeout)
+                    )
+                except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+                    if use_breaker:
+                        self.breaker.record(False, time.monotonic() - start)
+                    # Never reached the server, safe to resend any method
+                    if attempt >= self.max_retries:
+                        raise
+                    response = None
+                except (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError):
+                    if use_breaker:
+                        self.breaker.record(False, time.monotonic() - start)
+                    if not idempotent or attempt >= self.max_retries:
+                        raise
+                    response = None
+                except BaseException:
+                    if use_breaker:
+                        self.breaker.record(True, time.monotonic() - start)
+                    raise
+
+                if response is not None:
+                    status = response.status_code
+                    if use_breaker:
+                        self.breaker.record(status < 500 and status != 429, time.monotonic() - start)
+                    retryable = status in RETRY_STATUS_CODES and (idempotent or status in (429, 503))
+                    if not retryable or attempt >= self.max_retries:
+                        if raise_for_status:
+                            response.raise_for_status()
+                        return response
+
+                delay = self._backoff(attempt, response.headers.get("Retry-After") if response is not None else None)
+                attempt += 1
+                with self._stats_lock:
+                    self.retries += 1
+                logger.debug(f"Retrying {method} {path} in {delay:.2f}s (attempt {attempt})")
+                await asyncio.sleep(delay)
+        except Exception:
+            with self._stats_lock:
+                self.failures += 1
+            raise
+        finally:
+            with self._stats_lock:
+                self.in_flight -= 1
+
+    async def get(
+        self,
+        resource_type: str,
+        filters: Optional[Dict] = None,
+        fields: Optional[List] = None,
+        timeout: Optional[float] = None,
+        use_cache: bool = True
+    ):
+        """GET resource from ERPNext (read-through cached)"""
+        key = ERPNextResponseCache.make_key(self.cache_scope, resource_type, filters, fields)
+        if not self.cache:
+            # Without a cache there are no write generations, so reads aren't shared
+            return (await self._get(resource_type, filters, fields, timeout))[0]
+        if not use_cache:
+            token = self.cache.begin_load(self.cache_scope, resource_type)
+            return (await self._get_shared(key, token, resource_type, filters, fields, timeout))[0]
+
+        value, refresh = self.cache.lookup(key)
+        if value is not MISS:
+            if refresh:
+                task = asyncio.get_running_loop().create_task(self._refresh(key, resource_type, filters, fields))
+                self._refreshes.add(task)
+                task.add_done_callback(self._refreshes.discard)
+            return value
+
+        token = self.cache.begin_load(self.cache_scope, resource_type)
+        value, size = await self._get_shared(key, token, resource_type, filters, fields, timeout)
+        self.cache.put(key, value, size, token)
+        return value
+
+    async def _get_shared(
+        self,
+        key: tuple,
+        token: int,
+        resource_type: str,
+        filters: Optional[Dict],
+        fields: Optional[List],
+        timeout: Optional[float]
+    ):
+        """GET from ERPNext, sharing the request with identical concurrent GETs
+
+        The cache generation is part of the key, so a read issued after a
+        write never joins a request that started before it.
+        """
+        return await get_async_erpnext_single_flight().do(
+            (key, token), lambda: self._get(resource_type, filters, fields, timeout)
+        )
+
+    async def _get(
+        self,
+        resource_type: str,
+        filters: Optional[Dict],
+        fields: Optional[List],
+        timeout: Optional[float],
+        params: Optional[Dict] = None
+    ):
+        """GET from ERPNext, returns (response, size in bytes)"""
+        params = dict(params or {})
+        if filters:
+            params['filters'] = json.dumps(filters)
+        if fields:
+            params['fields'] = json.dumps(fields)
+
+        response = await self.request("GET", f"/api/resource/{resource_type}", params=params, timeout=timeout)
+        return response.json(), len(response.content)
+
+    async def get_page(
+        self,
+        resource_type: str,
+        filters: Optional[Dict] = None,
+        fields: Optional[List] = None,
+        start: int = 0,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        order_by: str = DEFAULT_ORDER_BY,
+        timeout: Optional[float] = None
+    ) -> List[Dict]:
+        """GET one page of a list (not cached)"""
+        params = {"limit_start": start, "limit_page_length": page_size, "order_by": order_by}
+        return (await self._get(resource_type, filters, fields, timeout, params))[0].get("data", [])
+
+    async def iter_resource(
+        self,
+        resource_type: str,
+        filters: Optional[Dict] = None,
+        fields: Optional[List] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        order_by: str = DEFAULT_ORDER_BY,
+        prefetch: bool = True,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[Dict]:
+        """Yield every matching record, fetching the next page while the caller consumes this one"""
+        async for record in _iter_pages(
+            lambda start: self.get_page(resource_type, filters, fields, start, page_size, order_by, timeout),
+            page_size, prefetch
+        ):
+            yield record
+
+    async def _refresh(self, key: tuple, resource_type: str, filters: Optional[Dict], fields: Optional[List]):
+        """Replace a stale cached response"""
+        token = self.cache.begin_load(self.cache_scope, resource_type)
+        try:
+            value, size = await self._get_shared(key, token, resource_type, filters, fields, None)
+        except Exception as e:
+            self.cache.end_refresh(key)
+            logger.warning(f"Error refreshing cached {resource_type}: {str(e)}")
+            return
+        self.cache.refreshes += 1
+        self.cache.put(key, value, size, token)
+
+    async def post(self, resource_type: str, data: Dict, timeout: Optional[float] = None):
+        """POST (create) resource in ERPNext"""
+        try:
+            response = await self.request("POST", f"/api/resource/{resource_type}", json_data=data, timeout=timeout)
+        finally:
+            self.invalidate_cache(resource_type)
+        return response.json()
+
+    async def put(self, resource_type: str, name: str, data: Dict, timeout: Optional[float] = None):
+        """PUT (update) resource in ERPNext"""
+        try:
+            response = await self.request("PUT", f"/api/resource/{resource_type}/{name}", json_data=data, timeout=timeout)
+        finally:
+            self.invalidate_cache(resource_type)
+        return response.json()
+
+    async def delete(self, resource_type: str, name: str, timeout: Optional[float] = None):
+        """DELETE resource from ERPNext"""
+        try:
+            response = await self.request("DELETE", f"/api/resource/{resource_type}/{name}", timeout=timeout)
+        finally:
+            self.invalidate_cache(resource_type)
+        return response.json()
+
+    async def execute_method(self, method_path: str, params: Optional[Dict] = None, timeout: Optional[float] = None):
+        """Execute a Frappe method"""
+        response = await self.request("POST", f"/api/method/{method_path}", json_data=params or {}, timeout=timeout)
+        return response.json()
+
+    def invalidate_cache(self, resource_type: Optional[str] = None):
+        """Drop cached GETs for a doctype (all doctypes if None)"""
+        if self.cache:
+            self.cache.invalidate(self.cache_scope, resource_type)
+
+    async def aclose(self):
+        """Close the connection pool of the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.pop(loop, None)
+            closer = self._closers.pop(loop, None)
+        if closer is not None:
+            closer.cancel()
+        if client:
+            await client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get client statistics"""
+        return {
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "pools": len(self._clients),
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "in_flight": self.in_flight
+        }
+
+
+class ThreadedERPNextClient:
+    """Async surface over a blocking ERPNextClient, for when httpx isn't installed
+
+    Calls run on the default executor, so concurrency is bounded by its
+    threads rather than by connections.
+    """
+
+    def __init__(self, client: Any):
+        self.client = client
+        self.base_url = client.base_url
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        timeout: Optional[float] = None,
+        raise_for_status: bool = True,
+        use_breaker: bool = True,
+        **kwargs
+    ):
+        """Send a request (path relative to base_url, or an absolute URL)"""
+        url = path if "://" in path else f"{self.base_url}{path}"
+        send = functools.partial(
+            self.client.session.request, method, url,
+            params=kwargs.get("params"), json=kwargs.get("json_data"),
+            timeout=timeout or getattr(self.client, "timeout", 30)
+        )
+        if use_breaker:
+            response = await self._run(self._send_guarded, send, raise_for_status)
+        else:
+            response = await self._run(send)
+        if raise_for_status:
+            response.raise_for_status()
+        return response
+
+    def _send_guarded(self, send, raise_for_status: bool):
+        """Send through the site's circuit breaker and bulkhead (on an executor thread)"""
+        with self.client.breaker.call():
+            response = send()
+            if raise_for_status:
+                response.raise_for_status()
+        return response
+
+    async def get(
+        self,
+        resource_type: str,
+        filters: Optional[Dict] = None,
+        fields: Optional[List] = None,
+        timeout: Optional[float] = None,
+        use_cache: bool = True
+    ):
+        """GET resource from ERPNext (cached by the blocking client)"""
+        return await self._run(self.client.get, resource_type, filters=filters, fields=fields, use_cache=use_cache)
+
+    async def get_page(
+        self,
+        resource_type: str,
+        filters: Optional[Dict] = None,
+        fields: Optional[List] = None,
+        start: int = 0,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        order_by: str = DEFAULT_ORDER_BY,
+        timeout: Optional[float] = None
+    ) -> List[Dict]:
+        """GET one page of a list (not cached)"""
+        return await self._run(self.client.get_page, resource_type, filters, fields, start, page_size, order_by)
+
+    async def iter_resource(
+        self,
+        resource_type: str,
+        filters: Optional[Dict] = None,
+        fields: Optional[List] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        order_by: str = DEFAULT_ORDER_BY,
+        prefetch: bool = True,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[Dict]:
+        """Yield every matching record, fetching the next page while the caller consumes this one"""
+        async for record in _iter_pages(
+            lambda start: self.get_page(resource_type, filters, fields, start, page_size, order_by),
+            page_size, prefetch
+        ):
+            yield record
+
+    async def post(self, resource_type: str, data: Dict, timeout: Optional[float] = None):
+        """POST (create) resource in ERPNext"""
+        return await self._run(self.client.post, resource_type, data)
+
+    async def put(self, resource_type: str, name: str, data: Dict, timeout: Optional[float] = None):
+        """PUT (update) resource in ERPNext"""
+        return await self._run(self.client.put, resource_type, name, data)
+
+    async def delete(self, resource_type: str, name: str, timeout: Optional[float] = None):
+        """DELETE resource from ERPNext"""
+        return await self._run(self.client.delete, resource_type, name)
+
+    async def execute_method(self, method_path: str, params: Optional[Dict] = None, timeout: Optional[float] = None):
+        """Execute a Frappe method"""
+        return await self._run(self.client.execute_method, method_path, params)
+
+    def invalidate_cache(self, resource_type: Optional[str] = None):
+        """Drop cached GETs for a doctype (all doctypes if None)"""
+        self.client.invalidate_cache(resource_type)
+
+    async def aclose(self):
+        """Nothing to close; the blocking client owns its session"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get client statistics"""
+        return {"http2": False, "threaded": True}
+
+
+async def _iter_pages(fetch_page, page_size: int, prefetch: bool) -> AsyncIterator[Dict]:
+    """Page through a list with fetch_page(start), keeping one page in flight ahead"""
+    start = 0
+    next_page = None
+    try:
+        page = await fetch_page(start)
+        while page:
+            more = len(page) >= page_size
+            if more and prefetch:
+                next_page = asyncio.ensure_future(fetch_page(start + page_size))
+
+            for record in page:
+                yield record
+            if not more:
+                return
+
+            start += page_size
+            if next_page:
+                page, next_page = await next_page, None
+            else:
+                page = await fetch_page(start)
+    finally:
+        if next_page:
+            next_page.cancel()
+
+
+_async_clients: Dict[tuple, Any] = {}
+_async_clients_lock = threading.Lock()
+
+
+def as_async_client(client: Any) -> Any:
+    """Get an async client for a blocking ERPNextClient
+
+    Clients are shared per (base_url, api_key, cache scope) so every
+    component of a tenant uses one connection pool and sees the blocking
+    client's cached responses. Already-async clients are returned unchanged.
+    """
+    if client is None or isinstance(client, (AsyncERPNextClient, ThreadedERPNextClient)):
+        return client
+
+    cache_scope = getattr(client, "cache_scope", None)
+    key = (client.base_url, client.api_key, cache_scope)
+    async_client = _async_clients.get(key)
+    if async_client is None:
+        with _async_clients_lock:
+            async_client = _async_clients.get(key)
+            if async_client is None:
+                if HTTPX_AVAILABLE:
+                    async_client = AsyncERPNextClient(
+                        client.base_url, client.api_key, client.api_secret,
+                        cache=getattr(client, "cache", None),
+                        cache_scope=cache_scope
+                    )
+                else:
+                    logger.warning("httpx not installed, ERPNext async calls will run on threads")
+                    async_client = ThreadedERPNextClient(client)
+                _async_clients[key] = async_client
+    return async_client
+
+
+# Example usage
+if __name__ == "__main__":
+    async def main():
+        client = AsyncERPNextClient(
+            base_url=os.getenv("ERPNEXT_BASE_URL", "http://localhost:8000"),
+            api_key=os.getenv("ERPNEXT_API_KEY", ""),
+            api_secret=os.getenv("ERPNEXT_API_SECRET", "")
+        )
+        async with client:
+            start = time.perf_counter()
+            results = await asyncio.gather(
+                *[client.get("Customer", fields=["name"], timeout=10) for _ in range(100)],
+                return_exceptions=True
+            )
+            failed = sum(1 for r in results if isinstance(r, Exception))
+            print(f"100 concurrent GETs in {time.perf_counter() - start:.2f}s ({failed} failed)")
+            print(f"Stats: {client.get_stats()}")
+
+    asyncio.run(main())
@@ -0,0 +1 @@
+async-erpnext-client.py
\ No newline at end of file
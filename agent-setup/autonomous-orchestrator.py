@@ -3,6 +3,7 @@ Autonomous Orchestrator - Zero Human Intervention System
 Coordinates all autonomous systems for fully automated operations
 """
 
+import os
 import asyncio
 import logging
 import json
@@ -14,6 +15,8 @@ from dataclasses import dataclass
 from agent_orchestrator import ERPNextClient, AgentOrchestrator
 from email_integration import EmailManager, ERPNextEmailIntegration
 from autonomous_workflow import AutonomousWorkflowEngine, AutonomousWorkflow, WorkflowStep, TriggerType
+from workflow_timers import WorkflowTimerService
+from workflow_checkpoints import WorkflowCheckpointStore
 from self_healing_system import SelfHealingSystem, HealthCheck, AutoFixAction, IssueSeverity
 
 logging.basicConfig(level=logging.INFO)
@@ -62,10 +65,13 @@ class AutonomousOrchestrator:
         self.orchestrator = AgentOrchestrator(self.erpnext, max_agents=20)
 
         # Initialize autonomous systems
+        workflow_db = os.getenv("WORKFLOW_DB", "workflows.db")
         self.workflow_engine = AutonomousWorkflowEngine(
             self.erpnext,
             self.email_manager,
-            self.orchestrator
+            self.orchestrator,
+            timers=WorkflowTimerService(workflow_db),
+            checkpoints=WorkflowCheckpointStore(workflow_db)
         )
 
         self.self_healing = SelfHealingSystem(self.erpnext)
@@ -120,7 +126,7 @@ class AutonomousOrchestrator:
                     action_type="erpnext_get",
                     action_config={
                         "resource_type": "Quotation",
-                        "filters": {"status": "Submitted"}
+                        "filters": {"name": "{{trigger_data.name}}"}
                     }
                 ),
                 WorkflowStep(
@@ -135,7 +141,8 @@ class AutonomousOrchestrator:
                     depends_on=["get_quotation"]
                 )
             ],
-            enabled=True
+            enabled=True,
+            max_concurrent=10  # One execution per event, each for its own document
         )
         self.workflow_engine.register_workflow(quotation_workflow)
 
@@ -153,7 +160,7 @@ class AutonomousOrchestrator:
                     action_type="erpnext_get",
                     action_config={
                         "resource_type": "Sales Invoice",
-                        "filters": {"status": "Submitted"}
+                        "filters": {"name": "{{trigger_data.name}}"}
                     }
                 ),
                 WorkflowStep(
@@ -168,7 +175,8 @@ class AutonomousOrchestrator:
                     depends_on=["get_invoice"]
                 )
             ],
-            enabled=True
+            enabled=True,
+            max_concurrent=10  # One execution per event, each for its own document
         )
         self.workflow_engine.register_workflow(invoice_workflow)
 
@@ -263,7 +271,7 @@ class AutonomousOrchestrator:
         """Stop the autonomous system"""
         logger.info("Stopping autonomous system...")
         self.running = False
-        self.workflow_engine.running = False
+        self.workflow_engine.stop_scheduler()
         self.self_healing.running = False
         logger.info("Autonomous system stopped")
 
@@ -278,7 +286,8 @@ class AutonomousOrchestrator:
             "workflows": {
                 "enabled": self.config.enable_workflows,
                 "total": len(self.workflow_engine.workflows),
-                "running": len(self.workflow_engine.running_workflows)
+                "running": len(self.workflow_engine.running_workflows),
+                "admission": self.workflow_engine.get_admission_stats()
             },
             "self_healing": {
                 "enabled": self.config.enable_self_healing,
@@ -295,8 +304,13 @@ class AutonomousOrchestrator:
         }
 
     def trigger_workflow(self, workflow_id: str, trigger_data: Optional[Dict] = None):
-        """Trigger a workflow manually"""
-        self.workflow_engine.trigger_workflow(workflow_id, trigger_data)
+        """Trigger a workflow manually, returns a future of its execution"""
+        return self.workflow_engine.trigger_workflow(workflow_id, trigger_data)
+
+    def bind_event_bus(self, event_bus):
+        """Start this system's event-triggered workflows on events from the bus
+        (with Redis, on one of the processes bound to it)"""
+        event_bus.add_workflow_engine(self.workflow_engine)
 
     def register_custom_workflow(self, workflow: AutonomousWorkflow):
         """Register a custom autonomous workflow"""
@@ -3,24 +3,41 @@ Autonomous Workflow Automation System
 Zero human intervention - fully automated business processes
 """
 
+import os
 import asyncio
 import json
 import logging
-from typing import Dict, List, Optional, Any, Callable
-from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, Callable, Tuple
+from datetime import datetime
 from dataclasses import dataclass, field
 from enum import Enum
 import threading
+import itertools
+from collections import OrderedDict
+from concurrent.futures import Future
 from queue import Queue
 import time
 
 from agent_orchestrator import ERPNextClient, AgentOrchestrator
 from email_integration import EmailManager, ERPNextEmailIntegration
+from async_erpnext_client import as_async_client
+from workflow_dag import WorkflowDAG, StepState
+from workflow_timers import WorkflowTimerService
+from workflow_checkpoints import WorkflowCheckpointStore
+from workflow_templates import TemplateCache
+from workflow_conditions import ConditionCache
+from workflow_scheduler import WorkflowScheduler, get_workflow_scheduler, next_run_time
+from workflow_runtime import WorkflowRuntime, get_workflow_runtime
+from workflow_admission import ConcurrencyLimit, LatencyHistogram
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Actions that write to ERPNext, made idempotent per execution and step
+ERPNEXT_WRITE_ACTIONS = ("erpnext_create", "erpnext_update", "create_lead_from_email")
+
+
 class WorkflowStatus(Enum):
     PENDING = "pending"
     RUNNING = "running"
@@ -28,6 +45,7 @@ class WorkflowStatus(Enum):
     FAILED = "failed"
     RETRYING = "retrying"
     PAUSED = "paused"
+    REJECTED = "rejected"
 
 
 class TriggerType(Enum):
@@ -66,12 +84,38 @@ class AutonomousWorkflow:
     steps: List[WorkflowStep]
     enabled: bool = True
     max_concurrent: int = 1
+    max_queued: int = 100  # Triggers beyond max_concurrent wait, up to this many; more are rejected
+    max_parallel_steps: int = 10  # Independent steps run concurrently up to this
     status: WorkflowStatus = WorkflowStatus.PENDING
     created_at: datetime = field(default_factory=datetime.now)
     last_run: Optional[datetime] = None
-    run_count: int = 0
+    run_count: int = 0  # Admitted executions; rejected triggers count in rejected_count
     success_count: int = 0
     failure_count: int = 0
+    rejected_count: int = 0
+
+
+@dataclass
+class WorkflowExecution:
+    """State of one execution of a workflow"""
+    execution_id: str
+    workflow_id: str
+    context: Dict[str, Any]
+    status: WorkflowStatus = WorkflowStatus.PENDING  # Pending while queued for admission
+    created_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "execution_id": self.execution_id,
+            "workflow_id": self.workflow_id,
+            "status": self.status.value,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "error": self.error
+        }
 
 
 class AutonomousWorkflowEngine:
@@ -81,27 +125,155 @@ class AutonomousWorkflowEngine:
         self,
         erpnext_client: ERPNextClient,
         email_manager: EmailManager,
-        orchestrator: AgentOrchestrator
+        orchestrator: AgentOrchestrator,
+        timers: Optional[WorkflowTimerService] = None,
+        durable_wait_seconds: Optional[float] = None,
+        checkpoints: Optional[WorkflowCheckpointStore] = None,
+        tenant_id: Optional[str] = None,
+        scheduler: Optional[WorkflowScheduler] = None,
+        runtime: Optional[WorkflowRuntime] = None,
+        max_concurrent_executions: Optional[int] = None
     ):
         self.erpnext = erpnext_client
+        # ERPNext steps await this instead of blocking the loop on requests
+        self.async_erpnext = as_async_client(erpnext_client)
         self.email_manager = email_manager
         self.orchestrator = orchestrator
         self.workflows: Dict[str, AutonomousWorkflow] = {}
-        self.running_workflows: Dict[str, Dict] = {}
+        self.dags: Dict[str, WorkflowDAG] = {}
+        self.templates = TemplateCache()
+        self.conditions = ConditionCache()
+        self.running_workflows: Dict[str, WorkflowExecution] = {}  # Queued, running and suspending
+        self.finished_executions: "OrderedDict[str, WorkflowExecution]" = OrderedDict()
+        self.max_finished_executions = 1000
+        self._execution_seq = itertools.count()
         self.workflow_queue = Queue()
         self.running = False
         self.lock = threading.Lock()
 
+        # Event-triggered workflows by (tenant_id, event_type), "*" matching any
+        # tenant; workflows without a tenant_id in trigger_config get this one
+        self.tenant_id = tenant_id
+        self.event_index: Dict[Tuple[str, str], List[str]] = {}
+
+        # Waits and retry delays this long suspend the execution to the timer
+        # table instead of sleeping; without a timer service they always sleep
+        self.timers = timers
+        self.durable_wait_seconds = (
+            durable_wait_seconds if durable_wait_seconds is not None
+            else float(os.getenv("WORKFLOW_DURABLE_WAIT_SECONDS", "30"))
+        )
+
+        # Checkpoints each execution after every step so it can be recovered
+        self.checkpoints = checkpoints
+
+        # Scheduled workflows fire from this (the shared scheduler unless given)
+        self.scheduler = scheduler
+
+        # Executions run on this event loop thread (the shared runtime unless given)
+        self.runtime = runtime
+
+        # Admission: each workflow runs up to max_concurrent executions and
+        # the engine (one per tenant) up to max_concurrent_executions in all
+        self.execution_limit = ConcurrencyLimit(
+            max_concurrent_executions or int(os.getenv("WORKFLOW_MAX_CONCURRENT_EXECUTIONS", "100")),
+            max_queued=int(os.getenv("WORKFLOW_MAX_QUEUED_EXECUTIONS", "1000"))
+        )
+        self.workflow_limits: Dict[str, ConcurrencyLimit] = {}
+        self.queue_latency: Dict[str, LatencyHistogram] = {}
+        self.run_latency: Dict[str, LatencyHistogram] = {}
+
         # Initialize email integration
         self.email_integration = ERPNextEmailIntegration(erpnext_client, email_manager)
 
     def register_workflow(self, workflow: AutonomousWorkflow):
-        """Register a workflow"""
+        """Register a workflow (ValueError if its steps don't form a DAG or a condition is malformed)"""
+        dag = WorkflowDAG(workflow.steps)
         with self.lock:
+            conditions = self._condition_trees(workflow)
+            for condition in conditions:
+                self.conditions.prepare(condition)
+            previous = self.workflows.get(workflow.workflow_id)
+            if previous:
+                for step in previous.steps:
+                    self.templates.forget(step.action_config)
+                for condition in self._condition_trees(previous):
+                    if not any(condition is kept for kept in conditions):
+                        self.conditions.forget(condition)
+                for key in self._event_keys(previous):
+                    workflow_ids = self.event_index.get(key, [])
+                    if workflow.workflow_id in workflow_ids:
+                        workflow_ids.remove(workflow.workflow_id)
+                    if not workflow_ids:
+                        self.event_index.pop(key, None)
+            for step in workflow.steps:
+                self.templates.prepare(step.action_config)
+            for key in self._event_keys(workflow):
+                self.event_index.setdefault(key, []).append(workflow.workflow_id)
             self.workflows[workflow.workflow_id] = workflow
+            self.dags[workflow.workflow_id] = dag
+            # Executions holding the previous limit release it when they finish
+            self.workflow_limits[workflow.workflow_id] = ConcurrencyLimit(workflow.max_concurrent, workflow.max_queued)
+            self.queue_latency.setdefault(workflow.workflow_id, LatencyHistogram())
+            self.run_latency.setdefault(workflow.workflow_id, LatencyHistogram())
             logger.info(f"Workflow registered: {workflow.name} ({workflow.workflow_id})")
 
-    def execute_step(self, step: WorkflowStep, context: Dict[str, Any]) -> Dict[str, Any]:
+        if self.running:
+            self._schedule(workflow)
+
+    @staticmethod
+    def _condition_trees(workflow: AutonomousWorkflow) -> List[Dict[str, Any]]:
+        """Condition trees of a workflow's steps, compiled at registration"""
+        trees = []
+        for step in workflow.steps:
+            if step.conditions:
+                trees.append(step.conditions)
+            if step.action_type == "decision" and "condition" in step.action_config:
+                trees.append(step.action_config["condition"])
+            if "where" in step.action_config:
+                trees.append(step.action_config["where"])
+        return trees
+
+    def _schedule(self, workflow: AutonomousWorkflow):
+        """Add a scheduled workflow to the scheduler (or take any other off it)"""
+        if workflow.trigger_type != TriggerType.SCHEDULED:
+            self.scheduler.unschedule(self, workflow.workflow_id)
+            return
+        try:
+            self.scheduler.schedule(self, workflow)
+        except Exception as e:
+            logger.error(f"Invalid schedule for workflow {workflow.workflow_id}: {str(e)}")
+
+    def _event_keys(self, workflow: AutonomousWorkflow) -> List[Tuple[str, str]]:
+        """Index keys of an event-triggered workflow (trigger_config "event" or "events")"""
+        if workflow.trigger_type != TriggerType.EVENT:
+            return []
+        config = workflow.trigger_config
+        events = config.get("events") or [config.get("event")]
+        tenant_id = config.get("tenant_id") or self.tenant_id or "*"
+        return [(tenant_id, event_type) for event_type in events if event_type]
+
+    def trigger_workflows_by_event(self, tenant_id: str, event_type: str, data: Optional[Dict] = None) -> List[str]:
+        """Start every enabled workflow triggered by this event, returns their IDs
+
+        Executions run on the engine's runtime with the event data as
+        trigger_data ({{trigger_data.name}} etc.), so this returns at once
+        and can be called from event bus threads and request handlers.
+        """
+        workflow_ids = self.event_index.get((tenant_id, event_type), []) + self.event_index.get(("*", event_type), [])
+        started = []
+        for workflow_id in workflow_ids:
+            workflow = self.workflows.get(workflow_id)
+            if not workflow or not workflow.enabled:
+                continue
+            self._submit(self.execute_workflow(workflow_id, data))
+            started.append(workflow_id)
+
+        if started:
+            logger.info(f"Event {event_type} for tenant {tenant_id} started {', '.join(started)}")
+        return started
+
+    async def execute_step(self, step: WorkflowStep, context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a workflow step"""
         try:
             logger.info(f"Executing step: {step.name} ({step.step_id})")
@@ -111,27 +283,13 @@ class AutonomousWorkflowEngine:
                 if not self._evaluate_conditions(step.conditions, context):
                     return {"success": False, "skipped": True, "reason": "Conditions not met"}
 
-            # Execute based on action type
-            if step.action_type == "erpnext_create":
-                result = self._execute_erpnext_create(step.action_config, context)
-            elif step.action_type == "erpnext_update":
-                result = self._execute_erpnext_update(step.action_config, context)
-            elif step.action_type == "erpnext_get":
-                result = self._execute_erpnext_get(step.action_config, context)
-            elif step.action_type == "send_email":
-                result = self._execute_send_email(step.action_config, context)
-            elif step.action_type == "send_notification":
-                result = self._execute_send_notification(step.action_config, context)
-            elif step.action_type == "decision":
-                result = self._execute_decision(step.action_config, context)
-            elif step.action_type == "wait":
-                result = self._execute_wait(step.action_config, context)
-            elif step.action_type == "process_incoming_emails":
-                result = self._execute_process_emails(step.action_config, context)
-            elif step.action_type == "create_lead_from_email":
-                result = self._execute_create_lead_from_email(step.action_config, context)
+            if step.action_type == "wait" and self._is_durable(step.action_config.get("duration", 60)):
+                result = self._durable_wait(step, context)
             else:
-                result = {"success": False, "error": f"Unknown action type: {step.action_type}"}
+                result = await self._execute_action(
+                    step.action_type, step.action_config, context,
+                    idempotency_key=f"{context.get('execution_id')}:{step.step_id}"
+                )
 
             # Update context with result
             context[f"step_{step.step_id}_result"] = result
@@ -141,30 +299,182 @@ class AutonomousWorkflowEngine:
             logger.error(f"Error executing step {step.step_id}: {str(e)}")
             return {"success": False, "error": str(e)}
 
-    def _execute_erpnext_create(self, config: Dict, context: Dict) -> Dict:
+    def _is_durable(self, delay: float) -> bool:
+        """Whether a delay suspends the execution instead of sleeping"""
+        return self.timers is not None and delay >= self.durable_wait_seconds
+
+    def _suspend(self, delay: float, reason: str) -> Dict[str, Any]:
+        """Result that suspends a step until its timer fires"""
+        return {"success": False, "suspended": True, "resume_at": time.time() + delay, "reason": reason}
+
+    def _durable_wait(self, step: WorkflowStep, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Wait step backed by a timer: suspend, and succeed once resumed"""
+        duration = step.action_config.get("duration", 60)
+        if context.pop(f"{step.step_id}_timer_fired", False):
+            return {"success": True, "waited": duration}
+        return self._suspend(duration, "wait")
+
+    async def _run_step(self, step: WorkflowStep, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute a step within its timeout, retrying failures retry_count times"""
+        attempt = context.get(f"{step.step_id}_retry_count", 0)  # Carried over when resumed
+        while True:
+            try:
+                if step.timeout:
+                    result = await asyncio.wait_for(self.execute_step(step, context), timeout=step.timeout)
+                else:
+                    result = await self.execute_step(step, context)
+            except asyncio.TimeoutError:
+                logger.error(f"Step {step.step_id} timed out after {step.timeout}s")
+                result = {"success": False, "error": f"Timed out after {step.timeout}s"}
+
+            if result.get("success") or result.get("skipped") or result.get("suspended") or attempt >= step.retry_count:
+                return result
+            attempt += 1
+            context[f"{step.step_id}_retry_count"] = attempt
+            if self._is_durable(step.retry_delay):
+                return self._suspend(step.retry_delay, "retry")
+            await asyncio.sleep(step.retry_delay)
+
+    async def _execute_action(
+        self,
+        action_type: str,
+        config: Dict,
+        context: Dict,
+        idempotency_key: Optional[str] = None
+    ) -> Dict:
+        """Execute an action based on its type
+
+        An ERPNext write with an idempotency key is recorded once it
+        succeeds; running it again under the same key (a step resumed after
+        a crash) returns the recorded result instead of writing twice.
+        """
+        if idempotency_key and self.checkpoints and action_type in ERPNEXT_WRITE_ACTIONS:
+            loop = asyncio.get_running_loop()
+            recorded = await loop.run_in_executor(None, self.checkpoints.get_effect, idempotency_key)
+            if recorded is not None:
+                logger.info(f"Skipping {action_type} already done under {idempotency_key}")
+                return recorded
+
+            result = await self._execute_action(action_type, config, context)
+            if result.get("success"):
+                await loop.run_in_executor(
+                    None, self.checkpoints.record_effect, idempotency_key, context.get("execution_id"), result
+                )
+            return result
+
+        if action_type == "erpnext_create":
+            return await self._execute_erpnext_create(config, context)
+        elif action_type == "erpnext_update":
+            return await self._execute_erpnext_update(config, context)
+        elif action_type == "erpnext_get":
+            return await self._execute_erpnext_get(config, context)
+        elif action_type == "erpnext_for_each":
+            return await self._execute_erpnext_for_each(config, context, idempotency_key)
+        elif action_type == "send_email":
+            return await self._in_thread(self._execute_send_email, config, context)
+        elif action_type == "send_notification":
+            return await self._in_thread(self._execute_send_notification, config, context)
+        elif action_type == "decision":
+            return self._execute_decision(config, context)
+        elif action_type == "wait":
+            return await self._execute_wait(config, context)
+        elif action_type == "process_incoming_emails":
+            return await self._in_thread(self._execute_process_emails, config, context)
+        elif action_type == "create_lead_from_email":
+            return await self._execute_create_lead_from_email(config, context)
+        else:
+            return {"success": False, "error": f"Unknown action type: {action_type}"}
+
+    async def _in_thread(self, func: Callable, *args) -> Any:
+        """Run a blocking call (SMTP, IMAP, SQLite) off the shared event loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def _execute_erpnext_create(self, config: Dict, context: Dict) -> Dict:
         """Execute ERPNext create action"""
         resource_type = config.get("resource_type")
         data = self._resolve_template(config.get("data", {}), context)
-        result = self.erpnext.post(resource_type, data)
+        result = await self.async_erpnext.post(resource_type, data, timeout=config.get("timeout"))
         return {"success": True, "data": result}
 
-    def _execute_erpnext_update(self, config: Dict, context: Dict) -> Dict:
+    async def _execute_erpnext_update(self, config: Dict, context: Dict) -> Dict:
         """Execute ERPNext update action"""
         resource_type = config.get("resource_type")
         name = self._resolve_template(config.get("name"), context)
         data = self._resolve_template(config.get("data", {}), context)
-        result = self.erpnext.put(resource_type, name, data)
+        result = await self.async_erpnext.put(resource_type, name, data, timeout=config.get("timeout"))
         return {"success": True, "data": result}
 
-    def _execute_erpnext_get(self, config: Dict, context: Dict) -> Dict:
-        """Execute ERPNext get action"""
+    async def _execute_erpnext_get(self, config: Dict, context: Dict) -> Dict:
+        """Execute ERPNext get action (one page, or up to max_records across pages, narrowed by "where")"""
         resource_type = config.get("resource_type")
         filters = self._resolve_template(config.get("filters", {}), context)
         fields = config.get("fields")
-        result = self.erpnext.get(resource_type, filters=filters, fields=fields)
+        max_records = config.get("max_records")
+        if max_records:
+            records = []
+            async for record in self.async_erpnext.iter_resource(
+                resource_type, filters=filters, fields=fields,
+                page_size=min(max_records, config.get("page_size", 500)), timeout=config.get("timeout")
+            ):
+                records.append(record)
+                if len(records) >= max_records:
+                    break
+            result = {"data": records}
+        else:
+            result = await self.async_erpnext.get(resource_type, filters=filters, fields=fields, timeout=config.get("timeout"))
+        where = self._record_filter(config, context)
+        if where:
+            # The result may be a cache entry shared with other callers; don't narrow it in place
+            result = {**result, "data": where.filter(result.get("data", []))}
         context[f"{resource_type}_data"] = result.get("data", [])
         return {"success": True, "data": result}
 
+    async def _execute_erpnext_for_each(self, config: Dict, context: Dict, idempotency_key: Optional[str] = None) -> Dict:
+        """Run an action for every matching record, streaming page by page
+
+        Records aren't collected, so any number of them runs in constant
+        memory. The action sees the record as {{record}} and its fields as
+        {{record.<field>}}; only counts and the first few errors are kept.
+        Writes are keyed per record, so a resumed loop skips records done.
+        An optional "where" condition tree skips records ERPNext filters
+        can't express (nested fields, any/not).
+        """
+        resource_type = config.get("resource_type")
+        filters = self._resolve_template(config.get("filters", {}), context)
+        action = config.get("do", {})
+        where = self._record_filter(config, context)
+        processed, failed, errors = 0, 0, []
+
+        async for record in self.async_erpnext.iter_resource(
+            resource_type,
+            filters=filters,
+            fields=config.get("fields"),
+            page_size=config.get("page_size", 500),
+            timeout=config.get("timeout")
+        ):
+            if where and not where(record):
+                continue
+            record_context = dict(context)
+            record_context["record"] = record
+            record_context.update({f"record.{key}": value for key, value in record.items()})
+
+            try:
+                result = await self._execute_action(
+                    action.get("action_type"), action.get("action_config", {}), record_context,
+                    idempotency_key=f"{idempotency_key}:{record.get('name')}" if idempotency_key else None
+                )
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+
+            processed += 1
+            if not result.get("success"):
+                failed += 1
+                if len(errors) < 10:
+                    errors.append({"record": record.get("name"), "error": result.get("error")})
+
+        context[f"{resource_type}_processed"] = processed
+        return {"success": failed == 0, "processed": processed, "failed": failed, "errors": errors}
+
     def _execute_send_email(self, config: Dict, context: Dict) -> Dict:
         """Execute send email action"""
         to = self._resolve_template(config.get("to"), context)
@@ -186,16 +496,15 @@ class AutonomousWorkflowEngine:
 
     def _execute_decision(self, config: Dict, context: Dict) -> Dict:
         """Execute decision step"""
-        condition = config.get("condition")
-        if self._evaluate_condition(condition, context):
+        if self._evaluate_conditions(config.get("condition"), context):
             return {"success": True, "decision": "true", "next_step": config.get("on_true")}
         else:
             return {"success": True, "decision": "false", "next_step": config.get("on_false")}
 
-    def _execute_wait(self, config: Dict, context: Dict) -> Dict:
+    async def _execute_wait(self, config: Dict, context: Dict) -> Dict:
         """Execute wait step"""
         duration = config.get("duration", 60)
-        time.sleep(duration)
+        await asyncio.sleep(duration)
         return {"success": True, "waited": duration}
 
     def _execute_process_emails(self, config: Dict, context: Dict) -> Dict:
@@ -204,7 +513,7 @@ class AutonomousWorkflowEngine:
         context["processed_emails"] = processed
         return {"success": True, "processed": processed}
 
-    def _execute_create_lead_from_email(self, config: Dict, context: Dict) -> Dict:
+    async def _execute_create_lead_from_email(self, config: Dict, context: Dict) -> Dict:
         """Create lead from email data"""
         email_data = context.get("email_data", {})
         lead_data = {
@@ -213,195 +522,304 @@ class AutonomousWorkflowEngine:
             "source": "Email",
             "status": "Open"
         }
-        result = self.erpnext.post("Lead", lead_data)
+        result = await self.async_erpnext.post("Lead", lead_data)
         return {"success": True, "data": result}
 
     def _resolve_template(self, template: Any, context: Dict) -> Any:
-        """Resolve template variables in context"""
-        if isinstance(template, str):
-            # Simple template resolution: {{variable}}
-            for key, value in context.items():
-                template = template.replace(f"{{{{{key}}}}}", str(value))
-            return template
-        elif isinstance(template, dict):
-            return {k: self._resolve_template(v, context) for k, v in template.items()}
-        elif isinstance(template, list):
-            return [self._resolve_template(item, context) for item in template]
-        return template
+        """Resolve {{variable}} and {{step_result.dotted.path}} templates (compiled at registration)"""
+        return self.templates.render(template, context)
 
     def _evaluate_conditions(self, conditions: Dict, context: Dict) -> bool:
-        """Evaluate workflow conditions"""
-        # Simple condition evaluation
-        # Supports: field == value, field != value, field > value, etc.
-        for condition in conditions.get("all", []):
-            if not self._evaluate_condition(condition, context):
-                return False
-        return True
-
-    def _evaluate_condition(self, condition: Dict, context: Dict) -> bool:
-        """Evaluate a single condition"""
-        field = condition.get("field")
-        operator = condition.get("operator", "==")
-        value = condition.get("value")
-
-        field_value = context.get(field)
-
-        if operator == "==":
-            return field_value == value
-        elif operator == "!=":
-            return field_value != value
-        elif operator == ">":
-            return field_value > value
-        elif operator == "<":
-            return field_value < value
-        elif operator == "in":
-            return field_value in value
-        elif operator == "not_in":
-            return field_value not in value
-        return False
-
-    async def execute_workflow(self, workflow_id: str, trigger_data: Optional[Dict] = None):
-        """Execute a workflow"""
+        """Evaluate a condition tree (all/any/not, compiled at registration)"""
+        return self.conditions.compile(conditions)(context)
+
+    def _record_filter(self, config: Dict, context: Dict):
+        """Compiled "where" condition of a step, None if it has none"""
+        if not config.get("where"):
+            return None
+        return self.conditions.compile(self._resolve_template(config["where"], context))
+
+    async def execute_workflow(self, workflow_id: str, trigger_data: Optional[Dict] = None) -> Optional[WorkflowExecution]:
+        """Execute a workflow, returns the execution (rejected if over its limits)"""
         workflow = self.workflows.get(workflow_id)
         if not workflow or not workflow.enabled:
             logger.warning(f"Workflow {workflow_id} not found or disabled")
-            return
-
-        if workflow.max_concurrent > 1:
-            # Check concurrent execution limit
-            running = sum(1 for w in self.running_workflows.values() if w.get("workflow_id") == workflow_id)
-            if running >= workflow.max_concurrent:
-                logger.warning(f"Workflow {workflow_id} already running (max concurrent: {workflow.max_concurrent})")
-                return
+            return None
 
         # Initialize context
+        execution_id = f"{workflow_id}_{datetime.now().timestamp()}_{next(self._execution_seq)}"
         context = {
             "workflow_id": workflow_id,
+            "execution_id": execution_id,
             "trigger_data": trigger_data or {},
             "started_at": datetime.now().isoformat()
         }
 
-        # Mark as running
-        execution_id = f"{workflow_id}_{datetime.now().timestamp()}"
-        self.running_workflows[execution_id] = {
-            "workflow_id": workflow_id,
-            "status": "running",
-            "started_at": datetime.now(),
-            "context": context
-        }
+        return await self._run_execution(workflow, execution_id, context)
+
+    async def resume_execution(self, timer: Dict[str, Any]):
+        """Resume an execution suspended at wait or retry steps once its timer is due"""
+        workflow = self.workflows.get(timer["workflow_id"])
+        if not workflow:
+            # Left claimed; it comes due again once the claim expires
+            logger.warning(f"Cannot resume {timer['execution_id']}: workflow {timer['workflow_id']} not registered")
+            return
+
+        state = timer["state"]
+        context = state["context"]
+        now = time.time()
+        wake = [step_id for step_id, due_at in state["due"].items() if due_at <= now]
+        for step_id in wake:
+            context[f"{step_id}_timer_fired"] = True
+        logger.info(f"Resuming execution {timer['execution_id']} at steps {', '.join(wake)}")
+
+        await self._run_execution(
+            workflow, timer["execution_id"], context,
+            checkpoint=state["checkpoint"], wake=wake,
+            due={step_id: due_at for step_id, due_at in state["due"].items() if step_id not in wake},
+            resumed=True
+        )
 
+    async def _run_execution(
+        self,
+        workflow: AutonomousWorkflow,
+        execution_id: str,
+        context: Dict[str, Any],
+        checkpoint: Optional[Dict[str, Any]] = None,
+        wake: Optional[List[str]] = None,
+        due: Optional[Dict[str, float]] = None,
+        resumed: bool = False
+    ) -> WorkflowExecution:
+        """Admit and run (or resume) an execution until it finishes or suspends
+
+        New executions are rejected when their workflow's or the engine's
+        queue is full; resumed ones were admitted before, so they always wait.
+        """
+        workflow_id = workflow.workflow_id
+        execution = WorkflowExecution(execution_id, workflow_id, context)
+        self.running_workflows[execution_id] = execution
+        if resumed:
+            # Keep it recoverable while it waits for a slot
+            self._checkpoint(execution_id, workflow_id, "running", context, checkpoint)
+
+        workflow_limit = self.workflow_limits[workflow_id]
+        try:
+            rejection = await self._admit(workflow, workflow_limit, force=resumed)
+        except BaseException:
+            self.running_workflows.pop(execution_id, None)
+            raise
+        if rejection:
+            return self._reject(execution, workflow, rejection)
+
+        execution.status = WorkflowStatus.RUNNING
+        execution.started_at = datetime.now()
+        if not resumed:
+            workflow.last_run = execution.started_at
+            workflow.run_count += 1
+        started = time.monotonic()
+        self.queue_latency[workflow_id].record(started - execution.created_at)
         workflow.status = WorkflowStatus.RUNNING
-        workflow.last_run = datetime.now()
-        workflow.run_count += 1
+        self._checkpoint(execution_id, workflow_id, "running", context, checkpoint)
 
         try:
-            # Execute steps
-            executed_steps = set()
-            current_step_ids = [step.step_id for step in workflow.steps if not step.depends_on]
-
-            while current_step_ids:
-                step_id = current_step_ids.pop(0)
-                if step_id in executed_steps:
-                    continue
-
-                step = next((s for s in workflow.steps if s.step_id == step_id), None)
-                if not step:
-                    continue
-
-                # Check dependencies
-                if step.depends_on:
-                    if not all(dep in executed_steps for dep in step.depends_on):
-                        current_step_ids.append(step_id)  # Retry later
-                        continue
-
-                # Execute step
-                result = self.execute_step(step, context)
-                executed_steps.add(step_id)
-
-                # Determine next steps
-                if result.get("success"):
-                    if step.on_success:
-                        current_step_ids.extend(step.on_success)
-                else:
-                    # Retry logic
-                    retry_count = context.get(f"{step_id}_retry_count", 0)
-                    if retry_count < step.retry_count:
-                        context[f"{step_id}_retry_count"] = retry_count + 1
-                        await asyncio.sleep(step.retry_delay)
-                        current_step_ids.append(step_id)
-                    else:
-                        if step.on_failure:
-                            current_step_ids.extend(step.on_failure)
-                        else:
-                            workflow.status = WorkflowStatus.FAILED
-                            workflow.failure_count += 1
-                            break
-
-            if workflow.status != WorkflowStatus.FAILED:
-                workflow.status = WorkflowStatus.COMPLETED
+            dag = self.dags.get(workflow_id)
+            if dag is None:
+                dag = self.dags[workflow_id] = WorkflowDAG(workflow.steps)
+
+            outcome = await dag.run(
+                lambda step: self._run_step(step, context), workflow.max_parallel_steps,
+                checkpoint=checkpoint, wake=wake,
+                on_step=lambda step_id, progress: self._checkpoint(
+                    execution_id, workflow_id, "running", context, progress.checkpoint()
+                )
+            )
+            if outcome.suspended:
+                # Steps still suspended from before keep their due times
+                due = {
+                    step_id: outcome.results[step_id]["resume_at"] if step_id in outcome.results else (due or {})[step_id]
+                    for step_id in outcome.steps_in(StepState.SUSPENDED)
+                }
+                await self._in_thread(self.timers.schedule, execution_id, workflow_id, min(due.values()), {
+                    "context": context,
+                    "checkpoint": outcome.checkpoint(),
+                    "due": due
+                })
+                execution.status = workflow.status = WorkflowStatus.PAUSED
+                self._checkpoint(execution_id, workflow_id, "suspended", context, outcome.checkpoint())
+                logger.info(f"Execution {execution_id} suspended until {datetime.fromtimestamp(min(due.values())).isoformat()}")
+                return execution
+
+            if outcome.success:
+                execution.status = workflow.status = WorkflowStatus.COMPLETED
                 workflow.success_count += 1
+                self._checkpoint(execution_id, workflow_id, "completed", context, outcome.checkpoint())
+            else:
+                logger.warning(f"Workflow {workflow_id} failed at step {outcome.failed_step}")
+                execution.status = workflow.status = WorkflowStatus.FAILED
+                execution.error = f"Step {outcome.failed_step} failed"
+                workflow.failure_count += 1
+                self._checkpoint(
+                    execution_id, workflow_id, "failed", context, outcome.checkpoint(), error=execution.error
+                )
+            if checkpoint and self.timers:
+                await self._in_thread(self.timers.complete, execution_id)
 
         except Exception as e:
+            # The last checkpoint stays "running", so recovery retries the execution
             logger.error(f"Error executing workflow {workflow_id}: {str(e)}")
-            workflow.status = WorkflowStatus.FAILED
+            execution.status = workflow.status = WorkflowStatus.FAILED
+            execution.error = str(e)
             workflow.failure_count += 1
 
         finally:
             # Cleanup
-            self.running_workflows.pop(execution_id, None)
+            self.execution_limit.release()
+            workflow_limit.release()
+            self.run_latency[workflow_id].record(time.monotonic() - started)
             context["completed_at"] = datetime.now().isoformat()
+            self._finish(execution)
+
+        return execution
+
+    async def _admit(self, workflow: AutonomousWorkflow, workflow_limit: ConcurrencyLimit, force: bool) -> Optional[str]:
+        """Take a slot of the workflow, then of the engine; returns why not if rejected"""
+        if not await workflow_limit.acquire(force=force):
+            return f"Workflow queue full ({workflow.max_concurrent} running, {workflow.max_queued} queued)"
+        try:
+            admitted = await self.execution_limit.acquire(force=force)
+        except BaseException:
+            workflow_limit.release()
+            raise
+        if not admitted:
+            workflow_limit.release()
+            return "Engine queue full"
+        return None
+
+    def _reject(self, execution: WorkflowExecution, workflow: AutonomousWorkflow, reason: str) -> WorkflowExecution:
+        """Record an execution turned away by admission control"""
+        logger.warning(f"Execution of {workflow.workflow_id} rejected: {reason}")
+        workflow.rejected_count += 1
+        execution.status = WorkflowStatus.REJECTED
+        execution.error = reason
+        self._finish(execution)
+        return execution
+
+    def _finish(self, execution: WorkflowExecution):
+        """Move an execution from running to the bounded finished history"""
+        if execution.status != WorkflowStatus.PAUSED:
+            execution.completed_at = datetime.now()
+        self.running_workflows.pop(execution.execution_id, None)
+        self.finished_executions[execution.execution_id] = execution
+        while len(self.finished_executions) > self.max_finished_executions:
+            self.finished_executions.popitem(last=False)
+
+    def _checkpoint(
+        self,
+        execution_id: str,
+        workflow_id: str,
+        status: str,
+        context: Dict[str, Any],
+        checkpoint: Optional[Dict[str, Any]],
+        error: Optional[str] = None
+    ):
+        """Queue an execution checkpoint (context, step states, retry counters)"""
+        if not self.checkpoints:
+            return
+        self.checkpoints.save(execution_id, workflow_id, status, {
+            "status": status,
+            "started_at": context.get("started_at"),
+            "context": dict(context),  # Later steps keep adding to the context
+            "checkpoint": checkpoint,
+            "error": error
+        })
+
+    def recover_executions(self) -> int:
+        """Resume executions a previous process left running, from their last checkpoint"""
+        if not self.checkpoints:
+            return 0
+
+        recovered = 0
+        for execution in self.checkpoints.recover():
+            execution_id = execution["execution_id"]
+            state = execution["state"]
+            workflow = self.workflows.get(execution["workflow_id"])
+            if not workflow or "context" not in state:
+                logger.warning(f"Cannot recover {execution_id}: workflow {execution['workflow_id']} not registered")
+                self.checkpoints.save(execution_id, execution["workflow_id"], "running", state)
+                continue
+
+            # This checkpoint is newer than any timer the execution left behind
+            if self.timers:
+                self.timers.complete(execution_id)
+
+            # Steps that were running are rerun; idempotency keys cover their writes
+            checkpoint = state.get("checkpoint") or {}
+            wake = [
+                step_id for step_id, value in checkpoint.get("states", {}).items()
+                if value == StepState.SUSPENDED.value
+            ]
+            self._submit(
+                self._run_execution(
+                    workflow, execution_id, state["context"], checkpoint=checkpoint or None, wake=wake, resumed=True
+                )
+            )
+            recovered += 1
+
+        if recovered:
+            logger.info(f"Recovering {recovered} interrupted workflow executions")
+        return recovered
+
+    def _submit(self, coro) -> Future:
+        """Run an execution on the runtime's event loop, off the calling thread"""
+        if self.runtime is None:
+            self.runtime = get_workflow_runtime()
+        return self.runtime.submit(coro)
+
+    def _on_timer_due(self, timer: Dict[str, Any]):
+        """Resume a due execution off the timer thread"""
+        self._submit(self.resume_execution(timer))
 
     def start_scheduler(self):
-        """Start the workflow scheduler"""
+        """Schedule this engine's workflows and start the timer service and recovery of interrupted executions"""
         self.running = True
-        scheduler_thread = threading.Thread(target=self._scheduler_loop, daemon=True)
-        scheduler_thread.start()
+        if self.scheduler is None:
+            self.scheduler = get_workflow_scheduler()
+        for workflow in list(self.workflows.values()):
+            self._schedule(workflow)
+        if self.timers:
+            self.timers.start(self._on_timer_due)
+        if self.checkpoints:
+            self.checkpoints.start()
+            self.recover_executions()
         logger.info("Workflow scheduler started")
 
-    def _scheduler_loop(self):
-        """Scheduler loop for scheduled workflows"""
-        while self.running:
+    def stop_scheduler(self):
+        """Take this engine's workflows off the scheduler; suspended executions stay in the timer table"""
+        self.running = False
+        if self.scheduler:
+            self.scheduler.remove_engine(self)
+        if self.timers:
+            self.timers.stop()
+        if self.checkpoints:
+            self.checkpoints.stop()
+
+    def next_scheduled_run(self) -> Optional[datetime]:
+        """Get the earliest time a scheduled workflow is due (None if none are scheduled)"""
+        next_run = None
+        for workflow in list(self.workflows.values()):
+            if not workflow.enabled or workflow.trigger_type != TriggerType.SCHEDULED:
+                continue
             try:
-                current_time = datetime.now()
-
-                for workflow in self.workflows.values():
-                    if not workflow.enabled:
-                        continue
-
-                    if workflow.trigger_type == TriggerType.SCHEDULED:
-                        schedule = workflow.trigger_config.get("schedule")
-                        if self._should_run_schedule(schedule, workflow.last_run):
-                            asyncio.run(self.execute_workflow(workflow.workflow_id))
+                due = next_run_time(workflow.trigger_config.get("schedule"), workflow.last_run)
+            except Exception:
+                continue
+            if due is not None and (next_run is None or due < next_run):
+                next_run = due
+        return next_run
 
-                    elif workflow.trigger_type == TriggerType.EVENT:
-                        # Event-driven workflows are triggered externally
-                        pass
-
-                time.sleep(60)  # Check every minute
-
-            except Exception as e:
-                logger.error(f"Error in scheduler loop: {str(e)}")
-                time.sleep(60)
-
-    def _should_run_schedule(self, schedule: Dict, last_run: Optional[datetime]) -> bool:
-        """Check if schedule should run"""
-        if not last_run:
-            return True
-
-        schedule_type = schedule.get("type")
-        interval = schedule.get("interval", 60)  # minutes
-
-        if schedule_type == "interval":
-            return (datetime.now() - last_run).total_seconds() >= (interval * 60)
-        elif schedule_type == "daily":
-            return datetime.now().date() > last_run.date()
-        elif schedule_type == "hourly":
-            return (datetime.now() - last_run).total_seconds() >= 3600
-        return False
-
-    def trigger_workflow(self, workflow_id: str, trigger_data: Optional[Dict] = None):
-        """Manually trigger a workflow"""
-        asyncio.run(self.execute_workflow(workflow_id, trigger_data))
+    def trigger_workflow(self, workflow_id: str, trigger_data: Optional[Dict] = None) -> Future:
+        """Trigger a workflow from any thread, returns a future of its execution"""
+        return self._submit(self.execute_workflow(workflow_id, trigger_data))
 
     def get_workflow_status(self, workflow_id: str) -> Dict:
         """Get workflow status"""
@@ -417,5 +835,20 @@ class AutonomousWorkflowEngine:
             "last_run": workflow.last_run.isoformat() if workflow.last_run else None,
             "run_count": workflow.run_count,
             "success_count": workflow.success_count,
-            "failure_count": workflow.failure_count
+            "failure_count": workflow.failure_count,
+            "rejected_count": workflow.rejected_count,
+            "executions": self.workflow_limits[workflow_id].get_stats(),
+            "queue_latency": self.queue_latency[workflow_id].get_stats(),
+            "run_latency": self.run_latency[workflow_id].get_stats()
         }
+
+    def get_execution_status(self, execution_id: str) -> Dict:
+        """Get the status of a running or recently finished execution"""
+        execution = self.running_workflows.get(execution_id) or self.finished_executions.get(execution_id)
+        if not execution:
+            return {"error": "Execution not found"}
+        return execution.to_dict()
+
+    def get_admission_stats(self) -> Dict[str, Any]:
+        """Get the engine-wide execution limit statistics"""
+        return self.execution_limit.get_stats()
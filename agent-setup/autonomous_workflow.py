@@ -0,0 +1 @@
+autonomous-workflow.py
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+Gateway Benchmark - Requests/sec of the gateway data path, blocking vs async
+Drives the /api/v1/tenant/quota data path in-process at several client
+counts, once calling the blocking managers on the event loop (before) and
+once through the DB executor facades (after)
+
+    python benchmark-gateway.py --clients 1,8,64 --duration 5
+"""
+
+import os
+import time
+import logging
+import random
+import asyncio
+import argparse
+import sqlite3
+import tempfile
+import threading
+import statistics
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from tenant_manager import TenantManager
+from usage_tracker import UsageTracker, UsageMetric
+from async_db import AsyncFacade, DBExecutor
+from platform_db import close_all_pools
+from tenant_cache import BY_ID, MISS
+
+
+# Minimal SQLite DDL for the tables the data path reads (mirrors tenant-schema.sql)
+BENCHMARK_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tenants (
+        tenant_id VARCHAR(50) PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        domain VARCHAR(255) UNIQUE,
+        subdomain VARCHAR(100) UNIQUE,
+        status VARCHAR(20) NOT NULL DEFAULT 'trial',
+        subscription_tier VARCHAR(50) DEFAULT 'starter',
+        created_at TIMESTAMP,
+        updated_at TIMESTAMP,
+        trial_end_date TIMESTAMP,
+        metadata TEXT
+    );
+    CREATE TABLE IF NOT EXISTS subscription_plans (
+        plan_id VARCHAR(50) PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        tier VARCHAR(50) NOT NULL,
+        price_monthly DECIMAL(10, 2),
+        price_yearly DECIMAL(10, 2),
+        max_agents INTEGER,
+        max_workflows INTEGER,
+        max_api_calls INTEGER,
+        max_storage_gb INTEGER,
+        included_modules TEXT,
+        features TEXT,
+        created_at TIMESTAMP
+    );
+    INSERT OR IGNORE INTO subscription_plans
+        (plan_id, name, tier, max_agents, max_workflows, max_api_calls, max_storage_gb)
+    VALUES ('starter', 'Starter', 'starter', 5, 10, 10000, 10);
+"""
+
+
+def prepare_database(db_path: str, num_tenants: int, months: int) -> List[str]:
+    """Create a platform database with tenants and historical usage"""
+    conn = sqlite3.connect(db_path)
+    conn.executescript(BENCHMARK_SCHEMA)
+    conn.close()
+
+    manager = TenantManager(db_path)
+    tracker = UsageTracker(manager, db_path)
+    tenant_ids = []
+    now = datetime.now()
+
+    for i in range(num_tenants):
+        tenant = manager.create_tenant(f"Benchmark Tenant {i}", f"bench{i}")
+        tenant_ids.append(tenant.tenant_id)
+
+        for month in range(months):
+            start = datetime(now.year, now.month, 1) - timedelta(days=31 * month)
+            start = start.replace(day=1)
+            end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            for metric in UsageMetric:
+                tracker.record_usage(tenant.tenant_id, metric, random.randint(1, 500), start, end)
+
+    return tenant_ids
+
+
+def hold_write_lock(db_path: str, hold_ms: float, interval_ms: float, stop: threading.Event):
+    """Simulate another worker that periodically holds the write lock"""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    while not stop.is_set():
+        conn.execute("BEGIN IMMEDIATE")
+        time.sleep(hold_ms / 1000)
+        conn.execute("COMMIT")
+        stop.wait(interval_ms / 1000)
+    conn.close()
+
+
+async def run_load(
+    handler: Callable[[str], Any],
+    tenant_ids: List[str],
+    clients: int,
+    duration: float
+) -> Dict[str, float]:
+    """Run closed-loop clients against a handler and collect statistics"""
+    latencies: List[float] = []
+    loop_lags: List[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await handler(random.choice(tenant_ids))
+            latencies.append(time.perf_counter() - start)
+
+    async def lag_probe():
+        # How late a 1ms timer fires is how long the loop was blocked
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            loop_lags.append(time.perf_counter() - start - 0.001)
+
+    started = time.perf_counter()
+    await asyncio.gather(lag_probe(), *[client() for _ in range(clients)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    loop_lags.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+        "loop_lag_p99_ms": loop_lags[int(len(loop_lags) * 0.99)] * 1000 if loop_lags else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the gateway data path")
+    parser.add_argument("--clients", default="1,8,64", help="Comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per run")
+    parser.add_argument("--tenants", type=int, default=200)
+    parser.add_argument("--months", type=int, default=24, help="Months of usage history per tenant")
+    parser.add_argument("--io-ms", type=float, default=2.0, help="Simulated downstream await per request")
+    parser.add_argument("--write-ratio", type=float, default=0.05, help="Fraction of requests that write usage directly")
+    parser.add_argument("--writer-hold-ms", type=float, default=5.0, help="Write lock hold time of a competing writer (0 disables)")
+    parser.add_argument("--workers", type=int, default=8, help="DB executor threads")
+    parser.add_argument("--db", default=None, help="Platform DB path (default: temporary file)")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="gateway-bench-"), "platform.db")
+    print(f"Preparing {db_path} ({args.tenants} tenants, {args.months} months of usage)...")
+    tenant_ids = prepare_database(db_path, args.tenants, args.months)
+
+    tenant_manager = TenantManager(db_path)
+    usage_tracker = UsageTracker(tenant_manager, db_path)
+    executor = DBExecutor(max_workers=args.workers, name="bench-db")
+    async_tenant_manager = AsyncFacade(tenant_manager, executor)
+    async_usage_tracker = AsyncFacade(usage_tracker, executor)
+    io_delay = args.io_ms / 1000
+
+    async def blocking_handler(tenant_id: str):
+        """Before: sqlite calls made directly from the coroutine"""
+        tenant_manager.get_tenant(tenant_id)
+        if random.random() < args.write_ratio:
+            usage_tracker.increment_agent_usage(tenant_id)
+        quota = tenant_manager.get_tenant_quota(tenant_id)
+        usage = usage_tracker.get_current_month_usage(tenant_id)
+        await asyncio.sleep(io_delay)
+        return quota, usage
+
+    async def async_handler(tenant_id: str):
+        """After: sqlite calls run on the DB executor"""
+        # Tenant resolution is served from the tenant cache when it can be,
+        # as TenantRouter.resolve_tenant does in the gateway middleware
+        if tenant_manager.cache.get(BY_ID, tenant_id) is MISS:
+            await async_tenant_manager.get_tenant(tenant_id)
+        if random.random() < args.write_ratio:
+            await async_usage_tracker.increment_agent_usage(tenant_id)
+        quota, usage = await asyncio.gather(
+            async_tenant_manager.get_tenant_quota(tenant_id),
+            async_usage_tracker.get_current_month_usage(tenant_id)
+        )
+        await asyncio.sleep(io_delay)
+        return quota, usage
+
+    stop = threading.Event()
+    if args.writer_hold_ms > 0:
+        threading.Thread(
+            target=hold_write_lock,
+            args=(db_path, args.writer_hold_ms, 50, stop),
+            daemon=True
+        ).start()
+
+    print(f"{'mode':<10} {'clients':>7} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'loop lag p99 ms':>16}")
+    try:
+        for clients in [int(c) for c in args.clients.split(",")]:
+            for mode, handler in (("blocking", blocking_handler), ("async", async_handler)):
+                result = asyncio.run(run_load(handler, tenant_ids, clients, args.duration))
+                print(
+                    f"{mode:<10} {clients:>7} {result['rps']:>10.1f} {result['p50_ms']:>9.2f} "
+                    f"{result['p99_ms']:>9.2f} {result['loop_lag_p99_ms']:>16.2f}"
+                )
+    finally:
+        stop.set()
+        executor.shutdown()
+        close_all_pools()
+
+
+if __name__ == "__main__":
+    main()
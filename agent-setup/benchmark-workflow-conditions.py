@@ -0,0 +1,102 @@
+"""
+Workflow Conditions Benchmark - Cost of filtering records, interpreted vs compiled vs batch
+Filters synthetic invoices with one condition, once through the if/elif
+interpreter _evaluate_condition used (before), once per record through a
+compiled condition and once with Condition.filter (after; column-wise when
+NumPy is installed)
+
+    python benchmark-workflow-conditions.py --record-counts 100,10000,100000 --iterations 5
+"""
+
+import time
+import random
+import argparse
+from typing import Any, Dict, List
+
+from workflow_conditions import NUMPY_AVAILABLE, compile_condition
+
+
+# The interpreter only handled a flat "all" list, so that is what's compared
+CONDITION = {
+    "all": [
+        {"field": "status", "operator": "==", "value": "Overdue"},
+        {"field": "outstanding_amount", "operator": ">", "value": 10000},
+        {"field": "currency", "operator": "in", "value": ["SAR", "AED"]},
+        {"field": "customer_group", "operator": "!=", "value": "Retail"}
+    ]
+}
+
+
+def evaluate_interpreted(conditions: Dict, context: Dict) -> bool:
+    """Before: walk the tree and branch on the operator for every record"""
+    for condition in conditions.get("all", []):
+        field = condition.get("field")
+        operator = condition.get("operator", "==")
+        value = condition.get("value")
+        field_value = context.get(field)
+
+        if operator == "==":
+            matched = field_value == value
+        elif operator == "!=":
+            matched = field_value != value
+        elif operator == ">":
+            matched = field_value > value
+        elif operator == "<":
+            matched = field_value < value
+        elif operator == "in":
+            matched = field_value in value
+        elif operator == "not_in":
+            matched = field_value not in value
+        else:
+            matched = False
+        if not matched:
+            return False
+    return True
+
+
+def make_invoices(count: int) -> List[Dict[str, Any]]:
+    """Invoices as ERPNext returns them (outstanding_amount always set, the interpreter needs it)"""
+    rng = random.Random(42)
+    return [
+        {
+            "name": f"ACC-SINV-{i:06d}",
+            "status": rng.choice(["Paid", "Unpaid", "Overdue"]),
+            "outstanding_amount": rng.choice([0, 750, 9500, 12000, 48000]),
+            "currency": rng.choice(["SAR", "AED", "USD"]),
+            "customer_group": rng.choice(["Retail", "Government", "Enterprise"])
+        }
+        for i in range(count)
+    ]
+
+
+def time_per_run(func, iterations: int) -> float:
+    """Milliseconds per run"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark workflow condition evaluation")
+    parser.add_argument("--record-counts", default="100,10000,100000", help="Comma-separated numbers of records")
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    condition = compile_condition(CONDITION)
+    print(f"NumPy: {NUMPY_AVAILABLE}")
+    print(f"{'records':>8} {'interpreted ms':>15} {'compiled ms':>12} {'batch ms':>9} {'speedup':>8}")
+    for count in [int(s) for s in args.record_counts.split(",")]:
+        invoices = make_invoices(count)
+        expected = [invoice for invoice in invoices if evaluate_interpreted(CONDITION, invoice)]
+        assert [invoice for invoice in invoices if condition(invoice)] == expected
+        assert condition.filter(invoices) == expected
+
+        before = time_per_run(lambda: [i for i in invoices if evaluate_interpreted(CONDITION, i)], args.iterations)
+        compiled = time_per_run(lambda: [i for i in invoices if condition(i)], args.iterations)
+        after = time_per_run(lambda: condition.filter(invoices), args.iterations)
+        print(f"{count:>8} {before:>15.2f} {compiled:>12.2f} {after:>9.2f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
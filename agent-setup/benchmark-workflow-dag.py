@@ -0,0 +1,135 @@
+"""
+Workflow DAG Benchmark - Wall time of 100-step workflows, sequential vs DAG
+Runs synthetic workflows (a chain, a fan-out and a layered DAG) once with
+the old sequential step loop (before) and once with WorkflowDAG (after);
+each step awaits a simulated I/O call
+
+    python benchmark-workflow-dag.py --steps 100 --io-ms 10 --parallel 10
+"""
+
+import time
+import random
+import asyncio
+import logging
+import argparse
+import statistics
+from typing import Any, Awaitable, Callable, Dict, List
+
+from autonomous_workflow import WorkflowStep
+from workflow_dag import WorkflowDAG
+
+
+def make_step(step_id: str, depends_on: List[str]) -> WorkflowStep:
+    """A synthetic step; on_success is filled in once its dependents are known"""
+    return WorkflowStep(
+        step_id=step_id,
+        name=step_id,
+        action_type="wait",
+        action_config={},
+        depends_on=depends_on or None
+    )
+
+
+def link(steps: List[WorkflowStep]) -> List[WorkflowStep]:
+    """Route each step to its dependents, which the sequential loop needs to reach them"""
+    dependents: Dict[str, List[str]] = {step.step_id: [] for step in steps}
+    for step in steps:
+        for dependency in step.depends_on or []:
+            dependents[dependency].append(step.step_id)
+    for step in steps:
+        step.on_success = dependents[step.step_id] or None
+    return steps
+
+
+def chain(n: int) -> List[WorkflowStep]:
+    """Each step depends on the previous one"""
+    return link([make_step(f"s{i}", [f"s{i - 1}"] if i else []) for i in range(n)])
+
+
+def fan_out(n: int) -> List[WorkflowStep]:
+    """One root, n - 2 independent steps, one step joining them"""
+    middle = [make_step(f"s{i}", ["s0"]) for i in range(1, n - 1)]
+    join = make_step(f"s{n - 1}", [step.step_id for step in middle])
+    return link([make_step("s0", [])] + middle + [join])
+
+
+def layered(n: int, width: int = 10, fan_in: int = 2) -> List[WorkflowStep]:
+    """Layers of width steps, each depending on fan_in steps of the layer before"""
+    rng = random.Random(42)
+    steps, previous = [], []
+    for i in range(n):
+        if i % width == 0 and i:
+            previous = [step.step_id for step in steps[i - width:i]]
+        depends_on = rng.sample(previous, min(fan_in, len(previous))) if previous else []
+        steps.append(make_step(f"s{i}", depends_on))
+    return link(steps)
+
+
+async def run_sequential(steps: List[WorkflowStep], run_step: Callable[[Any], Awaitable[Dict]]) -> int:
+    """Before: the step loop AutonomousWorkflowEngine.execute_workflow used"""
+    executed_steps = set()
+    current_step_ids = [step.step_id for step in steps if not step.depends_on]
+
+    while current_step_ids:
+        step_id = current_step_ids.pop(0)
+        if step_id in executed_steps:
+            continue
+
+        step = next((s for s in steps if s.step_id == step_id), None)
+        if not step:
+            continue
+
+        if step.depends_on:
+            if not all(dep in executed_steps for dep in step.depends_on):
+                current_step_ids.append(step_id)
+                continue
+
+        result = await run_step(step)
+        executed_steps.add(step_id)
+        if result.get("success") and step.on_success:
+            current_step_ids.extend(step.on_success)
+    return len(executed_steps)
+
+
+async def run_dag(dag: WorkflowDAG, run_step: Callable[[Any], Awaitable[Dict]], parallel: int) -> int:
+    """After: WorkflowDAG, compiled beforehand as register_workflow does"""
+    result = await dag.run(run_step, max_parallel=parallel)
+    return len(result.results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark workflow step scheduling")
+    parser.add_argument("--steps", type=int, default=100, help="Steps per workflow")
+    parser.add_argument("--io-ms", type=float, default=10.0, help="Simulated I/O per step (0 measures scheduling only)")
+    parser.add_argument("--parallel", type=int, default=10, help="max_parallel_steps of the DAG executor")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per shape and mode (median reported)")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    io_delay = args.io_ms / 1000
+
+    async def run_step(step: WorkflowStep) -> Dict[str, Any]:
+        await asyncio.sleep(io_delay)
+        return {"success": True}
+
+    shapes = {"chain": chain, "fan-out": fan_out, "layered": layered}
+    modes = {
+        "sequential": (lambda steps: steps, lambda steps: run_sequential(steps, run_step)),
+        "dag": (WorkflowDAG, lambda dag: run_dag(dag, run_step, args.parallel))
+    }
+
+    print(f"{'shape':<10} {'mode':<12} {'steps run':>9} {'wall ms':>10} {'steps/s':>10}")
+    for shape, build in shapes.items():
+        for mode, (prepare, run) in modes.items():
+            timings = []
+            for _ in range(args.repeat):
+                workflow = prepare(build(args.steps))
+                start = time.perf_counter()
+                executed = asyncio.run(run(workflow))
+                timings.append(time.perf_counter() - start)
+            elapsed = statistics.median(timings)
+            print(f"{shape:<10} {mode:<12} {executed:>9} {elapsed * 1000:>10.1f} {executed / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Workflow Templates Benchmark - Cost of resolving a step config, replace vs compiled
+Resolves a typical step config against contexts of growing size, once with
+the str.replace loop _resolve_template used (before) and once with
+TemplateCache (after)
+
+    python benchmark-workflow-templates.py --context-sizes 10,100,1000 --iterations 2000
+"""
+
+import time
+import argparse
+from typing import Any, Dict
+
+from workflow_templates import TemplateCache
+
+
+STEP_CONFIG = {
+    "resource_type": "Quotation",
+    "name": "{{quotation_name}}",
+    "data": {
+        "status": "Replied",
+        "contact_email": "{{customer_email}}",
+        "notes": "Follow-up {{followup_count}} sent on {{date}} by {{agent_name}}",
+        "items": [{"item_code": "{{item_code}}", "qty": 1}],
+        "terms": "Standard terms apply",
+        "currency": "SAR"
+    },
+    "to": "{{customer_email}}",
+    "subject": "Quotation {{quotation_name}}",
+    "body": "Dear {{customer_name}},\nPlease find quotation {{quotation_name}} attached.\nRegards"
+}
+
+
+def resolve_replace(template: Any, context: Dict) -> Any:
+    """Before: one str.replace per context key per string"""
+    if isinstance(template, str):
+        for key, value in context.items():
+            template = template.replace(f"{{{{{key}}}}}", str(value))
+        return template
+    elif isinstance(template, dict):
+        return {k: resolve_replace(v, context) for k, v in template.items()}
+    elif isinstance(template, list):
+        return [resolve_replace(item, context) for item in template]
+    return template
+
+
+def make_context(size: int) -> Dict[str, Any]:
+    """A context with the referenced variables plus size accumulated step results"""
+    context = {
+        "quotation_name": "QTN-0001",
+        "customer_email": "buyer@example.com",
+        "customer_name": "Al Noor Trading",
+        "followup_count": 2,
+        "date": "2026-01-15",
+        "agent_name": "Sales Agent",
+        "item_code": "ITEM-001"
+    }
+    for i in range(size):
+        context[f"step_{i}_result"] = {"success": True, "data": {"name": f"DOC-{i:04d}", "status": "Open"}}
+    return context
+
+
+def time_per_call(func, iterations: int) -> float:
+    """Microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark workflow template resolution")
+    parser.add_argument("--context-sizes", default="10,100,1000", help="Comma-separated numbers of step results in context")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    cache = TemplateCache()
+    cache.prepare(STEP_CONFIG)
+
+    print(f"{'context keys':>12} {'replace us':>11} {'compiled us':>12} {'speedup':>8}")
+    for size in [int(s) for s in args.context_sizes.split(",")]:
+        context = make_context(size)
+        assert resolve_replace(STEP_CONFIG, context) == cache.render(STEP_CONFIG, context)
+
+        before = time_per_call(lambda: resolve_replace(STEP_CONFIG, context), args.iterations)
+        after = time_per_call(lambda: cache.render(STEP_CONFIG, context), args.iterations)
+        print(f"{len(context):>12} {before:>11.1f} {after:>12.1f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,17 +2,18 @@
 Billing System - Subscription and usage-based billing
 """
 
-import sqlite3
 import logging
 import uuid
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 from decimal import Decimal
+from dataclasses import dataclass
 import json
 
 from tenant_manager import TenantManager
 from subscription_plans import SubscriptionPlanManager
 from usage_tracker import UsageTracker, UsageMetric
+from platform_db import get_platform_db
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -57,71 +58,69 @@ class BillingSystem:
         self.plan_manager = plan_manager
         self.usage_tracker = usage_tracker
         self.platform_db_path = platform_db_path
+        self.db = get_platform_db(platform_db_path)
         self._init_billing_tables()
     
     def _init_billing_tables(self):
         """Initialize billing tables"""
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
-        
-        # Invoices table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS invoices (
-                invoice_id VARCHAR(50) PRIMARY KEY,
-                tenant_id VARCHAR(50) NOT NULL,
-                subscription_id VARCHAR(50),
-                amount DECIMAL(10, 2) NOT NULL,
-                currency VARCHAR(3) DEFAULT 'SAR',
-                status VARCHAR(20) DEFAULT 'pending',
-                due_date TIMESTAMP,
-                paid_date TIMESTAMP,
-                invoice_number VARCHAR(100) UNIQUE,
-                items TEXT, -- JSON array
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Payments table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS payments (
-                payment_id VARCHAR(50) PRIMARY KEY,
-                tenant_id VARCHAR(50) NOT NULL,
-                invoice_id VARCHAR(50),
-                amount DECIMAL(10, 2) NOT NULL,
-                currency VARCHAR(3) DEFAULT 'SAR',
-                payment_method VARCHAR(50),
-                payment_provider_id VARCHAR(100),
-                status VARCHAR(20) DEFAULT 'pending',
-                transaction_date TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Subscriptions table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS tenant_subscriptions (
-                subscription_id VARCHAR(50) PRIMARY KEY,
-                tenant_id VARCHAR(50) NOT NULL,
-                plan_id VARCHAR(50) NOT NULL,
-                status VARCHAR(20) NOT NULL DEFAULT 'active',
-                start_date TIMESTAMP NOT NULL,
-                end_date TIMESTAMP,
-                renewal_date TIMESTAMP,
-                billing_cycle VARCHAR(20) DEFAULT 'monthly',
-                payment_method_id VARCHAR(100),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create indexes
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_invoice_tenant ON invoices(tenant_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_invoice_status ON invoices(status)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_payment_tenant ON payments(tenant_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_subscription_tenant ON tenant_subscriptions(tenant_id)")
-        
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            # Invoices table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS invoices (
+                    invoice_id VARCHAR(50) PRIMARY KEY,
+                    tenant_id VARCHAR(50) NOT NULL,
+                    subscription_id VARCHAR(50),
+                    amount DECIMAL(10, 2) NOT NULL,
+                    currency VARCHAR(3) DEFAULT 'SAR',
+                    status VARCHAR(20) DEFAULT 'pending',
+                    due_date TIMESTAMP,
+                    paid_date TIMESTAMP,
+                    invoice_number VARCHAR(100) UNIQUE,
+                    items TEXT, -- JSON array
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Payments table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS payments (
+                    payment_id VARCHAR(50) PRIMARY KEY,
+                    tenant_id VARCHAR(50) NOT NULL,
+                    invoice_id VARCHAR(50),
+                    amount DECIMAL(10, 2) NOT NULL,
+                    currency VARCHAR(3) DEFAULT 'SAR',
+                    payment_method VARCHAR(50),
+                    payment_provider_id VARCHAR(100),
+                    status VARCHAR(20) DEFAULT 'pending',
+                    transaction_date TIMESTAMP,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Subscriptions table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS tenant_subscriptions (
+                    subscription_id VARCHAR(50) PRIMARY KEY,
+                    tenant_id VARCHAR(50) NOT NULL,
+                    plan_id VARCHAR(50) NOT NULL,
+                    status VARCHAR(20) NOT NULL DEFAULT 'active',
+                    start_date TIMESTAMP NOT NULL,
+                    end_date TIMESTAMP,
+                    renewal_date TIMESTAMP,
+                    billing_cycle VARCHAR(20) DEFAULT 'monthly',
+                    payment_method_id VARCHAR(100),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Create indexes
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_invoice_tenant ON invoices(tenant_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_invoice_status ON invoices(status)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_payment_tenant ON payments(tenant_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_subscription_tenant ON tenant_subscriptions(tenant_id)")
     
     def create_subscription(
         self,
@@ -145,31 +144,28 @@ class BillingSystem:
             end_date = start_date + timedelta(days=365)
             renewal_date = end_date
         
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO tenant_subscriptions
-            (subscription_id, tenant_id, plan_id, status, start_date, end_date, 
-             renewal_date, billing_cycle, payment_method_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            subscription_id,
-            tenant_id,
-            plan_id,
-            "active",
-            start_date.isoformat(),
-            end_date.isoformat(),
-            renewal_date.isoformat(),
-            billing_cycle,
-            payment_method_id
-        ))
-        
-        # Update tenant subscription tier
-        self.tenant_manager.update_tenant(tenant_id, subscription_tier=plan.tier)
-        
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                INSERT INTO tenant_subscriptions
+                (subscription_id, tenant_id, plan_id, status, start_date, end_date, 
+                 renewal_date, billing_cycle, payment_method_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                subscription_id,
+                tenant_id,
+                plan_id,
+                "active",
+                start_date.isoformat(),
+                end_date.isoformat(),
+                renewal_date.isoformat(),
+                billing_cycle,
+                payment_method_id
+            ))
+            
+            # Update tenant subscription tier
+            self.tenant_manager.update_tenant(tenant_id, subscription_tier=plan.tier)
         
         logger.info(f"Subscription created: {subscription_id} for tenant {tenant_id}")
         
@@ -308,16 +304,14 @@ class BillingSystem:
     
     def _get_subscription(self, subscription_id: str) -> Optional[Dict]:
         """Get subscription by ID"""
-        conn = sqlite3.connect(self.platform_db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT * FROM tenant_subscriptions WHERE subscription_id = ?
-        """, (subscription_id,))
-        
-        row = cursor.fetchone()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT * FROM tenant_subscriptions WHERE subscription_id = ?
+            """, (subscription_id,))
+            
+            row = cursor.fetchone()
         
         if not row:
             return None
@@ -326,18 +320,16 @@ class BillingSystem:
     
     def _get_active_subscription(self, tenant_id: str) -> Optional[Dict]:
         """Get active subscription for tenant"""
-        conn = sqlite3.connect(self.platform_db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT * FROM tenant_subscriptions 
-            WHERE tenant_id = ? AND status = 'active'
-            ORDER BY created_at DESC LIMIT 1
-        """, (tenant_id,))
-        
-        row = cursor.fetchone()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT * FROM tenant_subscriptions 
+                WHERE tenant_id = ? AND status = 'active'
+                ORDER BY created_at DESC LIMIT 1
+            """, (tenant_id,))
+            
+            row = cursor.fetchone()
         
         if not row:
             return None
@@ -346,40 +338,37 @@ class BillingSystem:
     
     def _save_invoice(self, invoice: Invoice):
         """Save invoice to database"""
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
-        
-        items_json = json.dumps([
-            {
-                "description": item.description,
-                "quantity": item.quantity,
-                "unit_price": float(item.unit_price),
-                "total": float(item.total),
-                "item_type": item.item_type
-            }
-            for item in invoice.items
-        ])
-        
-        cursor.execute("""
-            INSERT INTO invoices
-            (invoice_id, tenant_id, subscription_id, amount, currency, status,
-             due_date, invoice_number, items, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            invoice.invoice_id,
-            invoice.tenant_id,
-            invoice.subscription_id,
-            float(invoice.amount),
-            invoice.currency,
-            invoice.status,
-            invoice.due_date.isoformat(),
-            invoice.invoice_number,
-            items_json,
-            invoice.created_at.isoformat()
-        ))
-        
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            items_json = json.dumps([
+                {
+                    "description": item.description,
+                    "quantity": item.quantity,
+                    "unit_price": float(item.unit_price),
+                    "total": float(item.total),
+                    "item_type": item.item_type
+                }
+                for item in invoice.items
+            ])
+            
+            cursor.execute("""
+                INSERT INTO invoices
+                (invoice_id, tenant_id, subscription_id, amount, currency, status,
+                 due_date, invoice_number, items, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                invoice.invoice_id,
+                invoice.tenant_id,
+                invoice.subscription_id,
+                float(invoice.amount),
+                invoice.currency,
+                invoice.status,
+                invoice.due_date.isoformat(),
+                invoice.invoice_number,
+                items_json,
+                invoice.created_at.isoformat()
+            ))
     
     def record_payment(
         self,
@@ -397,36 +386,33 @@ class BillingSystem:
         
         payment_id = f"pay_{uuid.uuid4().hex[:12]}"
         
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
-        
-        # Record payment
-        cursor.execute("""
-            INSERT INTO payments
-            (payment_id, tenant_id, invoice_id, amount, currency, payment_method,
-             payment_provider_id, status, transaction_date)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            payment_id,
-            invoice["tenant_id"],
-            invoice_id,
-            float(amount),
-            invoice["currency"],
-            payment_method,
-            payment_provider_id,
-            "completed",
-            (transaction_date or datetime.now()).isoformat()
-        ))
-        
-        # Update invoice status
-        cursor.execute("""
-            UPDATE invoices
-            SET status = 'paid', paid_date = ?
-            WHERE invoice_id = ?
-        """, (datetime.now().isoformat(), invoice_id))
-        
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            # Record payment
+            cursor.execute("""
+                INSERT INTO payments
+                (payment_id, tenant_id, invoice_id, amount, currency, payment_method,
+                 payment_provider_id, status, transaction_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                payment_id,
+                invoice["tenant_id"],
+                invoice_id,
+                float(amount),
+                invoice["currency"],
+                payment_method,
+                payment_provider_id,
+                "completed",
+                (transaction_date or datetime.now()).isoformat()
+            ))
+            
+            # Update invoice status
+            cursor.execute("""
+                UPDATE invoices
+                SET status = 'paid', paid_date = ?
+                WHERE invoice_id = ?
+            """, (datetime.now().isoformat(), invoice_id))
         
         logger.info(f"Payment recorded: {payment_id} for invoice {invoice_id}")
         
@@ -439,16 +425,14 @@ class BillingSystem:
     
     def _get_invoice(self, invoice_id: str) -> Optional[Dict]:
         """Get invoice by ID"""
-        conn = sqlite3.connect(self.platform_db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT * FROM invoices WHERE invoice_id = ?
-        """, (invoice_id,))
-        
-        row = cursor.fetchone()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT * FROM invoices WHERE invoice_id = ?
+            """, (invoice_id,))
+            
+            row = cursor.fetchone()
         
         if not row:
             return None
@@ -462,23 +446,21 @@ class BillingSystem:
         limit: int = 50
     ) -> List[Dict]:
         """Get invoices for a tenant"""
-        conn = sqlite3.connect(self.platform_db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        query = "SELECT * FROM invoices WHERE tenant_id = ?"
-        params = [tenant_id]
-        
-        if status:
-            query += " AND status = ?"
-            params.append(status)
-        
-        query += " ORDER BY created_at DESC LIMIT ?"
-        params.append(limit)
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            query = "SELECT * FROM invoices WHERE tenant_id = ?"
+            params = [tenant_id]
+            
+            if status:
+                query += " AND status = ?"
+                params.append(status)
+            
+            query += " ORDER BY created_at DESC LIMIT ?"
+            params.append(limit)
+            
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
         
         return [dict(row) for row in rows]
 
@@ -0,0 +1,275 @@
+"""
+Circuit Breaker - Fail fast on unhealthy ERPNext sites
+Per-site breaker that trips on error rate or slow-call rate, plus a
+bulkhead limiting concurrent blocking calls to one site, so a slow site
+can't tie up every worker thread
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a site whose circuit is open"""
+
+
+class BulkheadFullError(Exception):
+    """Raised when a site already has its maximum of concurrent calls"""
+
+
+class CircuitBreaker:
+    """Circuit breaker and bulkhead for one site
+
+    The breaker keeps the outcome of the last window_size calls. Once at
+    least min_calls are recorded, it opens when the share of failed calls
+    reaches failure_rate_threshold or the share of calls slower than
+    slow_call_seconds reaches slow_call_rate_threshold. While open, calls
+    fail with CircuitOpenError; after open_seconds one probe call is let
+    through (half-open) and closes the breaker if it succeeds.
+
+    When a health monitor reports on the site (record_health), its checks
+    are the recovery probes: a healthy report closes the breaker, and
+    while reports are recent, traffic isn't used to probe.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        slow_call_rate_threshold: float = 0.8,
+        window_size: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+        max_concurrent: int = 20,
+        max_wait: float = 5.0,
+        health_report_ttl: float = 180.0,
+        is_failure: Optional[Callable[[BaseException], bool]] = None
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self.health_report_ttl = health_report_ttl
+        self.is_failure = is_failure or (lambda error: True)
+        self.state = CircuitState.CLOSED
+        self._window: deque = deque(maxlen=window_size)  # (failed, slow) per call
+        self._opened_at = 0.0
+        self._probing = False
+        self._health_reported_at: Optional[float] = None
+        self._bulkhead = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.bulkhead_rejected = 0
+        self.trips = 0
+        self.active = 0
+
+    def before_call(self, probe_allowed: bool = True):
+        """Admit a call or raise CircuitOpenError"""
+        with self._lock:
+            if self.state == CircuitState.CLOSED:
+                return
+            now = time.monotonic()
+            if (
+                self.state == CircuitState.OPEN
+                and now - self._opened_at >= self.open_seconds
+                and not self._health_monitored(now)
+            ):
+                self.state = CircuitState.HALF_OPEN
+                self._probing = False
+            if self.state == CircuitState.HALF_OPEN and probe_allowed and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f"Circuit for {self.name} is open")
+
+    def _health_monitored(self, now: float) -> bool:
+        """Whether a health monitor has reported recently (lock held)"""
+        return self._health_reported_at is not None and now - self._health_reported_at < self.health_report_ttl
+
+    def record(self, success: bool, duration: float):
+        """Record the outcome of a call"""
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            self.calls += 1
+            if not success:
+                self.failures += 1
+
+            if self.state == CircuitState.HALF_OPEN:
+                self._probing = False
+                if success and not slow:
+                    self._close()
+                else:
+                    self._open()
+                return
+
+            if self.state == CircuitState.OPEN:
+                return  # A call admitted before the breaker opened
+
+            self._window.append((not success, slow))
+            if len(self._window) < self.min_calls:
+                return
+            failure_rate = sum(1 for failed, _ in self._window if failed) / len(self._window)
+            slow_rate = sum(1 for _, was_slow in self._window if was_slow) / len(self._window)
+            if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+                self._open()
+                logger.warning(
+                    f"Circuit for {self.name} opened "
+                    f"(failure rate {failure_rate:.0%}, slow rate {slow_rate:.0%})"
+                )
+
+    def record_health(self, healthy: bool, response_time: float = 0.0):
+        """Record a health check of the site, which doubles as the recovery probe"""
+        with self._lock:
+            self._health_reported_at = time.monotonic()
+            if healthy and response_time < self.slow_call_seconds:
+                if self.state != CircuitState.CLOSED:
+                    self._close()
+                    logger.info(f"Circuit for {self.name} closed by health check")
+            elif self.state == CircuitState.HALF_OPEN:
+                self._open()
+            elif self.state == CircuitState.CLOSED:
+                self._window.append((not healthy, response_time >= self.slow_call_seconds))
+
+    def _open(self):
+        """Open the breaker (lock held)"""
+        if self.state != CircuitState.OPEN:
+            self.trips += 1
+        self.state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self._probing = False
+
+    def _close(self):
+        """Close the breaker and start a fresh window (lock held)"""
+        self.state = CircuitState.CLOSED
+        self._window.clear()
+        self._probing = False
+
+    @contextmanager
+    def call(self, bulkhead: bool = True):
+        """Guard a blocking call: breaker check, bulkhead slot, outcome recording"""
+        self.before_call()
+        if bulkhead and not self._bulkhead.acquire(timeout=self.max_wait):
+            with self._lock:
+                self.bulkhead_rejected += 1
+                if self.state == CircuitState.HALF_OPEN:
+                    self._probing = False
+            raise BulkheadFullError(f"{self.name} already has {self.max_concurrent} calls in flight")
+
+        with self._lock:
+            self.active += 1
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            self.record(not self.is_failure(e), time.monotonic() - start)
+            raise
+        else:
+            self.record(True, time.monotonic() - start)
+        finally:
+            with self._lock:
+                self.active -= 1
+            if bulkhead:
+                self._bulkhead.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get breaker statistics"""
+        with self._lock:
+            window = list(self._window)
+            return {
+                "name": self.name,
+                "state": self.state.value,
+                "failure_rate": (sum(1 for failed, _ in window if failed) / len(window)) if window else 0.0,
+                "slow_rate": (sum(1 for _, slow in window if slow) / len(window)) if window else 0.0,
+                "active": self.active,
+                "max_concurrent": self.max_concurrent,
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "bulkhead_rejected": self.bulkhead_rejected,
+                "trips": self.trips
+            }
+
+
+def is_site_failure(error: BaseException) -> bool:
+    """Whether an error says the site is unhealthy (not e.g. a 404 or validation error)"""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is None:
+        return not isinstance(error, (CircuitOpenError, BulkheadFullError))
+    return status >= 500 or status == 429
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(site: str) -> CircuitBreaker:
+    """Get the shared circuit breaker of an ERPNext site (by base URL)"""
+    breaker = _breakers.get(site)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(site)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    name=site,
+                    failure_rate_threshold=float(os.getenv("ERPNEXT_BREAKER_FAILURE_RATE", "0.5")),
+                    slow_call_seconds=float(os.getenv("ERPNEXT_BREAKER_SLOW_SECONDS", "10")),
+                    open_seconds=float(os.getenv("ERPNEXT_BREAKER_OPEN_SECONDS", "30")),
+                    max_concurrent=int(os.getenv("ERPNEXT_MAX_CONCURRENT_PER_SITE", "20")),
+                    is_failure=is_site_failure
+                )
+                _breakers[site] = breaker
+    return breaker
+
+
+def get_circuit_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """Get statistics of every site's breaker"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.get_stats() for breaker in breakers}
+
+
+# Example usage
+if __name__ == "__main__":
+    breaker = CircuitBreaker("http://erp.example.com", window_size=10, min_calls=5, open_seconds=0.2)
+
+    def flaky_call():
+        raise ConnectionError("connection refused")
+
+    for i in range(8):
+        try:
+            with breaker.call():
+                flaky_call()
+        except ConnectionError:
+            print(f"Call {i}: failed")
+        except CircuitOpenError as e:
+            print(f"Call {i}: rejected ({e})")
+
+    time.sleep(0.25)
+    with breaker.call():
+        print("Probe call succeeded")
+    print(f"Stats: {breaker.get_stats()}")
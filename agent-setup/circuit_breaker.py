@@ -0,0 +1 @@
+circuit-breaker.py
\ No newline at end of file
@@ -355,6 +355,7 @@ Customer Service Team
         """Process incoming emails and create leads/contacts in ERPNext"""
         emails = self.email.read_emails(unread_only=True, limit=20)
         processed = []
+        new_leads = []  # (email_data, lead_data), created in one bulk call
 
         for email_data in emails:
             try:
@@ -381,13 +382,8 @@ Customer Service Team
                         "source": "Email",
                         "status": "Open"
                     }
-
-                    lead_result = self.erpnext.post("Lead", lead_data)
-                    processed.append({
-                        "email_id": email_data["id"],
-                        "action": "created_lead",
-                        "lead_name": lead_result.get("data", {}).get("name")
-                    })
+                    new_leads.append((email_data, lead_data))
+                    continue
 
                 # Mark email as read
                 self.email.mark_as_read(email_data["id"])
@@ -400,6 +396,29 @@ Customer Service Team
                     "error": str(e)
                 })
 
+        if new_leads:
+            results = self.erpnext.insert_many("Lead", [lead_data for _, lead_data in new_leads])
+            for (email_data, _), result in zip(new_leads, results):
+                if not result["success"]:
+                    logger.error(f"Error processing email {email_data.get('id')}: {result['error']}")
+                    processed.append({
+                        "email_id": email_data.get("id"),
+                        "action": "error",
+                        "error": result["error"]
+                    })
+                    continue
+
+                processed.append({
+                    "email_id": email_data["id"],
+                    "action": "created_lead",
+                    "lead_name": result["name"]
+                })
+                try:
+                    self.email.mark_as_read(email_data["id"])
+                except Exception as e:
+                    # The lead exists; an unread email is only picked up (and skipped) again
+                    logger.error(f"Error marking email {email_data['id']} as read: {str(e)}")
+
         return processed
 
     def send_notification_email(
@@ -462,10 +481,19 @@ Business System
                 "communication_date": datetime.now().isoformat()
             }
 
-            self.erpnext.post("Communication", communication_data)
+            # Queued and written in bulk with other sends' logs
+            future = self.erpnext.batch_writer.insert("Communication", communication_data)
+            future.add_done_callback(self._on_communication_logged)
         except Exception as e:
             logger.warning(f"Could not log communication: {str(e)}")
 
+    @staticmethod
+    def _on_communication_logged(future):
+        """Report a communication log the batch writer couldn't create"""
+        result = future.result()
+        if not result["success"]:
+            logger.warning(f"Could not log communication: {result['error']}")
+
 
 class EmailAgent:
     """Email-enabled agent for business email management"""
@@ -0,0 +1 @@
+email-integration.py
\ No newline at end of file
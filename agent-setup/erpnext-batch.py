@@ -0,0 +1,202 @@
+"""
+ERPNext Batch - Coalesces ERPNext creates and updates into bulk calls
+Writes of the same doctype are queued and sent through Frappe's
+frappe.client.insert_many / frappe.client.bulk_update, flushed when a batch
+fills up or its time window closes, with a result per item
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Frappe's per-request limits
+INSERT_MANY_LIMIT = 200
+BULK_UPDATE_LIMIT = 500
+
+# Frappe's answers to a document failing validation (ValidationError,
+# DuplicateEntryError, ...); one such doc rejects its whole insert_many call
+VALIDATION_STATUS_CODES = {400, 409, 417}
+
+
+@dataclass
+class _PendingWrite:
+    """A queued write and the Future of its result"""
+    doc: Dict[str, Any]
+    future: Future
+
+
+class ERPNextBatchWriter:
+    """Queues creates and updates per doctype and writes them in bulk
+
+    insert() and update() return a Future resolving to the item's result,
+    {"success": True, "name": ...} or {"success": False, "error": ...}.
+    A doctype's queue is written once it holds max_batch_size items or its
+    oldest item has waited flush_interval seconds; flush() writes everything
+    now. Inserts are written before updates, and batches in queue order.
+    """
+
+    def __init__(self, client: Any, max_batch_size: int = 100, flush_interval: float = 0.5):
+        self.client = client
+        self.max_batch_size = min(max_batch_size, INSERT_MANY_LIMIT)
+        self.flush_interval = flush_interval
+        self._inserts: Dict[str, List[_PendingWrite]] = {}
+        self._updates: Dict[str, List[_PendingWrite]] = {}
+        self._pending = 0
+        self._oldest: Optional[float] = None
+        self._full = False
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()  # Keeps batches in queue order
+        self._thread: Optional[threading.Thread] = None
+
+        # Statistics
+        self.queued = 0
+        self.batches = 0
+        self.written = 0
+        self.failed = 0
+
+    def insert(self, doctype: str, data: Dict[str, Any]) -> Future:
+        """Queue a create"""
+        return self._queue(self._inserts, doctype, {**data, "doctype": doctype})
+
+    def update(self, doctype: str, name: str, data: Dict[str, Any]) -> Future:
+        """Queue an update of an existing document"""
+        return self._queue(self._updates, doctype, {**data, "doctype": doctype, "docname": name})
+
+    def _queue(self, queues: Dict[str, List[_PendingWrite]], doctype: str, doc: Dict[str, Any]) -> Future:
+        """Add a write to a doctype's queue and wake the flusher if needed"""
+        future = Future()
+        with self._cond:
+            queue = queues.setdefault(doctype, [])
+            queue.append(_PendingWrite(doc=doc, future=future))
+            self._pending += 1
+            self.queued += 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            if len(queue) >= self.max_batch_size:
+                self._full = True
+                self._cond.notify()
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._flush_loop, name="erpnext-batch", daemon=True)
+                self._thread.start()
+        return future
+
+    def _take(self) -> Tuple[Dict[str, List[_PendingWrite]], Dict[str, List[_PendingWrite]]]:
+        """Take every queued write (lock held)"""
+        inserts, updates = self._inserts, self._updates
+        self._inserts, self._updates = {}, {}
+        self._pending = 0
+        self._oldest = None
+        self._full = False
+        return inserts, updates
+
+    def flush(self):
+        """Write everything queued, returns once it is written"""
+        with self._write_lock:
+            with self._cond:
+                inserts, updates = self._take()
+            self._write(inserts, updates)
+
+    def _flush_loop(self):
+        """Flush when a batch fills or the window closes; exit when drained"""
+        while True:
+            with self._cond:
+                if not self._pending:
+                    self._thread = None
+                    return
+                while self._pending and not self._full:
+                    remaining = self._oldest + self.flush_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing ERPNext batch: {str(e)}")
+
+    def _write(self, inserts: Dict[str, List[_PendingWrite]], updates: Dict[str, List[_PendingWrite]]):
+        """Send queued writes in bulk and resolve their Futures"""
+        for doctype, writes in inserts.items():
+            self._write_chunks(writes, lambda docs: self.client.insert_many(doctype, docs))
+        for doctype, writes in updates.items():
+            self._write_chunks(writes, lambda docs: self.client.bulk_update(doctype, docs))
+
+    def _write_chunks(self, writes: List[_PendingWrite], send):
+        """Send writes in chunks of at most max_batch_size items
+
+        Every Future is resolved, with a failure if its item got no result.
+        """
+        try:
+            for i in range(0, len(writes), self.max_batch_size):
+                chunk = writes[i:i + self.max_batch_size]
+                try:
+                    results = send([write.doc for write in chunk])
+                except Exception as e:
+                    results = [{"success": False, "error": str(e)} for _ in chunk]
+
+                if len(results) != len(chunk):
+                    # Can't tell which result belongs to which item, so none is trusted
+                    error = f"bulk write returned {len(results)} results for {len(chunk)} items"
+                    logger.error(f"ERPNext batch failed: {error}")
+                    results = [{"success": False, "error": error} for _ in chunk]
+
+                self.batches += 1
+                for write, result in zip(chunk, results):
+                    if result.get("success"):
+                        self.written += 1
+                    else:
+                        self.failed += 1
+                    write.future.set_result(result)
+        except Exception as e:
+            logger.error(f"Error writing ERPNext batch: {str(e)}")
+        finally:
+            for write in writes:
+                if not write.future.done():
+                    self.failed += 1
+                    write.future.set_result({"success": False, "error": "no result from bulk write"})
+
+    def close(self):
+        """Write everything still queued"""
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get writer statistics"""
+        with self._cond:
+            pending = self._pending
+        return {
+            "pending": pending,
+            "queued": self.queued,
+            "batches": self.batches,
+            "written": self.written,
+            "failed": self.failed,
+            "items_per_batch": round((self.written + self.failed) / self.batches, 2) if self.batches else 0.0
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    class PrintingClient:
+        """Stands in for ERPNextClient, printing each bulk call"""
+
+        def insert_many(self, doctype, docs):
+            print(f"insert_many {doctype}: {len(docs)} docs")
+            return [{"success": True, "name": f"{doctype}-{i}"} for i in range(len(docs))]
+
+        def bulk_update(self, doctype, docs):
+            print(f"bulk_update {doctype}: {len(docs)} docs")
+            return [{"success": True, "name": doc["docname"]} for doc in docs]
+
+    writer = ERPNextBatchWriter(PrintingClient(), max_batch_size=50, flush_interval=0.2)
+    futures = [writer.insert("Lead", {"lead_name": f"Lead {i}"}) for i in range(120)]
+    futures.append(writer.update("Lead", "Lead-0", {"status": "Replied"}))
+    print(f"Last insert: {futures[-2].result()}")
+    writer.close()
+    print(f"Stats: {writer.get_stats()}")
@@ -0,0 +1,376 @@
+"""
+ERPNext Cache - Read-through response cache for ERPNext GETs
+TTL per doctype, LRU bounds on entries and bytes, stale-while-revalidate,
+and invalidation by writes, webhooks and (optionally) other nodes
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Event type used to broadcast invalidations to other nodes
+ERPNEXT_CACHE_INVALIDATE_EVENT = "erpnext_cache_invalidate"
+
+# Returned by lookup() when the key is not cached
+MISS = object()
+
+# Seconds a response stays fresh, by doctype; 0 disables caching for a doctype.
+# Reference data changes rarely, transactional documents often.
+DEFAULT_DOCTYPE_TTLS = {
+    "Company": 3600,
+    "Currency": 3600,
+    "UOM": 3600,
+    "Warehouse": 3600,
+    "Item Group": 3600,
+    "Customer Group": 3600,
+    "Territory": 3600,
+    "Item": 600,
+    "User": 300,
+    "Customer": 120,
+    "Supplier": 120,
+    "Contact": 120,
+    "Lead": 60
+}
+
+# (scope, doctype, filters, fields)
+CacheKey = Tuple[str, str, str, str]
+
+
+@dataclass
+class _CacheEntry:
+    """A cached response"""
+    value: Any
+    size: int
+    fresh_until: float  # Monotonic seconds
+    stale_until: float
+    refreshing: bool = False
+
+
+class ERPNextResponseCache:
+    """TTL + LRU cache of ERPNext GET responses
+
+    Entries are scoped (one scope per tenant, or per site and API key for
+    clients without a tenant), so an invalidation only affects the tenant it
+    came from. After its TTL a response is served stale for up to
+    stale_seconds while a single background refresh replaces it. Cached
+    responses are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        default_ttl: float = 60,
+        stale_seconds: float = 300,
+        doctype_ttls: Optional[Dict[str, float]] = None,
+        refresh_workers: int = 4
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.stale_seconds = stale_seconds
+        self.doctype_ttls = dict(DEFAULT_DOCTYPE_TTLS if doctype_ttls is None else doctype_ttls)
+        self.refresh_workers = refresh_workers
+        self._entries: "OrderedDict[CacheKey, _CacheEntry]" = OrderedDict()
+        self._keys_by_scope: Dict[str, Dict[str, Set[CacheKey]]] = {}
+        self._generations: Dict[Tuple[str, Optional[str]], int] = {}
+        self._generation = 0
+        self._listeners: List[Callable[[str, Optional[str], Optional[str]], None]] = []
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # Statistics
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def ttl_for(self, doctype: str) -> float:
+        """Get the freshness TTL of a doctype"""
+        return self.doctype_ttls.get(doctype, self.default_ttl)
+
+    def set_ttl(self, doctype: str, ttl_seconds: float):
+        """Set the freshness TTL of a doctype (0 disables caching it)"""
+        self.doctype_ttls[doctype] = ttl_seconds
+
+    @staticmethod
+    def make_key(scope: str, doctype: str, filters: Any = None, fields: Any = None) -> CacheKey:
+        """Build the cache key of a GET"""
+        return (
+            scope,
+            doctype,
+            json.dumps(filters or None, sort_keys=True, default=str),
+            json.dumps(fields or None, default=str)
+        )
+
+    def lookup(self, key: CacheKey) -> Tuple[Any, bool]:
+        """Get a cached response, or MISS
+
+        Returns (value, refresh). refresh is True for exactly one caller of a
+        stale entry, which should reload it and put() the result (or call
+        end_refresh() if the reload fails).
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISS, False
+
+            if entry.stale_until <= now:
+                self._drop(key)
+                self.misses += 1
+                return MISS, False
+
+            self._entries.move_to_end(key)
+            if entry.fresh_until > now:
+                self.hits += 1
+                return entry.value, False
+
+            self.stale_hits += 1
+            if entry.refreshing:
+                return entry.value, False
+            entry.refreshing = True
+            return entry.value, True
+
+    def begin_load(self, scope: str, doctype: str) -> int:
+        """Get a token to pass to put() after loading from ERPNext
+
+        If the doctype is invalidated while the caller is loading, the put
+        is dropped so a response read before a write can't be cached over it.
+        """
+        with self._lock:
+            return self._token(scope, doctype)
+
+    def _token(self, scope: str, doctype: str) -> int:
+        """Sum of the generations covering a doctype (lock held)"""
+        return self._generation + self._generations.get((scope, None), 0) + self._generations.get((scope, doctype), 0)
+
+    def put(self, key: CacheKey, value: Any, size: int = 0, token: Optional[int] = None):
+        """Cache a response (size in bytes, used for the memory bound)"""
+        scope, doctype = key[0], key[1]
+        ttl = self.ttl_for(doctype)
+
+        with self._lock:
+            if ttl <= 0 or (token is not None and token != self._token(scope, doctype)) or size > self.max_bytes:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+                return
+
+            now = time.monotonic()
+            self._drop(key)
+            self._entries[key] = _CacheEntry(
+                value=value,
+                size=size,
+                fresh_until=now + ttl,
+                stale_until=now + ttl + self.stale_seconds
+            )
+            self._bytes += size
+            self._keys_by_scope.setdefault(scope, {}).setdefault(doctype, set()).add(key)
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._drop(oldest_key)
+                self.evictions += 1
+
+    def end_refresh(self, key: CacheKey):
+        """Release a stale entry whose refresh failed, so another caller retries"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refreshing = False
+
+    def refresh_in_background(self, key: CacheKey, load: Callable[[], Tuple[Any, int]]):
+        """Reload a stale entry on the refresh threads; load returns (value, size)"""
+        token = self.begin_load(key[0], key[1])
+
+        def refresh():
+            try:
+                value, size = load()
+            except Exception as e:
+                self.end_refresh(key)
+                logger.warning(f"Error refreshing cached {key[1]}: {str(e)}")
+                return
+            self.refreshes += 1
+            self.put(key, value, size, token)
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.refresh_workers,
+                    thread_name_prefix="erpnext-cache-refresh"
+                )
+            executor = self._executor
+        executor.submit(refresh)
+
+    def invalidate(self, scope: str, doctype: Optional[str] = None, origin: Optional[str] = None):
+        """Drop cached responses of a scope, for one doctype or all of them
+
+        origin is set when the invalidation came from another node, so it
+        isn't re-broadcast.
+        """
+        with self._lock:
+            self._generations[(scope, doctype)] = self._generations.get((scope, doctype), 0) + 1
+            doctypes = self._keys_by_scope.get(scope, {})
+            for name in ([doctype] if doctype is not None else list(doctypes)):
+                for key in list(doctypes.get(name, ())):
+                    self._drop(key)
+
+            self.invalidations += 1
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            try:
+                listener(scope, doctype, origin)
+            except Exception as e:
+                logger.error(f"Error in ERPNext cache listener: {str(e)}")
+
+    def _drop(self, key: CacheKey):
+        """Remove an entry and its index (lock held)"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+
+        scope, doctype = key[0], key[1]
+        doctypes = self._keys_by_scope.get(scope)
+        if doctypes is None:
+            return
+        keys = doctypes.get(doctype)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del doctypes[doctype]
+        if not doctypes:
+            del self._keys_by_scope[scope]
+
+    def clear(self):
+        """Drop all cached responses"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys_by_scope.clear()
+            self._bytes = 0
+
+    def add_listener(self, listener: Callable[[str, Optional[str], Optional[str]], None]):
+        """Register a callback invoked as listener(scope, doctype, origin) on invalidation"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def shutdown(self):
+        """Stop the background refresh threads"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            size = len(self._entries)
+            size_bytes = self._bytes
+            scopes = len(self._keys_by_scope)
+
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "size": size,
+            "max_size": self.max_entries,
+            "bytes": size_bytes,
+            "max_bytes": self.max_bytes,
+            "scopes": scopes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": ((self.hits + self.stale_hits) / total) if total else 0.0,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+
+_cache: Optional[ERPNextResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_erpnext_cache() -> Optional[ERPNextResponseCache]:
+    """Get the shared process-wide response cache (None if ERPNEXT_CACHE_ENABLED=false)"""
+    global _cache
+    if _cache is None:
+        if os.getenv("ERPNEXT_CACHE_ENABLED", "true").lower() != "true":
+            return None
+        with _cache_lock:
+            if _cache is None:
+                _cache = ERPNextResponseCache(
+                    max_entries=int(os.getenv("ERPNEXT_CACHE_SIZE", "10000")),
+                    max_bytes=int(float(os.getenv("ERPNEXT_CACHE_MAX_MB", "64")) * 1024 * 1024),
+                    default_ttl=float(os.getenv("ERPNEXT_CACHE_TTL", "60")),
+                    stale_seconds=float(os.getenv("ERPNEXT_CACHE_STALE_SECONDS", "300"))
+                )
+    return _cache
+
+
+def bind_erpnext_cache_to_event_bus(cache: ERPNextResponseCache, event_bus: Any, node_id: Optional[str] = None) -> str:
+    """Keep ERPNext response caches coherent across processes via the event bus
+
+    Local invalidations are published as ERPNEXT_CACHE_INVALIDATE_EVENT and
+    invalidations published by other nodes (e.g. the webhook receiver) are
+    applied to this cache. Returns the node ID used to ignore this node's
+    own messages.
+    """
+    node_id = node_id or f"node_{uuid.uuid4().hex[:8]}"
+
+    def publish_invalidation(scope: str, doctype: Optional[str], origin: Optional[str]):
+        if origin is not None:
+            return  # Came from another node, don't echo it back
+        try:
+            event_bus.publish_event(
+                tenant_id=scope,
+                event_type=ERPNEXT_CACHE_INVALIDATE_EVENT,
+                source="erpnext_cache",
+                data={"origin": node_id, "doctype": doctype},
+                work=False
+            )
+        except Exception as e:
+            logger.error(f"Error publishing ERPNext cache invalidation: {str(e)}")
+
+    def apply_invalidation(event: Any):
+        origin = event.data.get("origin")
+        if origin == node_id:
+            return
+        cache.invalidate(event.tenant_id, event.data.get("doctype"), origin=origin or "remote")
+
+    cache.add_listener(publish_invalidation)
+    event_bus.subscribe(ERPNEXT_CACHE_INVALIDATE_EVENT, apply_invalidation)
+
+    logger.info(f"ERPNext cache bound to event bus (node {node_id})")
+    return node_id
+
+
+# Example usage
+if __name__ == "__main__":
+    cache = ERPNextResponseCache(default_ttl=0.1, stale_seconds=1, doctype_ttls={})
+    key = cache.make_key("tenant_1", "Contact", {"email_id": "a@example.com"})
+
+    print(f"Lookup: {cache.lookup(key)[0] is MISS and 'miss'}")
+    cache.put(key, {"data": [{"name": "CONT-0001"}]}, size=64, token=cache.begin_load("tenant_1", "Contact"))
+    print(f"Lookup: {cache.lookup(key)}")
+    time.sleep(0.15)
+    print(f"Stale lookup (refresh?): {cache.lookup(key)}")
+    cache.invalidate("tenant_1", "Contact")
+    print(f"After invalidation: {cache.lookup(key)[0] is MISS and 'miss'}")
+    print(f"Stats: {cache.get_stats()}")
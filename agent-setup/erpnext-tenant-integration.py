@@ -51,7 +51,7 @@ class ERPNextTenantIntegration:
                 conn.commit()
             
             # Create client and cache it
-            client = ERPNextClient(base_url, api_key, api_secret)
+            client = ERPNextClient(base_url, api_key, api_secret, tenant_id=tenant_id)
             self.clients[tenant_id] = client
             
             logger.info(f"ERPNext configured for tenant {tenant_id}")
@@ -83,7 +83,8 @@ class ERPNextTenantIntegration:
                 client = ERPNextClient(
                     base_url=row["base_url"],
                     api_key=row["api_key"],
-                    api_secret=row["api_secret"]
+                    api_secret=row["api_secret"],
+                    tenant_id=tenant_id
                 )
                 
                 # Cache client
@@ -104,8 +105,8 @@ class ERPNextTenantIntegration:
             }
         
         try:
-            # Try a simple API call
-            result = client.get("User", filters={"name": "Administrator"}, fields=["name"])
+            # Try a simple API call (never answered from cache)
+            result = client.get("User", filters={"name": "Administrator"}, fields=["name"], use_cache=False)
             return {
                 "success": True,
                 "message": "Connection successful",
@@ -0,0 +1 @@
+erpnext-batch.py
\ No newline at end of file
@@ -0,0 +1 @@
+erpnext-cache.py
\ No newline at end of file
@@ -1,7 +1,12 @@
 """
 Event Bus - Event routing and distribution for multi-tenant system
+With Redis, subscribe() handlers run on every node (pub/sub) while
+subscribe_once() handlers and workflow engines share a stream consumer
+group, so each event starts its workflows on exactly one node
 """
 
+import os
+import socket
 import asyncio
 import logging
 import json
@@ -10,6 +15,7 @@ from datetime import datetime
 from dataclasses import dataclass
 from queue import Queue
 import threading
+import time
 
 try:
     import redis
@@ -24,6 +30,14 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Stream of events for handlers that must run once across all nodes
+WORK_STREAM = "events:work"
+WORK_GROUP = "event-workers"
+# Entries a consumer took but didn't acknowledge for this long (it died)
+# are claimed by another node
+WORK_CLAIM_IDLE_MS = 60000
+
+
 @dataclass
 class Event:
     """Event in the event bus"""
@@ -34,6 +48,7 @@ class Event:
     data: Dict[str, Any]
     timestamp: datetime
     processed: bool = False
+    work: bool = True  # Also goes to subscribe_once() handlers and workflow engines
 
 
 class EventBus:
@@ -49,7 +64,13 @@ class EventBus:
         self.tenant_isolation = tenant_isolation
         self.event_queue: Queue = Queue()
         self.event_handlers: Dict[str, List[Callable]] = {}
+        self.work_handlers: Dict[str, List[Callable]] = {}
+        self.workflow_engines: List[Any] = []
         self.redis_client = None
+        self.work_stream_maxlen = int(os.getenv("EVENT_WORK_STREAM_MAXLEN", "100000"))
+        self.consumer_name = f"{socket.gethostname()}-{os.getpid()}"
+        self._work_thread: Optional[threading.Thread] = None
+        self._work_lock = threading.Lock()
         
         # Use Redis if available
         if redis_host and REDIS_AVAILABLE:
@@ -61,6 +82,7 @@ class EventBus:
                     decode_responses=True
                 )
                 self.redis_client.ping()
+                self._create_work_group()
                 logger.info("Using Redis for event bus")
             except Exception as e:
                 logger.warning(f"Redis not available, using in-memory queue: {str(e)}")
@@ -72,9 +94,15 @@ class EventBus:
         tenant_id: str,
         event_type: str,
         source: str,
-        data: Dict[str, Any]
+        data: Dict[str, Any],
+        work: bool = True
     ) -> str:
-        """Publish an event"""
+        """Publish an event
+
+        work=False only notifies subscribe() handlers (e.g. cache
+        invalidations); otherwise the event also goes, once, to
+        subscribe_once() handlers and workflow engines.
+        """
         import uuid
         
         event_id = f"evt_{uuid.uuid4().hex[:12]}"
@@ -84,7 +112,8 @@ class EventBus:
             event_type=event_type,
             source=source,
             data=data,
-            timestamp=datetime.now()
+            timestamp=datetime.now(),
+            work=work
         )
         
         if self.redis_client:
@@ -101,6 +130,12 @@ class EventBus:
                 f"events:tenant:{tenant_id}",
                 json.dumps(event_data)
             )
+            if work:
+                # Pub/sub reaches every node; the stream hands each entry to one
+                self.redis_client.xadd(
+                    WORK_STREAM, {"event": json.dumps(event_data)},
+                    maxlen=self.work_stream_maxlen, approximate=True
+                )
         else:
             # Add to in-memory queue
             self.event_queue.put(event)
@@ -113,11 +148,36 @@ class EventBus:
         event_type: str,
         handler: Callable[[Event], None]
     ):
-        """Subscribe to an event type"""
+        """Subscribe to an event type ("*" receives every event)"""
         if event_type not in self.event_handlers:
             self.event_handlers[event_type] = []
         self.event_handlers[event_type].append(handler)
     
+    def subscribe_once(
+        self,
+        event_type: str,
+        handler: Callable[[Event], None]
+    ):
+        """Subscribe to an event type on one node only ("*" receives every event)
+
+        With Redis each event goes to one of the processes subscribed this
+        way rather than to all of them; use it for handlers with side
+        effects, like starting workflows.
+        """
+        self.work_handlers.setdefault(event_type, []).append(handler)
+        self._ensure_work_consumer()
+    
+    def add_workflow_engine(self, workflow_engine):
+        """Start a workflow engine's event-triggered workflows on matching events (on one node)"""
+        if workflow_engine not in self.workflow_engines:
+            self.workflow_engines.append(workflow_engine)
+        self._ensure_work_consumer()
+    
+    def remove_workflow_engine(self, workflow_engine):
+        """Stop dispatching events to a workflow engine"""
+        if workflow_engine in self.workflow_engines:
+            self.workflow_engines.remove(workflow_engine)
+    
     def start(self):
         """Start event bus processing"""
         self.running = True
@@ -126,6 +186,7 @@ class EventBus:
             # Start Redis subscriber
             subscriber_thread = threading.Thread(target=self._redis_subscriber_loop, daemon=True)
             subscriber_thread.start()
+            self._ensure_work_consumer()
         else:
             # Start in-memory processor
             processor_thread = threading.Thread(target=self._process_events, daemon=True)
@@ -144,19 +205,66 @@ class EventBus:
             try:
                 message = pubsub.get_message(timeout=1)
                 if message and message["type"] == "pmessage":
-                    event_data = json.loads(message["data"])
-                    event = Event(
-                        event_id=event_data["event_id"],
-                        tenant_id=event_data["tenant_id"],
-                        event_type=event_data["event_type"],
-                        source=event_data["source"],
-                        data=event_data["data"],
-                        timestamp=datetime.fromisoformat(event_data["timestamp"])
-                    )
-                    self._handle_event(event)
+                    # Stream consumers get the work; here only subscribe() handlers
+                    self._notify_handlers(self._event_from_json(message["data"]))
             except Exception as e:
                 logger.error(f"Error in Redis subscriber: {str(e)}")
     
+    def _event_from_json(self, raw: str) -> Event:
+        """Event from its published JSON"""
+        event_data = json.loads(raw)
+        return Event(
+            event_id=event_data["event_id"],
+            tenant_id=event_data["tenant_id"],
+            event_type=event_data["event_type"],
+            source=event_data["source"],
+            data=event_data["data"],
+            timestamp=datetime.fromisoformat(event_data["timestamp"])
+        )
+    
+    def _ensure_work_consumer(self):
+        """Join the work stream's consumer group once there is work to take"""
+        if not (self.running and self.redis_client and (self.work_handlers or self.workflow_engines)):
+            return
+        with self._work_lock:
+            if self._work_thread is None:
+                self._work_thread = threading.Thread(target=self._redis_work_loop, daemon=True)
+                self._work_thread.start()
+    
+    def _create_work_group(self):
+        """Create the work stream's consumer group, so entries are kept until a node takes them"""
+        try:
+            self.redis_client.xgroup_create(WORK_STREAM, WORK_GROUP, id="$", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                logger.error(f"Error creating event work group: {str(e)}")
+    
+    def _redis_work_loop(self):
+        """Take events off the work stream, sharing them with the other nodes' consumers"""
+        last_claim = 0.0
+        while self.running:
+            try:
+                entries = []
+                # Take over entries of consumers that died before acknowledging them
+                if time.monotonic() - last_claim > WORK_CLAIM_IDLE_MS / 1000:
+                    last_claim = time.monotonic()
+                    claimed = self.redis_client.xautoclaim(
+                        WORK_STREAM, WORK_GROUP, self.consumer_name, WORK_CLAIM_IDLE_MS, count=100
+                    )
+                    entries.extend(claimed[1])
+                for _, stream_entries in self.redis_client.xreadgroup(
+                    WORK_GROUP, self.consumer_name, {WORK_STREAM: ">"}, count=100, block=1000
+                ) or []:
+                    entries.extend(stream_entries)
+                
+                for entry_id, fields in entries:
+                    if fields and "event" in fields:
+                        self._dispatch_work(self._event_from_json(fields["event"]))
+                    self.redis_client.xack(WORK_STREAM, WORK_GROUP, entry_id)
+            except Exception as e:
+                logger.error(f"Error in event work consumer: {str(e)}")
+                time.sleep(1)
+    
     def _process_events(self):
         """Process events from queue"""
         while self.running:
@@ -167,22 +275,40 @@ class EventBus:
                 continue
     
     def _handle_event(self, event: Event):
-        """Handle an event"""
-        # Call registered handlers
-        handlers = self.event_handlers.get(event.event_type, [])
+        """Handle an event (in-memory queue: this process is the only node)"""
+        self._notify_handlers(event)
+        if event.work:
+            self._dispatch_work(event)
+    
+    def _notify_handlers(self, event: Event):
+        """Call subscribe() handlers"""
+        handlers = self.event_handlers.get(event.event_type, []) + self.event_handlers.get("*", [])
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                logger.error(f"Error in event handler: {str(e)}")
+    
+    def _dispatch_work(self, event: Event):
+        """Call subscribe_once() handlers and trigger workflows for the event"""
+        handlers = self.work_handlers.get(event.event_type, []) + self.work_handlers.get("*", [])
         for handler in handlers:
             try:
                 handler(event)
             except Exception as e:
                 logger.error(f"Error in event handler: {str(e)}")
         
-        # Trigger workflows for this event type
-        # This would integrate with workflow engine
-        # workflow_engine.trigger_workflows_by_event(event.tenant_id, event.event_type, event.data)
+        for workflow_engine in list(self.workflow_engines):
+            try:
+                workflow_engine.trigger_workflows_by_event(event.tenant_id, event.event_type, event.data)
+            except Exception as e:
+                logger.error(f"Error triggering workflows for {event.event_type}: {str(e)}")
     
     def stop(self):
         """Stop event bus"""
         self.running = False
+        with self._work_lock:
+            self._work_thread = None
         logger.info("Event bus stopped")
 
 
@@ -2,7 +2,6 @@
 Module Marketplace - ERPNext modules sold as services
 """
 
-import sqlite3
 import logging
 import uuid
 from typing import Dict, List, Optional, Any
@@ -13,6 +12,7 @@ import json
 
 from tenant_manager import TenantManager
 from tenant_isolation import TenantIsolation
+from platform_db import get_platform_db
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -56,51 +56,49 @@ class ModuleMarketplace:
     def __init__(self, tenant_manager: TenantManager, platform_db_path: str = "platform.db"):
         self.tenant_manager = tenant_manager
         self.platform_db_path = platform_db_path
+        self.db = get_platform_db(platform_db_path)
         self.modules: Dict[str, Module] = {}
         self._init_marketplace_tables()
         self._initialize_default_modules()
     
     def _init_marketplace_tables(self):
         """Initialize marketplace tables"""
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
-        
-        # Modules catalog table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS modules_catalog (
-                module_id VARCHAR(50) PRIMARY KEY,
-                name VARCHAR(100) NOT NULL,
-                display_name VARCHAR(255) NOT NULL,
-                description TEXT,
-                category VARCHAR(50),
-                price_monthly DECIMAL(10, 2) NOT NULL,
-                price_yearly DECIMAL(10, 2),
-                features TEXT, -- JSON array
-                dependencies TEXT, -- JSON array
-                version VARCHAR(20),
-                enabled BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Tenant modules table (already exists in tenant-schema.sql, but ensure it exists)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS tenant_modules (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tenant_id VARCHAR(50) NOT NULL,
-                module_name VARCHAR(100) NOT NULL,
-                enabled BOOLEAN DEFAULT TRUE,
-                purchased_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                expiry_date TIMESTAMP,
-                configuration TEXT, -- JSON
-                UNIQUE(tenant_id, module_name)
-            )
-        """)
-        
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tenant_modules ON tenant_modules(tenant_id, enabled)")
-        
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            # Modules catalog table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS modules_catalog (
+                    module_id VARCHAR(50) PRIMARY KEY,
+                    name VARCHAR(100) NOT NULL,
+                    display_name VARCHAR(255) NOT NULL,
+                    description TEXT,
+                    category VARCHAR(50),
+                    price_monthly DECIMAL(10, 2) NOT NULL,
+                    price_yearly DECIMAL(10, 2),
+                    features TEXT, -- JSON array
+                    dependencies TEXT, -- JSON array
+                    version VARCHAR(20),
+                    enabled BOOLEAN DEFAULT TRUE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Tenant modules table (already exists in tenant-schema.sql, but ensure it exists)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS tenant_modules (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tenant_id VARCHAR(50) NOT NULL,
+                    module_name VARCHAR(100) NOT NULL,
+                    enabled BOOLEAN DEFAULT TRUE,
+                    purchased_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    expiry_date TIMESTAMP,
+                    configuration TEXT, -- JSON
+                    UNIQUE(tenant_id, module_name)
+                )
+            """)
+            
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_tenant_modules ON tenant_modules(tenant_id, enabled)")
     
     def _initialize_default_modules(self):
         """Initialize default modules in marketplace"""
@@ -248,30 +246,27 @@ class ModuleMarketplace:
     
     def _save_module_to_db(self, module: Module):
         """Save module to database"""
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT OR REPLACE INTO modules_catalog
-            (module_id, name, display_name, description, category, price_monthly, price_yearly,
-             features, dependencies, version, enabled)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            module.module_id,
-            module.name,
-            module.display_name,
-            module.description,
-            module.category.value,
-            module.price_monthly,
-            module.price_yearly,
-            json.dumps(module.features),
-            json.dumps(module.dependencies),
-            module.version,
-            module.enabled
-        ))
-        
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                INSERT OR REPLACE INTO modules_catalog
+                (module_id, name, display_name, description, category, price_monthly, price_yearly,
+                 features, dependencies, version, enabled)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                module.module_id,
+                module.name,
+                module.display_name,
+                module.description,
+                module.category.value,
+                module.price_monthly,
+                module.price_yearly,
+                json.dumps(module.features),
+                json.dumps(module.dependencies),
+                module.version,
+                module.enabled
+            ))
     
     def list_modules(
         self,
@@ -320,23 +315,20 @@ class ModuleMarketplace:
                 }
         
         # Save tenant module
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO tenant_modules
-            (tenant_id, module_name, enabled, purchased_date, configuration)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            tenant_id,
-            module_id,
-            True,
-            datetime.now().isoformat(),
-            json.dumps({})
-        ))
-        
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                INSERT INTO tenant_modules
+                (tenant_id, module_name, enabled, purchased_date, configuration)
+                VALUES (?, ?, ?, ?, ?)
+            """, (
+                tenant_id,
+                module_id,
+                True,
+                datetime.now().isoformat(),
+                json.dumps({})
+            ))
         
         logger.info(f"Module {module_id} purchased for tenant {tenant_id}")
         
@@ -350,51 +342,46 @@ class ModuleMarketplace:
     
     def tenant_has_module(self, tenant_id: str, module_id: str) -> bool:
         """Check if tenant has a module"""
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT COUNT(*) FROM tenant_modules
-            WHERE tenant_id = ? AND module_name = ? AND enabled = TRUE
-        """, (tenant_id, module_id))
-        
-        count = cursor.fetchone()[0]
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT COUNT(*) FROM tenant_modules
+                WHERE tenant_id = ? AND module_name = ? AND enabled = TRUE
+            """, (tenant_id, module_id))
+            
+            count = cursor.fetchone()[0]
         
         return count > 0
     
     def get_tenant_modules(self, tenant_id: str) -> List[Dict[str, Any]]:
         """Get all modules for a tenant"""
-        conn = sqlite3.connect(self.platform_db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT tm.*, mc.display_name, mc.description, mc.category
-            FROM tenant_modules tm
-            LEFT JOIN modules_catalog mc ON tm.module_name = mc.module_id
-            WHERE tm.tenant_id = ? AND tm.enabled = TRUE
-        """, (tenant_id,))
-        
-        rows = cursor.fetchall()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT tm.*, mc.display_name, mc.description, mc.category
+                FROM tenant_modules tm
+                LEFT JOIN modules_catalog mc ON tm.module_name = mc.module_id
+                WHERE tm.tenant_id = ? AND tm.enabled = TRUE
+            """, (tenant_id,))
+            
+            rows = cursor.fetchall()
         
         return [dict(row) for row in rows]
     
     def enable_module(self, tenant_id: str, module_id: str) -> bool:
         """Enable a module for tenant"""
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE tenant_modules
-            SET enabled = TRUE
-            WHERE tenant_id = ? AND module_name = ?
-        """, (tenant_id, module_id))
-        
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                UPDATE tenant_modules
+                SET enabled = TRUE
+                WHERE tenant_id = ? AND module_name = ?
+            """, (tenant_id, module_id))
+            
+            success = cursor.rowcount > 0
         
         if success:
             logger.info(f"Module {module_id} enabled for tenant {tenant_id}")
@@ -403,18 +390,16 @@ class ModuleMarketplace:
     
     def disable_module(self, tenant_id: str, module_id: str) -> bool:
         """Disable a module for tenant"""
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE tenant_modules
-            SET enabled = FALSE
-            WHERE tenant_id = ? AND module_name = ?
-        """, (tenant_id, module_id))
-        
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                UPDATE tenant_modules
+                SET enabled = FALSE
+                WHERE tenant_id = ? AND module_name = ?
+            """, (tenant_id, module_id))
+            
+            success = cursor.rowcount > 0
         
         if success:
             logger.info(f"Module {module_id} disabled for tenant {tenant_id}")
@@ -423,17 +408,15 @@ class ModuleMarketplace:
     
     def uninstall_module(self, tenant_id: str, module_id: str) -> bool:
         """Uninstall module from tenant"""
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            DELETE FROM tenant_modules
-            WHERE tenant_id = ? AND module_name = ?
-        """, (tenant_id, module_id))
-        
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                DELETE FROM tenant_modules
+                WHERE tenant_id = ? AND module_name = ?
+            """, (tenant_id, module_id))
+            
+            success = cursor.rowcount > 0
         
         if success:
             logger.info(f"Module {module_id} uninstalled from tenant {tenant_id}")
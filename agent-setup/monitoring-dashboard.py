@@ -5,6 +5,7 @@ Monitoring Dashboard - API endpoints for monitoring and dashboards
 from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Dict, List, Optional, Any
+import asyncio
 import logging
 
 from tenant_manager import TenantManager
@@ -12,6 +13,7 @@ from tenant_isolation import TenantIsolation
 from metrics_collector import MetricsCollector
 from usage_tracker import UsageTracker
 from employee_agent_system import EmployeeAgentSystem
+from async_db import AsyncFacade, get_db_executor, shutdown_db_executor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -36,6 +38,18 @@ metrics_collector = MetricsCollector(tenant_isolation)
 usage_tracker = UsageTracker(tenant_manager)
 agent_system = EmployeeAgentSystem(tenant_isolation)
 
+# Blocking sqlite calls run on a bounded thread pool, never on the event loop
+db_executor = get_db_executor()
+async_tenant_manager = AsyncFacade(tenant_manager, db_executor)
+async_usage_tracker = AsyncFacade(usage_tracker, db_executor)
+async_agent_system = AsyncFacade(agent_system, db_executor)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the DB executor on shutdown"""
+    shutdown_db_executor()
+
 
 @app.get("/")
 async def root():
@@ -50,21 +64,19 @@ async def root():
 @app.get("/api/v1/{tenant_id}/dashboard/overview")
 async def get_dashboard_overview(tenant_id: str):
     """Get dashboard overview for tenant"""
-    tenant = tenant_manager.get_tenant(tenant_id)
+    tenant = await async_tenant_manager.get_tenant(tenant_id)
     if not tenant:
         raise HTTPException(status_code=404, detail="Tenant not found")
     
     # Get metrics summary
     metrics_summary = metrics_collector.get_metric_summary(tenant_id)
     
-    # Get usage
-    usage = usage_tracker.get_current_month_usage(tenant_id)
-    
-    # Get agents
-    agents = agent_system.list_agents(tenant_id)
-    
-    # Get quota
-    quota = tenant_manager.get_tenant_quota(tenant_id)
+    # Get usage, agents and quota concurrently
+    usage, agents, quota = await asyncio.gather(
+        async_usage_tracker.get_current_month_usage(tenant_id),
+        async_agent_system.list_agents(tenant_id),
+        async_tenant_manager.get_tenant_quota(tenant_id)
+    )
     
     return {
         "tenant_id": tenant_id,
@@ -108,9 +120,11 @@ async def get_metrics(
 @app.get("/api/v1/{tenant_id}/dashboard/usage")
 async def get_usage(tenant_id: str):
     """Get usage for tenant"""
-    usage = usage_tracker.get_current_month_usage(tenant_id)
-    quota = tenant_manager.get_tenant_quota(tenant_id)
-    quota_check = usage_tracker.check_quota_exceeded(tenant_id)
+    usage, quota, quota_check = await asyncio.gather(
+        async_usage_tracker.get_current_month_usage(tenant_id),
+        async_tenant_manager.get_tenant_quota(tenant_id),
+        async_usage_tracker.check_quota_exceeded(tenant_id)
+    )
     
     return {
         "tenant_id": tenant_id,
@@ -124,7 +138,7 @@ async def get_usage(tenant_id: str):
 @app.get("/api/v1/{tenant_id}/dashboard/agents")
 async def get_agents_dashboard(tenant_id: str):
     """Get agents dashboard data"""
-    agents = agent_system.list_agents(tenant_id)
+    agents = await async_agent_system.list_agents(tenant_id)
     
     # Group by department
     by_department = {}
@@ -155,7 +169,7 @@ async def get_agents_dashboard(tenant_id: str):
 @app.get("/api/admin/dashboard/overview")
 async def get_admin_dashboard():
     """Get admin dashboard overview"""
-    tenants = tenant_manager.list_tenants(limit=1000)
+    tenants = await async_tenant_manager.list_tenants(limit=1000)
     
     total_tenants = len(tenants)
     active_tenants = sum(1 for t in tenants if t.status == "active")
@@ -0,0 +1,174 @@
+"""
+Platform DB - Pooled SQLite connections for the platform database
+One long-lived, tuned connection per thread, shared by all platform managers
+"""
+
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional
+from contextlib import contextmanager
+from pathlib import Path
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Pragmas applied to every pooled connection
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",       # Readers don't block the writer
+    "synchronous": "NORMAL",     # Safe with WAL, avoids fsync per commit
+    "busy_timeout": 5000,        # Wait on the write lock instead of failing
+    "cache_size": -16000,        # ~16MB page cache per connection
+    "temp_store": "MEMORY",
+    "mmap_size": 134217728       # 128MB memory-mapped reads
+}
+
+
+class PlatformDatabase:
+    """Thread-local pool of long-lived connections to the platform database"""
+
+    def __init__(
+        self,
+        db_path: str = "platform.db",
+        pragmas: Optional[Dict[str, object]] = None,
+        cached_statements: int = 256
+    ):
+        self.db_path = str(db_path)
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open and tune a new connection for the current thread"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.pragmas.get("busy_timeout", 5000) / 1000,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = sqlite3.Row
+
+        for name, value in self.pragmas.items():
+            try:
+                conn.execute(f"PRAGMA {name} = {value}")
+            except sqlite3.DatabaseError as e:
+                logger.warning(f"Could not apply PRAGMA {name}={value}: {e}")
+
+        with self._lock:
+            self._connections.append(conn)
+
+        logger.debug(f"Opened platform DB connection for thread {threading.get_ident()}")
+        return conn
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Get the current thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding the thread's connection
+
+        The outermost block commits on success and rolls back on error, so
+        nested calls (e.g. a manager method calling another manager) share
+        one transaction instead of committing each other's partial work.
+        """
+        conn = self.get_connection()
+        self._local.depth += 1
+        try:
+            yield conn
+            if self._local.depth == 1:
+                conn.commit()
+        except Exception:
+            if self._local.depth == 1:
+                conn.rollback()
+            raise
+        finally:
+            self._local.depth -= 1
+
+    def close_thread_connection(self):
+        """Close the current thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+        self._local.conn = None
+
+    def close_all(self):
+        """Close every pooled connection (call on shutdown)"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # Connection owned by another thread; it dies with the process
+                pass
+
+        self._local = threading.local()
+        logger.info(f"Closed {len(connections)} platform DB connections")
+
+    def get_stats(self) -> Dict[str, object]:
+        """Get pool statistics"""
+        with self._lock:
+            open_connections = len(self._connections)
+
+        return {
+            "db_path": self.db_path,
+            "open_connections": open_connections,
+            "pragmas": dict(self.pragmas)
+        }
+
+
+# Shared pools, one per database file
+_pools: Dict[str, PlatformDatabase] = {}
+_pools_lock = threading.Lock()
+
+
+def get_platform_db(db_path: str = "platform.db") -> PlatformDatabase:
+    """Get the shared connection pool for a platform database path"""
+    key = str(Path(db_path).resolve())
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = PlatformDatabase(db_path)
+                _pools[key] = pool
+    return pool
+
+
+def close_all_pools():
+    """Close all shared platform database pools"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+
+    for pool in pools:
+        pool.close_all()
+
+
+# Example usage
+if __name__ == "__main__":
+    db = get_platform_db("platform.db")
+
+    with db.connection() as conn:
+        row = conn.execute("PRAGMA journal_mode").fetchone()
+        print(f"Journal mode: {row[0]}")
+
+    print(f"Pool stats: {db.get_stats()}")
+    close_all_pools()
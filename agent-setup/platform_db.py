@@ -0,0 +1 @@
+platform-db.py
\ No newline at end of file
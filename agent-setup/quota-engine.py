@@ -0,0 +1,266 @@
+"""
+Quota Engine - In-memory quota enforcement for tenants
+Keeps per-tenant plan limits and current-period usage in memory so quota
+decisions are O(1) dictionary lookups instead of database round trips
+"""
+
+import os
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from tenant_manager import TenantManager
+from usage_tracker import UsageTracker
+from usage_buffer import UsageKey
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Usage metric -> quota limit it is checked against
+QUOTA_LIMITS = {
+    "agents": "max_agents",
+    "workflows": "max_workflows",
+    "api_calls": "max_api_calls",
+    "storage_gb": "max_storage_gb"
+}
+
+
+@dataclass
+class TenantQuotaState:
+    """Cached limits and flushed usage for one tenant"""
+    tier: Optional[str]
+    limits: Dict[str, Any]
+    usage: Dict[str, int] = field(default_factory=dict)
+    refreshed_at: float = 0.0
+
+
+class QuotaEngine:
+    """Answers quota checks from memory
+
+    Limits are loaded once per tenant and dropped when the tenant is
+    invalidated (a plan change goes through update_tenant). Usage is the
+    flushed database value, refreshed after every usage flush and every
+    refresh_interval seconds, plus the tracker's unflushed counters.
+    """
+
+    def __init__(
+        self,
+        tenant_manager: TenantManager,
+        usage_tracker: UsageTracker,
+        refresh_interval: Optional[float] = None
+    ):
+        self.tenant_manager = tenant_manager
+        self.usage_tracker = usage_tracker
+        self.refresh_interval = refresh_interval or float(os.getenv("QUOTA_REFRESH_INTERVAL", "30"))
+        self._entries: Dict[str, TenantQuotaState] = {}
+        self._plan_limits: Dict[str, Dict[str, Any]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._period = self._compute_period()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Statistics
+        self.checks = 0
+        self.loads = 0
+        self.refreshes = 0
+        self.exceeded = 0
+
+        tenant_manager.cache.add_listener(self._on_tenant_invalidated)
+        if usage_tracker.buffer:
+            usage_tracker.buffer.add_flush_listener(self._on_usage_flushed)
+        usage_tracker.quota_engine = self
+
+    @staticmethod
+    def _compute_period() -> Tuple[str, str, float]:
+        """Get the current period bounds and the epoch time it ends"""
+        period_start, period_end = UsageTracker._current_period()
+        next_start = (period_end + timedelta(days=1)).timestamp()
+        return period_start.isoformat(), period_end.isoformat(), next_start
+
+    def _current_period(self) -> Tuple[str, str, float]:
+        """Get the current period, resetting usage when a new one begins"""
+        period = self._period
+        if time.time() >= period[2]:
+            period = self._compute_period()
+            with self._lock:
+                self._period = period
+                for state in self._entries.values():
+                    state.usage = {}
+        return period
+
+    def is_loaded(self, tenant_id: str) -> bool:
+        """Check whether a tenant can be checked without touching the database"""
+        return tenant_id in self._entries
+
+    def get_tier(self, tenant_id: str) -> Optional[str]:
+        """Get a loaded tenant's subscription tier"""
+        state = self._entries.get(tenant_id)
+        return state.tier if state else None
+
+    def load_tenant(self, tenant_id: str) -> TenantQuotaState:
+        """Load a tenant's limits and usage from the database"""
+        token = self._generation
+        tenant = self.tenant_manager.get_tenant(tenant_id)
+        tier = tenant.subscription_tier if tenant else None
+        limits = self._get_plan_limits(tier) if tier else {}
+
+        period = self._current_period()
+        usage = self._read_usage([tenant_id], period[0]).get(tenant_id, {})
+        state = TenantQuotaState(tier=tier, limits=limits, usage=usage, refreshed_at=time.monotonic())
+
+        with self._lock:
+            # Don't cache a load that raced with an invalidation
+            if token == self._generation:
+                self._entries[tenant_id] = state
+            self.loads += 1
+        return state
+
+    def _get_plan_limits(self, tier: str) -> Dict[str, Any]:
+        """Get plan limits for a tier, cached until invalidate_plans()"""
+        limits = self._plan_limits.get(tier)
+        if limits is None:
+            limits = self.tenant_manager.get_plan_quota(tier)
+            self._plan_limits[tier] = limits
+        return limits
+
+    def _read_usage(self, tenant_ids: List[str], period_start: str) -> Dict[str, Dict[str, int]]:
+        """Read flushed usage for tenants in one period"""
+        metric_names = list(QUOTA_LIMITS)
+        usage: Dict[str, Dict[str, int]] = {}
+
+        with self.usage_tracker.db.connection() as conn:
+            # Chunked to stay under SQLite's bound parameter limit
+            for i in range(0, len(tenant_ids), 500):
+                chunk = tenant_ids[i:i + 500]
+                rows = conn.execute(f"""
+                    SELECT tenant_id, metric_name, usage_count FROM usage_records
+                    WHERE tenant_id IN ({", ".join("?" for _ in chunk)})
+                    AND metric_name IN ({", ".join("?" for _ in metric_names)})
+                    AND period_start = ?
+                """, [*chunk, *metric_names, period_start]).fetchall()
+
+                for row in rows:
+                    usage.setdefault(row["tenant_id"], {})[row["metric_name"]] = row["usage_count"]
+
+        return usage
+
+    def refresh_usage(self, tenant_ids: Optional[List[str]] = None):
+        """Re-read flushed usage for the given (default: all loaded) tenants"""
+        with self._refresh_lock:
+            if tenant_ids is None:
+                tenant_ids = list(self._entries)
+            tenant_ids = [tenant_id for tenant_id in tenant_ids if tenant_id in self._entries]
+            if not tenant_ids:
+                return
+
+            period = self._current_period()
+            usage = self._read_usage(tenant_ids, period[0])
+            now = time.monotonic()
+            for tenant_id in tenant_ids:
+                state = self._entries.get(tenant_id)
+                if state is not None:
+                    state.usage = usage.get(tenant_id, {})
+                    state.refreshed_at = now
+            self.refreshes += 1
+
+    def check(self, tenant_id: str, metrics: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Check a tenant's quotas, same result shape as check_quota_exceeded
+
+        O(1) for loaded tenants; unloaded tenants are loaded first, so async
+        callers should load_tenant() on the DB executor when not is_loaded().
+        """
+        state = self._entries.get(tenant_id)
+        if state is None:
+            state = self.load_tenant(tenant_id)
+
+        self.checks += 1
+        violations = []
+        if state.limits:
+            period_start, period_end, _ = self._current_period()
+            buffer = self.usage_tracker.buffer
+
+            for metric_name in metrics or QUOTA_LIMITS:
+                limit = state.limits.get(QUOTA_LIMITS[metric_name])
+                if not limit:
+                    continue
+
+                usage = state.usage.get(metric_name, 0)
+                if buffer:
+                    key: UsageKey = (tenant_id, metric_name, period_start, period_end)
+                    usage += buffer.pending_count(key)
+
+                if usage >= limit:
+                    violations.append({
+                        "metric": metric_name,
+                        "limit": limit,
+                        "usage": usage
+                    })
+
+        if violations:
+            self.exceeded += 1
+        return {
+            "exceeded": len(violations) > 0,
+            "violations": violations
+        }
+
+    def invalidate_tenant(self, tenant_id: str):
+        """Drop a tenant's cached limits and usage"""
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(tenant_id, None)
+
+    def invalidate_plans(self):
+        """Drop cached plan limits (call after editing subscription_plans)"""
+        with self._lock:
+            self._generation += 1
+            self._plan_limits.clear()
+            self._entries.clear()
+
+    def _on_tenant_invalidated(self, tenant_id: str, keys, origin):
+        """Tenant cache listener: tenant updated, deleted or plan changed"""
+        self.invalidate_tenant(tenant_id)
+
+    def _on_usage_flushed(self, rows: List[Tuple[UsageKey, int]]):
+        """Usage buffer listener: pick up the flushed totals"""
+        self.refresh_usage(list({key[0] for key, _ in rows}))
+
+    def start(self):
+        """Start periodic refresh (picks up usage written by other nodes)"""
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, daemon=True)
+        self._thread.start()
+        logger.info(f"Quota engine started (refresh every {self.refresh_interval}s)")
+
+    def _refresh_loop(self):
+        """Refresh all loaded tenants every refresh_interval seconds"""
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh_usage()
+            except Exception as e:
+                logger.error(f"Error refreshing quota usage: {str(e)}")
+
+    def stop(self):
+        """Stop periodic refresh"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get engine statistics"""
+        return {
+            "tenants_loaded": len(self._entries),
+            "plans_cached": len(self._plan_limits),
+            "checks": self.checks,
+            "loads": self.loads,
+            "refreshes": self.refreshes,
+            "exceeded": self.exceeded
+        }
@@ -0,0 +1,336 @@
+"""
+Rate Limiter - Token-bucket rate limiting per tenant and per API key
+Limits come from subscription plan tiers; buckets live in-process or in
+Redis so every gateway node shares them
+"""
+
+import time
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import Counter
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+from subscription_plans import SubscriptionPlanManager
+
+
+SCOPE_TENANT = "tenant"
+SCOPE_API_KEY = "api_key"
+
+if PROMETHEUS_AVAILABLE:
+    RATE_LIMIT_CHECKS = Counter(
+        'dogansystem_rate_limit_checks_total', 'Rate limit decisions', ['scope', 'result']
+    )
+    RATE_LIMITED = Counter(
+        'dogansystem_rate_limited_total', 'Requests rejected by the rate limiter', ['tenant_id', 'scope']
+    )
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Token bucket parameters"""
+    rate: float  # Tokens added per second
+    burst: int   # Bucket capacity
+
+
+@dataclass
+class RateLimitDecision:
+    """Outcome of a rate limit check"""
+    allowed: bool
+    scope: Optional[str] = None  # Scope that rejected the request
+    limit: Optional[RateLimit] = None
+    remaining: int = 0
+    retry_after: float = 0.0  # Seconds until a token is available
+
+    def headers(self) -> Dict[str, str]:
+        """HTTP headers describing the decision"""
+        headers = {}
+        if self.limit:
+            headers["X-RateLimit-Limit"] = str(self.limit.burst)
+            headers["X-RateLimit-Remaining"] = str(self.remaining)
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, int(self.retry_after + 0.999)))
+        return headers
+
+
+class _BucketShard:
+    """One lock-protected slice of the in-process buckets"""
+
+    __slots__ = ("lock", "buckets", "operations")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> (tokens, last refill time, time the bucket is full again)
+        self.buckets: Dict[str, Tuple[float, float, float]] = {}
+        self.operations = 0
+
+
+class InMemoryRateLimitBackend:
+    """Token buckets held in this process"""
+
+    is_local = True
+
+    def __init__(self, num_shards: int = 16, sweep_every: int = 10000):
+        self._shards = [_BucketShard() for _ in range(num_shards)]
+        self.sweep_every = sweep_every
+
+    def acquire(self, buckets: List[Tuple[str, RateLimit]], cost: int = 1) -> Tuple[bool, List[float], List[float]]:
+        """Take tokens from every bucket or from none, returns
+        (allowed, tokens left per bucket, retry after per bucket)"""
+        now = time.monotonic()
+        shards = [self._shards[hash(key) % len(self._shards)] for key, _ in buckets]
+        # Lock in a fixed order so concurrent multi-bucket checks can't deadlock
+        locked = sorted(set(shards), key=id)
+        for shard in locked:
+            shard.lock.acquire()
+        try:
+            levels = []
+            for shard, (key, limit) in zip(shards, buckets):
+                bucket = shard.buckets.get(key)
+                if bucket is None:
+                    levels.append(float(limit.burst))
+                else:
+                    levels.append(min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate))
+
+            retry_afters = [
+                0.0 if tokens >= cost else (cost - tokens) / limit.rate
+                for tokens, (_, limit) in zip(levels, buckets)
+            ]
+            allowed = not any(retry_afters)
+            if allowed:
+                levels = [tokens - cost for tokens in levels]
+
+            for shard, (key, limit), tokens in zip(shards, buckets, levels):
+                shard.buckets[key] = (tokens, now, now + (limit.burst - tokens) / limit.rate)
+
+            for shard in locked:
+                shard.operations += 1
+                if shard.operations >= self.sweep_every:
+                    # A full bucket is the same as no bucket, so drop idle ones
+                    shard.operations = 0
+                    for idle_key in [k for k, b in shard.buckets.items() if b[2] <= now]:
+                        del shard.buckets[idle_key]
+        finally:
+            for shard in locked:
+                shard.lock.release()
+
+        return allowed, levels, retry_afters
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get backend statistics"""
+        return {
+            "backend": "memory",
+            "buckets": sum(len(shard.buckets) for shard in self._shards)
+        }
+
+
+# Refill the buckets and take tokens from all of them or none, atomically
+# on the Redis server. ARGV: rate and burst per key, then now and cost.
+TOKEN_BUCKET_SCRIPT = """
+local count = #KEYS
+local now = tonumber(ARGV[2 * count + 1])
+local cost = tonumber(ARGV[2 * count + 2])
+
+local levels = {}
+local retry_afters = {}
+local allowed = 1
+for i = 1, count do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local burst = tonumber(ARGV[2 * i])
+    local bucket = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1])
+    local ts = tonumber(bucket[2])
+    if tokens == nil then
+        tokens = burst
+        ts = now
+    end
+
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    retry_afters[i] = 0
+    if tokens < cost then
+        retry_afters[i] = (cost - tokens) / rate
+        allowed = 0
+    end
+end
+
+local result = {allowed}
+for i = 1, count do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local burst = tonumber(ARGV[2 * i])
+    if allowed == 1 then
+        levels[i] = levels[i] - cost
+    end
+    redis.call('HSET', KEYS[i], 'tokens', levels[i], 'ts', now)
+    redis.call('PEXPIRE', KEYS[i], math.ceil(burst / rate * 1000) + 1000)
+    table.insert(result, tostring(levels[i]))
+    table.insert(result, tostring(retry_afters[i]))
+end
+return result
+"""
+
+
+class RedisRateLimitBackend:
+    """Token buckets shared by all gateway nodes through Redis
+
+    Fails open: if Redis is unreachable the request is allowed and the
+    error counted, so a Redis outage doesn't take the gateway down.
+    """
+
+    is_local = False
+
+    def __init__(self, redis_client: Any, key_prefix: str = "dogansystem:ratelimit:"):
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+        self.errors = 0
+
+    def acquire(self, buckets: List[Tuple[str, RateLimit]], cost: int = 1) -> Tuple[bool, List[float], List[float]]:
+        """Take tokens from every bucket or from none, returns
+        (allowed, tokens left per bucket, retry after per bucket)"""
+        args = []
+        for _, limit in buckets:
+            args += [limit.rate, limit.burst]
+        try:
+            result = self._script(
+                keys=[self.key_prefix + key for key, _ in buckets],
+                args=args + [time.time(), cost]
+            )
+            return bool(int(result[0])), [float(t) for t in result[1::2]], [float(r) for r in result[2::2]]
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Redis rate limit check failed, allowing request: {str(e)}")
+            return True, [float(limit.burst) for _, limit in buckets], [0.0] * len(buckets)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get backend statistics"""
+        return {
+            "backend": "redis",
+            "errors": self.errors
+        }
+
+
+class RateLimiter:
+    """Per-tenant and per-API-key rate limiting based on plan tiers"""
+
+    def __init__(
+        self,
+        plan_manager: SubscriptionPlanManager,
+        backend: Optional[Any] = None,
+        default_tier: str = "starter"
+    ):
+        self.plan_manager = plan_manager
+        self.backend = backend or InMemoryRateLimitBackend()
+        self.default_tier = default_tier
+        self._limits: Dict[str, Tuple[Optional[RateLimit], Optional[RateLimit]]] = {}
+        self._stats_lock = threading.Lock()
+
+        # Statistics
+        self.allowed = 0
+        self.limited = {SCOPE_TENANT: 0, SCOPE_API_KEY: 0}
+
+    def get_limits(self, tier: Optional[str]) -> Tuple[Optional[RateLimit], Optional[RateLimit]]:
+        """Get (tenant limit, API key limit) for a tier, None means unlimited"""
+        tier = tier or self.default_tier
+        limits = self._limits.get(tier)
+        if limits is None:
+            plan = self.plan_manager.get_plan_by_tier(tier) or self.plan_manager.get_plan_by_tier(self.default_tier)
+            tenant_limit = key_limit = None
+
+            if plan and plan.requests_per_minute:
+                burst = plan.burst_size or max(1, plan.requests_per_minute // 6)
+                tenant_limit = RateLimit(rate=plan.requests_per_minute / 60, burst=burst)
+
+                if plan.api_key_requests_per_minute:
+                    key_burst = max(1, burst * plan.api_key_requests_per_minute // plan.requests_per_minute)
+                    key_limit = RateLimit(rate=plan.api_key_requests_per_minute / 60, burst=key_burst)
+
+            limits = (tenant_limit, key_limit)
+            self._limits[tier] = limits
+        return limits
+
+    def invalidate_limits(self):
+        """Drop cached limits (call after changing plan definitions)"""
+        self._limits.clear()
+
+    def check(self, tenant_id: str, tier: Optional[str], api_key: Optional[str] = None, cost: int = 1) -> RateLimitDecision:
+        """Take a token for a request from the tenant and the API key bucket
+
+        Tokens are taken from both buckets or neither, so a request the API
+        key bucket rejects doesn't use up the tenant's quota.
+        """
+        tenant_limit, key_limit = self.get_limits(tier)
+
+        checks = [(SCOPE_TENANT, f"tenant:{tenant_id}", tenant_limit)]
+        if api_key:
+            # Bucket keys never contain the raw API key
+            key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:32]
+            checks.append((SCOPE_API_KEY, f"key:{tenant_id}:{key_hash}", key_limit))
+        checks = [check for check in checks if check[2] is not None]
+        if not checks:
+            with self._stats_lock:
+                self.allowed += 1
+            return RateLimitDecision(allowed=True)
+
+        allowed, levels, retry_afters = self.backend.acquire(
+            [(bucket_key, limit) for _, bucket_key, limit in checks], cost
+        )
+
+        if not allowed:
+            # Report the first bucket that was short, tenant before API key
+            index = next(i for i, retry_after in enumerate(retry_afters) if retry_after > 0)
+            scope, _, limit = checks[index]
+            if PROMETHEUS_AVAILABLE:
+                RATE_LIMIT_CHECKS.labels(scope=scope, result="limited").inc()
+                RATE_LIMITED.labels(tenant_id=tenant_id, scope=scope).inc()
+            with self._stats_lock:
+                self.limited[scope] += 1
+            return RateLimitDecision(
+                allowed=False,
+                scope=scope,
+                limit=limit,
+                remaining=0,
+                retry_after=max(retry_afters)
+            )
+
+        if PROMETHEUS_AVAILABLE:
+            for scope, _, _ in checks:
+                RATE_LIMIT_CHECKS.labels(scope=scope, result="allowed").inc()
+        with self._stats_lock:
+            self.allowed += 1
+
+        # Report the tightest bucket
+        index = min(range(len(checks)), key=lambda i: levels[i])
+        return RateLimitDecision(allowed=True, limit=checks[index][2], remaining=int(levels[index]))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter statistics"""
+        with self._stats_lock:
+            stats = {
+                "allowed": self.allowed,
+                "limited_tenant": self.limited[SCOPE_TENANT],
+                "limited_api_key": self.limited[SCOPE_API_KEY]
+            }
+        stats.update(self.backend.get_stats())
+        return stats
+
+
+# Example usage
+if __name__ == "__main__":
+    limiter = RateLimiter(SubscriptionPlanManager())
+
+    results = [limiter.check("tenant_demo", "starter").allowed for _ in range(50)]
+    print(f"Allowed {sum(results)} of {len(results)} burst requests")
+
+    decision = limiter.check("tenant_demo", "starter")
+    print(f"Decision: allowed={decision.allowed}, headers={decision.headers()}")
+    print(f"Stats: {limiter.get_stats()}")
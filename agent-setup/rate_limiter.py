@@ -0,0 +1 @@
+rate-limiter.py
\ No newline at end of file
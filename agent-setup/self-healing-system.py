@@ -4,8 +4,10 @@ Automatically detects and fixes issues without human intervention
 """
 
 import asyncio
+import json
 import logging
 import time
+import functools
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 from dataclasses import dataclass
@@ -14,6 +16,8 @@ import requests
 import threading
 
 from agent_orchestrator import ERPNextClient
+from async_erpnext_client import as_async_client
+from workflow_runtime import WorkflowRuntime, get_workflow_runtime
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -73,8 +77,12 @@ class AutoFixAction:
 class SelfHealingSystem:
     """Self-healing system for autonomous operations"""
 
-    def __init__(self, erpnext_client: ERPNextClient):
+    def __init__(self, erpnext_client: ERPNextClient, runtime: Optional[WorkflowRuntime] = None):
         self.erpnext = erpnext_client
+        self.async_erpnext = as_async_client(erpnext_client)
+        # Checks run on this long-lived loop (the shared workflow runtime unless
+        # given), so the async client's connection pool is reused across checks
+        self.runtime = runtime
         self.health_checks: Dict[str, HealthCheck] = {}
         self.issues: Dict[str, SystemIssue] = {}
         self.auto_fix_actions: Dict[str, List[AutoFixAction]] = {}
@@ -153,6 +161,10 @@ class SelfHealingSystem:
             else:
                 result = {"success": False, "error": f"Unknown check type: {check.check_type}"}
 
+            # ERPNext checks are the recovery probes of the site's circuit breaker
+            if self._probes_erpnext(check):
+                self.erpnext.breaker.record_health(result.get("success", False), result.get("response_time", 0))
+
             # Record check result
             check_result = {
                 "timestamp": datetime.now().isoformat(),
@@ -190,6 +202,17 @@ class SelfHealingSystem:
             logger.error(f"Error running health check {check_id}: {str(e)}")
             return {"success": False, "error": str(e)}
 
+    def _probes_erpnext(self, check: HealthCheck) -> bool:
+        """Whether a check calls this system's ERPNext site"""
+        if check.check_type == "database":
+            return True
+        return check.check_type == "api" and self._is_erpnext_url(str(check.check_config.get("url", "")))
+
+    def _is_erpnext_url(self, url: str) -> bool:
+        """Whether a URL is on this system's ERPNext site (and may get its credentials)"""
+        base_url = self.erpnext.base_url.rstrip("/")
+        return url == base_url or url.startswith((base_url + "/", base_url + "?"))
+
     async def _check_api(self, config: Dict) -> Dict:
         """Check API endpoint"""
         start_time = time.time()
@@ -198,7 +221,15 @@ class SelfHealingSystem:
             method = config.get("method", "GET")
             expected_status = config.get("expected_status", 200)
 
-            response = requests.request(method, url, timeout=30)
+            if self._is_erpnext_url(url):
+                response = await self.async_erpnext.request(
+                    method, url, timeout=config.get("timeout", 30), raise_for_status=False, use_breaker=False
+                )
+            else:
+                # Other endpoints get a plain request, without the ERPNext auth headers
+                response = await asyncio.get_running_loop().run_in_executor(
+                    None, functools.partial(requests.request, method, url, timeout=config.get("timeout", 30))
+                )
             response_time = time.time() - start_time
 
             success = response.status_code == expected_status
@@ -220,11 +251,16 @@ class SelfHealingSystem:
         """Check database connectivity"""
         start_time = time.time()
         try:
-            # Try a simple ERPNext API call that requires database
-            result = self.erpnext.get("User", filters={"name": "Administrator"}, fields=["name"])
+            # Try a simple ERPNext API call that requires database (never answered
+            # from cache, and let through even while the site's circuit is open)
+            response = await self.async_erpnext.request(
+                "GET", "/api/resource/User",
+                params={"filters": json.dumps({"name": "Administrator"}), "fields": json.dumps(["name"])},
+                timeout=config.get("timeout", 30), use_breaker=False
+            )
             response_time = time.time() - start_time
 
-            success = result is not None
+            success = response.json() is not None
 
             return {
                 "success": success,
@@ -340,6 +376,8 @@ class SelfHealingSystem:
     def start_monitoring(self):
         """Start the monitoring system"""
         self.running = True
+        if self.runtime is None:
+            self.runtime = get_workflow_runtime()
         monitor_thread = threading.Thread(target=self._monitoring_loop, daemon=True)
         monitor_thread.start()
         logger.info("Self-healing monitoring system started")
@@ -349,7 +387,7 @@ class SelfHealingSystem:
         while self.running:
             try:
                 for check_id, check in self.health_checks.items():
-                    asyncio.run(self.run_health_check(check_id))
+                    self.runtime.run(self.run_health_check(check_id))
                     time.sleep(check.interval)
             except Exception as e:
                 logger.error(f"Error in monitoring loop: {str(e)}")
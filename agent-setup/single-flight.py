@@ -0,0 +1,185 @@
+"""
+Single Flight - Coalesces identical in-flight calls
+Concurrent callers asking for the same key share one execution of the
+call and all receive its result (or its exception)
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """An in-flight call and its outcome"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Thread-based single flight: one caller runs, the others wait for it"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """Run func() unless a call with the same key is in flight, then share its result"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = func()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics"""
+        with self._lock:
+            in_flight = len(self._calls)
+        return _stats(self.executed, self.coalesced, in_flight)
+
+
+class AsyncSingleFlight:
+    """asyncio single flight: callers on one event loop share one task per key
+
+    The shared call runs as its own task, so a caller that is cancelled
+    doesn't cancel it for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Task]] = {}
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Await func() unless a call with the same key is in flight, then share its result"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            calls = self._calls.setdefault(loop, {})
+            task = calls.get(key)
+            if task is not None:
+                self.coalesced += 1
+            else:
+                task = loop.create_task(func())
+                calls[key] = task
+                task.add_done_callback(lambda _: self._forget(loop, key))
+                self.executed += 1
+
+        return await asyncio.shield(task)
+
+    def _forget(self, loop: asyncio.AbstractEventLoop, key: Hashable):
+        """Drop a finished call so the next caller starts a new one"""
+        with self._lock:
+            calls = self._calls.get(loop)
+            if calls is not None:
+                calls.pop(key, None)
+                if not calls:
+                    del self._calls[loop]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics"""
+        with self._lock:
+            in_flight = sum(len(calls) for calls in self._calls.values())
+        return _stats(self.executed, self.coalesced, in_flight)
+
+
+def _stats(executed: int, coalesced: int, in_flight: int) -> Dict[str, Any]:
+    """Render coalescing counters for reporting"""
+    total = executed + coalesced
+    return {
+        "calls": total,
+        "executed": executed,
+        "coalesced": coalesced,
+        "coalesce_rate": (coalesced / total) if total else 0.0,
+        "in_flight": in_flight
+    }
+
+
+# Shared by every ERPNext client in the process; keys carry the tenant scope
+_erpnext_reads = SingleFlight()
+_async_erpnext_reads = AsyncSingleFlight()
+
+
+def get_erpnext_single_flight() -> SingleFlight:
+    """Get the process-wide single flight for blocking ERPNext reads"""
+    return _erpnext_reads
+
+
+def get_async_erpnext_single_flight() -> AsyncSingleFlight:
+    """Get the process-wide single flight for async ERPNext reads"""
+    return _async_erpnext_reads
+
+
+def get_erpnext_single_flight_stats() -> Dict[str, Any]:
+    """Get coalescing statistics of ERPNext reads, blocking and async combined"""
+    sync_stats = _erpnext_reads.get_stats()
+    async_stats = _async_erpnext_reads.get_stats()
+    combined = _stats(
+        sync_stats["executed"] + async_stats["executed"],
+        sync_stats["coalesced"] + async_stats["coalesced"],
+        sync_stats["in_flight"] + async_stats["in_flight"]
+    )
+    combined["sync"] = sync_stats
+    combined["async"] = async_stats
+    return combined
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    calls = []
+
+    async def fetch_customers():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return {"data": [{"name": "CUST-0001"}]}
+
+    async def main():
+        flight = AsyncSingleFlight()
+        results = await asyncio.gather(*[flight.do(("tenant_1", "Customer"), fetch_customers) for _ in range(50)])
+        print(f"{len(results)} callers, {len(calls)} request(s): {flight.get_stats()}")
+
+    asyncio.run(main())
+
+    flight = SingleFlight()
+    threads = [threading.Thread(target=flight.do, args=("key", lambda: time.sleep(0.1))) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"Threads: {flight.get_stats()}")
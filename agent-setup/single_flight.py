@@ -0,0 +1 @@
+single-flight.py
\ No newline at end of file
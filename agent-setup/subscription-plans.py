@@ -34,6 +34,11 @@ class SubscriptionPlan:
     max_storage_gb: Optional[int] = None
     included_modules: List[str] = None
     features: Dict[str, Any] = None
+    requests_per_minute: Optional[int] = None  # Gateway rate limit per tenant, None = unlimited
+    burst_size: Optional[int] = None  # Token bucket capacity, defaults to 10s of requests
+    api_key_requests_per_minute: Optional[int] = None  # Rate limit per API key
+    max_concurrent_tasks: Optional[int] = None  # Agent tasks running at once in the shared pool
+    task_weight: int = 1  # Share of the shared agent pool when tenants compete for it
     
     def __post_init__(self):
         if self.included_modules is None:
@@ -63,6 +68,11 @@ class SubscriptionPlanManager:
             max_workflows=10,
             max_api_calls=10000,
             max_storage_gb=10,
+            requests_per_minute=120,
+            burst_size=60,
+            api_key_requests_per_minute=60,
+            max_concurrent_tasks=2,
+            task_weight=1,
             included_modules=["email_automation"],
             features={
                 "support": "email",
@@ -85,6 +95,11 @@ class SubscriptionPlanManager:
             max_workflows=50,
             max_api_calls=100000,
             max_storage_gb=50,
+            requests_per_minute=1200,
+            burst_size=300,
+            api_key_requests_per_minute=600,
+            max_concurrent_tasks=8,
+            task_weight=4,
             included_modules=["email_automation", "sales_agent", "support_agent", "workflow_automation"],
             features={
                 "support": "priority",
@@ -108,6 +123,11 @@ class SubscriptionPlanManager:
             max_workflows=None,  # Unlimited
             max_api_calls=None,  # Unlimited
             max_storage_gb=500,
+            requests_per_minute=6000,  # Still bounded so one tenant can't starve the others
+            burst_size=1000,
+            api_key_requests_per_minute=3000,
+            max_concurrent_tasks=32,
+            task_weight=10,
             included_modules=["all"],  # All modules
             features={
                 "support": "dedicated",
@@ -161,7 +181,9 @@ class SubscriptionPlanManager:
                     "max_agents": plan.max_agents,
                     "max_workflows": plan.max_workflows,
                     "max_api_calls": plan.max_api_calls,
-                    "max_storage_gb": plan.max_storage_gb
+                    "max_storage_gb": plan.max_storage_gb,
+                    "requests_per_minute": plan.requests_per_minute,
+                    "max_concurrent_tasks": plan.max_concurrent_tasks
                 },
                 "included_modules": plan.included_modules,
                 "features": plan.features
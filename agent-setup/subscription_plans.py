@@ -0,0 +1 @@
+subscription-plans.py
\ No newline at end of file
@@ -0,0 +1,366 @@
+"""
+Task Pool - Process-wide worker pool shared by all tenants' agent tasks
+Weighted fair queuing across tenants, per-tenant concurrency caps from the
+subscription tier, and task priority within each tenant's queue
+"""
+
+import os
+import heapq
+import logging
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from task_queue import PriorityTaskQueue, combine_queue_stats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _TenantQueue:
+    """Queued tasks and scheduling state of one tenant"""
+    tasks: PriorityTaskQueue
+    weight: float = 1.0
+    max_concurrent: Optional[int] = None  # None = bounded only by the pool
+    running: int = 0
+    vtime: float = 0.0  # Virtual start time of the tenant's next task
+    ready: bool = False  # Whether the tenant is in the ready heap
+    completed: int = 0
+    failed: int = 0
+
+
+@dataclass
+class _PoolItem:
+    """A submitted task waiting for a worker"""
+    tenant_id: str
+    task_id: Optional[str]
+    func: Callable
+    args: tuple
+    future: Future
+
+
+class TaskPool:
+    """Shared worker pool with weighted fair queuing across tenants
+
+    Tenants are served in order of virtual time: each dispatched task
+    advances its tenant's virtual time by 1/weight, so under contention a
+    tenant gets a share of workers proportional to its weight, and no more
+    than max_concurrent of its tasks run at once. Within a tenant, tasks
+    come from a PriorityTaskQueue: higher (aged) priority first, expired
+    deadlines dropped, cancellable by task_id.
+
+    Workers are started on demand up to max_workers and exit after
+    idle_timeout seconds without work; idle workers block instead of
+    polling, so an idle pool costs no wakeups.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        idle_timeout: float = 60.0,
+        default_max_concurrent: Optional[int] = None,
+        aging_seconds: float = 30.0
+    ):
+        self.max_workers = max_workers or int(os.getenv("AGENT_POOL_WORKERS", "32"))
+        self.idle_timeout = idle_timeout
+        self.aging_seconds = aging_seconds
+        self.default_max_concurrent = default_max_concurrent
+        self._tenants: Dict[str, _TenantQueue] = {}
+        self._ready: List[Tuple[float, int, str]] = []  # (vtime, seq, tenant_id) heap
+        self._vtime = 0.0
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._workers = 0
+        self._idle_workers = 0
+        self._shutdown = False
+
+        # Statistics
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.expired = 0
+
+    def set_tenant_limits(self, tenant_id: str, weight: float = 1.0, max_concurrent: Optional[int] = None):
+        """Set a tenant's scheduling weight and concurrency cap"""
+        with self._cond:
+            state = self._tenant(tenant_id)
+            state.weight = max(weight, 0.01)
+            state.max_concurrent = max_concurrent
+            self._make_ready(tenant_id, state)
+            self._cond.notify_all()
+
+    def _tenant(self, tenant_id: str) -> _TenantQueue:
+        """Get or create a tenant's queue (lock held)"""
+        state = self._tenants.get(tenant_id)
+        if state is None:
+            state = _TenantQueue(
+                tasks=PriorityTaskQueue(aging_seconds=self.aging_seconds, on_expire=self._on_expire),
+                max_concurrent=self.default_max_concurrent
+            )
+            self._tenants[tenant_id] = state
+        return state
+
+    def _next_seq(self) -> int:
+        """Monotonic tie-breaker for heap entries (lock held)"""
+        self._seq += 1
+        return self._seq
+
+    def _make_ready(self, tenant_id: str, state: _TenantQueue):
+        """Put a tenant in the ready heap if it has runnable work (lock held)"""
+        if state.ready or not state.tasks:
+            return
+        if state.max_concurrent is not None and state.running >= state.max_concurrent:
+            return
+        # A tenant that was idle doesn't get credit for the time it wasn't competing
+        state.vtime = max(state.vtime, self._vtime)
+        state.ready = True
+        heapq.heappush(self._ready, (state.vtime, self._next_seq(), tenant_id))
+
+    def submit(
+        self,
+        tenant_id: str,
+        func: Callable,
+        *args,
+        priority: int = 5,
+        task_id: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> Future:
+        """Queue func(*args) for a tenant, returns a Future with its result
+
+        If the deadline (epoch seconds) passes before a worker picks the task
+        up, it is not run and the Future fails with TimeoutError.
+        """
+        future = Future()
+        item = _PoolItem(tenant_id=tenant_id, task_id=task_id, func=func, args=args, future=future)
+
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Task pool is shut down")
+            state = self._tenant(tenant_id)
+            state.tasks.put(item, priority=priority, task_id=task_id, deadline=deadline)
+            self._make_ready(tenant_id, state)
+            self.submitted += 1
+
+            if self._idle_workers == 0 and self._workers < self.max_workers:
+                self._workers += 1
+                threading.Thread(target=self._worker, name=f"task-pool-{self._workers}", daemon=True).start()
+            else:
+                self._cond.notify()
+
+        return future
+
+    def _dispatch(self) -> Optional[_PoolItem]:
+        """Take the next task in fair order (lock held)"""
+        while self._ready:
+            vtime, _, tenant_id = heapq.heappop(self._ready)
+            state = self._tenants.get(tenant_id)
+            if state is None:
+                continue
+            state.ready = False
+            item = state.tasks.pop()
+            if item is None:
+                continue
+
+            state.running += 1
+            self._vtime = vtime
+            state.vtime = vtime + 1.0 / state.weight
+            self._make_ready(tenant_id, state)
+            return item
+        return None
+
+    def _worker(self):
+        """Run tasks until shut down or idle for idle_timeout seconds"""
+        while True:
+            with self._cond:
+                item = self._dispatch()
+                while item is None:
+                    if self._shutdown:
+                        self._workers -= 1
+                        return
+                    self._idle_workers += 1
+                    notified = self._cond.wait(self.idle_timeout)
+                    self._idle_workers -= 1
+                    item = self._dispatch()
+                    if item is None and not notified:
+                        self._workers -= 1
+                        return
+
+            if not item.future.set_running_or_notify_cancel():
+                self._finish(item, cancelled=True)
+                continue
+
+            try:
+                result = item.func(*item.args)
+            except Exception as e:
+                item.future.set_exception(e)
+                self._finish(item, failed=True)
+                logger.error(f"Task {item.task_id or ''} for tenant {item.tenant_id} failed: {str(e)}")
+            else:
+                item.future.set_result(result)
+                self._finish(item)
+
+    def _finish(self, item: _PoolItem, failed: bool = False, cancelled: bool = False):
+        """Release a tenant's concurrency slot"""
+        with self._cond:
+            state = self._tenants.get(item.tenant_id)
+            if state is not None:
+                state.running -= 1
+                if cancelled:
+                    self.cancelled += 1
+                elif failed:
+                    state.failed += 1
+                    self.failed += 1
+                else:
+                    state.completed += 1
+                    self.completed += 1
+                self._make_ready(item.tenant_id, state)
+                if state.ready:
+                    self._cond.notify()
+
+    def _on_expire(self, item: _PoolItem):
+        """Fail a task whose deadline passed while it was queued"""
+        with self._cond:
+            self.expired += 1
+        item.future.set_exception(TimeoutError(f"Task {item.task_id or ''} missed its deadline"))
+
+    def cancel(self, tenant_id: str, task_id: str) -> bool:
+        """Cancel one queued task by task_id, returns whether it was still queued"""
+        with self._cond:
+            state = self._tenants.get(tenant_id)
+            item = state.tasks.cancel(task_id) if state else None
+            if item is None:
+                return False
+            self.cancelled += 1
+
+        item.future.cancel()
+        return True
+
+    def pending(self, tenant_id: str) -> int:
+        """Get the number of a tenant's tasks queued or running"""
+        with self._cond:
+            state = self._tenants.get(tenant_id)
+            return len(state.tasks) + state.running if state else 0
+
+    def cancel_tenant(self, tenant_id: str) -> int:
+        """Cancel a tenant's queued tasks, returns how many were cancelled"""
+        with self._cond:
+            state = self._tenants.get(tenant_id)
+            if state is None:
+                return 0
+            items = state.tasks.clear()
+            self.cancelled += len(items)
+
+        for item in items:
+            item.future.cancel()
+        return len(items)
+
+    def remove_tenant(self, tenant_id: str) -> int:
+        """Cancel a tenant's queued tasks and forget its limits once idle"""
+        cancelled = self.cancel_tenant(tenant_id)
+        with self._cond:
+            state = self._tenants.get(tenant_id)
+            if state is not None and state.running == 0:
+                del self._tenants[tenant_id]
+        return cancelled
+
+    def shutdown(self, cancel_pending: bool = False):
+        """Stop the workers once queued tasks finish (or are cancelled)"""
+        if cancel_pending:
+            with self._cond:
+                tenant_ids = list(self._tenants)
+            for tenant_id in tenant_ids:
+                self.cancel_tenant(tenant_id)
+
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool statistics"""
+        with self._cond:
+            return {
+                "max_workers": self.max_workers,
+                "workers": self._workers,
+                "idle_workers": self._idle_workers,
+                "queued": sum(len(state.tasks) for state in self._tenants.values()),
+                "running": sum(state.running for state in self._tenants.values()),
+                "tenants": len(self._tenants),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "expired": self.expired,
+                "bands": combine_queue_stats(state.tasks for state in self._tenants.values())
+            }
+
+    def get_tenant_stats(self, tenant_id: str) -> Dict[str, Any]:
+        """Get one tenant's queue statistics"""
+        with self._cond:
+            state = self._tenants.get(tenant_id)
+            if state is None:
+                return {"queued": 0, "running": 0}
+            return {
+                "weight": state.weight,
+                "max_concurrent": state.max_concurrent,
+                "queued": len(state.tasks),
+                "running": state.running,
+                "completed": state.completed,
+                "failed": state.failed,
+                "bands": state.tasks.get_stats()
+            }
+
+
+_pool: Optional[TaskPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_task_pool() -> TaskPool:
+    """Get the shared process-wide task pool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = TaskPool()
+                logger.info(f"Task pool created with up to {_pool.max_workers} workers")
+    return _pool
+
+
+def shutdown_task_pool(cancel_pending: bool = False):
+    """Shut down the shared task pool (call on shutdown)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool:
+        pool.shutdown(cancel_pending=cancel_pending)
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    pool = TaskPool(max_workers=4)
+    pool.set_tenant_limits("tenant_a", weight=3, max_concurrent=4)
+    pool.set_tenant_limits("tenant_b", weight=1, max_concurrent=1)
+
+    order = []
+    lock = threading.Lock()
+
+    def work(tenant_id: str, n: int):
+        time.sleep(0.01)
+        with lock:
+            order.append(tenant_id)
+        return n
+
+    futures = [pool.submit("tenant_a", work, "tenant_a", i) for i in range(30)]
+    futures += [pool.submit("tenant_b", work, "tenant_b", i) for i in range(30)]
+
+    for future in futures:
+        future.result()
+
+    first_half = order[:30]
+    print(f"First 30 tasks: tenant_a={first_half.count('tenant_a')}, tenant_b={first_half.count('tenant_b')}")
+    print(f"Stats: {pool.get_stats()}")
+    pool.shutdown()
@@ -0,0 +1,265 @@
+"""
+Task Queue - Priority queue for agent tasks
+Heap-ordered by priority with aging so low priority work isn't starved,
+deadlines, cancellation by task_id, and per-priority-band statistics
+"""
+
+import time
+import heapq
+import logging
+import threading
+from queue import Empty
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Band name -> lowest priority in the band, highest band first
+PRIORITY_BANDS = [("high", 7), ("normal", 4), ("low", float("-inf"))]
+
+
+def priority_band(priority: int) -> str:
+    """Get the band a priority falls in"""
+    for band, lowest in PRIORITY_BANDS:
+        if priority >= lowest:
+            return band
+    return PRIORITY_BANDS[-1][0]
+
+
+@dataclass
+class _QueueEntry:
+    """A queued item and its bookkeeping"""
+    item: Any
+    priority: int
+    task_id: Optional[str]
+    deadline: Optional[float]  # Epoch seconds
+    enqueued_at: float  # Monotonic seconds
+    band: str
+    removed: bool = False
+
+
+@dataclass
+class _BandStats:
+    """Counters for one priority band"""
+    depth: int = 0
+    dequeued: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+    expired: int = 0
+    cancelled: int = 0
+
+
+class PriorityTaskQueue:
+    """Thread-safe priority queue with aging, deadlines and cancellation
+
+    Higher priority is served first. Every aging_seconds an entry has
+    waited counts as one extra priority level; because all entries age at
+    the same rate this is a fixed heap key (enqueue time / aging_seconds -
+    priority), so aging costs nothing at dequeue time. Entries whose
+    deadline passes while queued are handed to on_expire instead of being
+    returned. Cancelled and expired entries are removed lazily.
+    """
+
+    def __init__(
+        self,
+        aging_seconds: float = 30.0,
+        on_expire: Optional[Callable[[Any], None]] = None
+    ):
+        self.aging_seconds = aging_seconds
+        self.on_expire = on_expire
+        self._heap: List[tuple] = []
+        self._entries: Dict[str, _QueueEntry] = {}  # task_id -> queued entry
+        self._size = 0
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._bands = {band: _BandStats() for band, _ in PRIORITY_BANDS}
+
+    def put(
+        self,
+        item: Any,
+        priority: int = 5,
+        task_id: Optional[str] = None,
+        deadline: Optional[float] = None
+    ):
+        """Queue an item (deadline in epoch seconds)"""
+        now = time.monotonic()
+        entry = _QueueEntry(
+            item=item,
+            priority=priority,
+            task_id=task_id,
+            deadline=deadline,
+            enqueued_at=now,
+            band=priority_band(priority)
+        )
+        key = now / self.aging_seconds - priority if self.aging_seconds else -priority
+
+        with self._cond:
+            self._seq += 1
+            heapq.heappush(self._heap, (key, self._seq, entry))
+            if task_id is not None:
+                self._entries[task_id] = entry
+            self._size += 1
+            self._bands[entry.band].depth += 1
+            self._cond.notify()
+
+    def pop(self) -> Optional[Any]:
+        """Take the next item without blocking, None if there is none"""
+        expired = []
+        with self._cond:
+            item = self._pop_locked(expired)
+        self._expire(expired)
+        return item
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        """Take the next item, waiting like queue.Queue.get (raises queue.Empty)"""
+        expired = []
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        try:
+            with self._cond:
+                while True:
+                    item = self._pop_locked(expired)
+                    if item is not None:
+                        return item
+                    if not block:
+                        raise Empty
+                    remaining = deadline - time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        raise Empty
+                    self._cond.wait(remaining)
+        finally:
+            self._expire(expired)
+
+    def _pop_locked(self, expired: List[Any]) -> Optional[Any]:
+        """Pop the next live entry, collecting expired ones (lock held)"""
+        now = time.time()
+        while self._heap:
+            _, _, entry = heapq.heappop(self._heap)
+            if entry.removed:
+                continue
+            self._remove(entry)
+
+            stats = self._bands[entry.band]
+            if entry.deadline is not None and entry.deadline <= now:
+                stats.expired += 1
+                expired.append(entry.item)
+                continue
+
+            wait = time.monotonic() - entry.enqueued_at
+            stats.dequeued += 1
+            stats.wait_total += wait
+            stats.wait_max = max(stats.wait_max, wait)
+            return entry.item
+        return None
+
+    def _remove(self, entry: _QueueEntry):
+        """Account for an entry leaving the queue (lock held)"""
+        entry.removed = True
+        self._size -= 1
+        self._bands[entry.band].depth -= 1
+        if entry.task_id is not None and self._entries.get(entry.task_id) is entry:
+            del self._entries[entry.task_id]
+
+    def _expire(self, items: List[Any]):
+        """Hand expired items to on_expire, outside the lock"""
+        for item in items:
+            if self.on_expire:
+                try:
+                    self.on_expire(item)
+                except Exception as e:
+                    logger.error(f"Error in task expiry callback: {str(e)}")
+
+    def cancel(self, task_id: str) -> Optional[Any]:
+        """Remove a queued item by task_id, returns it (None if not queued)"""
+        with self._cond:
+            entry = self._entries.get(task_id)
+            if entry is None:
+                return None
+            self._remove(entry)
+            self._bands[entry.band].cancelled += 1
+            self._compact()
+            return entry.item
+
+    def clear(self) -> List[Any]:
+        """Remove and return every queued item"""
+        with self._cond:
+            items = []
+            for _, _, entry in self._heap:
+                if not entry.removed:
+                    self._remove(entry)
+                    self._bands[entry.band].cancelled += 1
+                    items.append(entry.item)
+            self._heap = []
+            return items
+
+    def _compact(self):
+        """Rebuild the heap once removed entries dominate it (lock held)"""
+        if len(self._heap) > 64 and len(self._heap) > 2 * self._size:
+            self._heap = [entry for entry in self._heap if not entry[2].removed]
+            heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def qsize(self) -> int:
+        """Number of queued items"""
+        return self._size
+
+    def empty(self) -> bool:
+        """Whether nothing is queued"""
+        return self._size == 0
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get depth and wait time per priority band"""
+        with self._cond:
+            return {band: _band_summary(stats) for band, stats in self._bands.items()}
+
+    def _raw_band_stats(self) -> Dict[str, _BandStats]:
+        """Copy of the band counters, for combining queues"""
+        with self._cond:
+            return {band: _BandStats(**vars(stats)) for band, stats in self._bands.items()}
+
+
+def _band_summary(stats: _BandStats) -> Dict[str, Any]:
+    """Render band counters for reporting"""
+    return {
+        "depth": stats.depth,
+        "dequeued": stats.dequeued,
+        "avg_wait_ms": round(stats.wait_total / stats.dequeued * 1000, 2) if stats.dequeued else 0.0,
+        "max_wait_ms": round(stats.wait_max * 1000, 2),
+        "expired": stats.expired,
+        "cancelled": stats.cancelled
+    }
+
+
+def combine_queue_stats(queues: Iterable[PriorityTaskQueue]) -> Dict[str, Dict[str, Any]]:
+    """Get per-band statistics across several queues"""
+    totals = {band: _BandStats() for band, _ in PRIORITY_BANDS}
+    for queue in queues:
+        for band, stats in queue._raw_band_stats().items():
+            total = totals[band]
+            total.depth += stats.depth
+            total.dequeued += stats.dequeued
+            total.wait_total += stats.wait_total
+            total.wait_max = max(total.wait_max, stats.wait_max)
+            total.expired += stats.expired
+            total.cancelled += stats.cancelled
+    return {band: _band_summary(stats) for band, stats in totals.items()}
+
+
+# Example usage
+if __name__ == "__main__":
+    queue = PriorityTaskQueue(aging_seconds=0.05, on_expire=lambda item: print(f"Expired: {item}"))
+
+    queue.put("bulk-1", priority=2, task_id="bulk-1")
+    queue.put("bulk-2", priority=2, task_id="bulk-2")
+    queue.put("stale", priority=5, task_id="stale", deadline=time.time() - 1)
+    time.sleep(0.2)  # bulk work ages by 4 levels
+    queue.put("escalation", priority=8, task_id="escalation")
+    queue.put("normal", priority=5, task_id="normal")
+    queue.cancel("bulk-2")
+
+    while not queue.empty():
+        print(f"Dequeued: {queue.get(timeout=0)}")
+    print(f"Stats: {queue.get_stats()}")
@@ -0,0 +1 @@
+task-queue.py
\ No newline at end of file
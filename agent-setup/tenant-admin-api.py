@@ -5,6 +5,7 @@ Tenant Admin API - Admin dashboard APIs for tenant management
 from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Dict, List, Optional, Any
+import asyncio
 import logging
 
 from tenant_manager import TenantManager
@@ -17,6 +18,7 @@ from usage_tracker import UsageTracker
 from billing_system import BillingSystem
 from subscription_plans import SubscriptionPlanManager
 from metrics_collector import MetricsCollector
+from async_db import AsyncFacade, get_db_executor, shutdown_db_executor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -46,6 +48,20 @@ plan_manager = SubscriptionPlanManager()
 billing = BillingSystem(tenant_manager, plan_manager, usage_tracker)
 metrics_collector = MetricsCollector(tenant_isolation)
 
+# Blocking sqlite calls run on a bounded thread pool, never on the event loop
+db_executor = get_db_executor()
+async_tenant_manager = AsyncFacade(tenant_manager, db_executor)
+async_agent_system = AsyncFacade(agent_system, db_executor)
+async_teams = AsyncFacade(teams, db_executor)
+async_marketplace = AsyncFacade(marketplace, db_executor)
+async_usage_tracker = AsyncFacade(usage_tracker, db_executor)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the DB executor on shutdown"""
+    shutdown_db_executor()
+
 
 @app.get("/")
 async def root():
@@ -60,16 +76,18 @@ async def root():
 @app.get("/api/v1/{tenant_id}/admin/dashboard")
 async def get_tenant_dashboard(tenant_id: str):
     """Get comprehensive tenant dashboard"""
-    tenant = tenant_manager.get_tenant(tenant_id)
+    tenant = await async_tenant_manager.get_tenant(tenant_id)
     if not tenant:
         raise HTTPException(status_code=404, detail="Tenant not found")
     
-    # Get all dashboard data
-    agents = agent_system.list_agents(tenant_id)
-    tenant_teams = teams.list_teams(tenant_id)
-    tenant_modules = marketplace.get_tenant_modules(tenant_id)
-    usage = usage_tracker.get_current_month_usage(tenant_id)
-    quota = tenant_manager.get_tenant_quota(tenant_id)
+    # Get all dashboard data (independent reads run concurrently)
+    agents, tenant_teams, tenant_modules, usage, quota = await asyncio.gather(
+        async_agent_system.list_agents(tenant_id),
+        async_teams.list_teams(tenant_id),
+        async_marketplace.get_tenant_modules(tenant_id),
+        async_usage_tracker.get_current_month_usage(tenant_id),
+        async_tenant_manager.get_tenant_quota(tenant_id)
+    )
     metrics_summary = metrics_collector.get_metric_summary(tenant_id)
     
     return {
@@ -104,8 +122,10 @@ async def get_tenant_dashboard(tenant_id: str):
 @app.get("/api/v1/{tenant_id}/admin/statistics")
 async def get_statistics(tenant_id: str):
     """Get tenant statistics"""
-    agents = agent_system.list_agents(tenant_id)
-    usage = usage_tracker.get_current_month_usage(tenant_id)
+    agents, usage = await asyncio.gather(
+        async_agent_system.list_agents(tenant_id),
+        async_usage_tracker.get_current_month_usage(tenant_id)
+    )
     metrics = metrics_collector.get_metric_summary(tenant_id)
     
     return {
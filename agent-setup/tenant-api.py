@@ -13,6 +13,7 @@ import logging
 from tenant_manager import TenantManager, Tenant, TenantStatus
 from tenant_provisioning import TenantProvisioner
 from tenant_isolation import TenantIsolation, get_current_tenant_id, set_tenant_context
+from async_db import AsyncFacade, get_db_executor, shutdown_db_executor
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
@@ -43,6 +44,17 @@ tenant_isolation = TenantIsolation(
     tenant_db_dir=os.getenv("TENANT_DB_DIR", "tenant_databases")
 )
 
+# Blocking sqlite calls run on a bounded thread pool, never on the event loop
+db_executor = get_db_executor()
+async_tenant_manager = AsyncFacade(tenant_manager, db_executor)
+async_tenant_provisioner = AsyncFacade(tenant_provisioner, db_executor)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the DB executor on shutdown"""
+    shutdown_db_executor()
+
 
 # Request/Response models
 class TenantCreateRequest(BaseModel):
@@ -80,7 +92,7 @@ async def get_tenant_from_request(
     if x_tenant_id:
         return x_tenant_id
     if subdomain:
-        tenant = tenant_manager.get_tenant_by_subdomain(subdomain)
+        tenant = await async_tenant_manager.get_tenant_by_subdomain(subdomain)
         if tenant:
             return tenant.tenant_id
     return None
@@ -102,7 +114,7 @@ async def create_tenant(request: TenantCreateRequest):
     """Create a new tenant (admin only)"""
     try:
         # Create tenant
-        tenant = tenant_manager.create_tenant(
+        tenant = await async_tenant_manager.create_tenant(
             name=request.name,
             subdomain=request.subdomain,
             domain=request.domain,
@@ -111,7 +123,7 @@ async def create_tenant(request: TenantCreateRequest):
         )
         
         # Provision tenant
-        provision_result = tenant_provisioner.provision_tenant(tenant)
+        provision_result = await async_tenant_provisioner.provision_tenant(tenant)
         
         return {
             "success": True,
@@ -139,7 +151,7 @@ async def list_tenants(
 ):
     """List all tenants (admin only)"""
     try:
-        tenants = tenant_manager.list_tenants(
+        tenants = await async_tenant_manager.list_tenants(
             status=status,
             subscription_tier=subscription_tier,
             limit=limit,
@@ -167,7 +179,7 @@ async def list_tenants(
 @app.get("/api/admin/tenants/{tenant_id}", response_model=TenantResponse)
 async def get_tenant(tenant_id: str = Path(...)):
     """Get tenant details (admin only)"""
-    tenant = tenant_manager.get_tenant(tenant_id)
+    tenant = await async_tenant_manager.get_tenant(tenant_id)
     if not tenant:
         raise HTTPException(status_code=404, detail="Tenant not found")
     
@@ -189,11 +201,11 @@ async def update_tenant(
     request: TenantUpdateRequest = None
 ):
     """Update tenant (admin only)"""
-    tenant = tenant_manager.get_tenant(tenant_id)
+    tenant = await async_tenant_manager.get_tenant(tenant_id)
     if not tenant:
         raise HTTPException(status_code=404, detail="Tenant not found")
     
-    success = tenant_manager.update_tenant(
+    success = await async_tenant_manager.update_tenant(
         tenant_id=tenant_id,
         name=request.name if request else None,
         status=request.status if request else None,
@@ -204,7 +216,7 @@ async def update_tenant(
     if not success:
         raise HTTPException(status_code=400, detail="Update failed")
     
-    updated_tenant = tenant_manager.get_tenant(tenant_id)
+    updated_tenant = await async_tenant_manager.get_tenant(tenant_id)
     return {
         "success": True,
         "tenant": {
@@ -219,7 +231,7 @@ async def update_tenant(
 @app.post("/api/admin/tenants/{tenant_id}/suspend", response_model=Dict[str, Any])
 async def suspend_tenant(tenant_id: str = Path(...)):
     """Suspend a tenant (admin only)"""
-    success = tenant_manager.suspend_tenant(tenant_id)
+    success = await async_tenant_manager.suspend_tenant(tenant_id)
     if not success:
         raise HTTPException(status_code=404, detail="Tenant not found")
     
@@ -229,7 +241,7 @@ async def suspend_tenant(tenant_id: str = Path(...)):
 @app.post("/api/admin/tenants/{tenant_id}/activate", response_model=Dict[str, Any])
 async def activate_tenant(tenant_id: str = Path(...)):
     """Activate a tenant (admin only)"""
-    success = tenant_manager.activate_tenant(tenant_id)
+    success = await async_tenant_manager.activate_tenant(tenant_id)
     if not success:
         raise HTTPException(status_code=404, detail="Tenant not found")
     
@@ -239,7 +251,7 @@ async def activate_tenant(tenant_id: str = Path(...)):
 @app.delete("/api/admin/tenants/{tenant_id}", response_model=Dict[str, Any])
 async def delete_tenant(tenant_id: str = Path(...)):
     """Delete a tenant (admin only)"""
-    success = tenant_manager.delete_tenant(tenant_id)
+    success = await async_tenant_manager.delete_tenant(tenant_id)
     if not success:
         raise HTTPException(status_code=404, detail="Tenant not found")
     
@@ -249,7 +261,7 @@ async def delete_tenant(tenant_id: str = Path(...)):
 @app.get("/api/admin/tenants/{tenant_id}/quota", response_model=Dict[str, Any])
 async def get_tenant_quota(tenant_id: str = Path(...)):
     """Get tenant resource quotas (admin only)"""
-    quota = tenant_manager.get_tenant_quota(tenant_id)
+    quota = await async_tenant_manager.get_tenant_quota(tenant_id)
     if not quota:
         raise HTTPException(status_code=404, detail="Tenant not found")
     
@@ -263,7 +275,7 @@ async def get_tenant_info(tenant_id: Optional[str] = Depends(get_tenant_from_req
     if not tenant_id:
         raise HTTPException(status_code=400, detail="Tenant ID required")
     
-    tenant = tenant_manager.get_tenant(tenant_id)
+    tenant = await async_tenant_manager.get_tenant(tenant_id)
     if not tenant:
         raise HTTPException(status_code=404, detail="Tenant not found")
     
@@ -285,7 +297,7 @@ async def get_quota(tenant_id: Optional[str] = Depends(get_tenant_from_request))
     if not tenant_id:
         raise HTTPException(status_code=400, detail="Tenant ID required")
     
-    quota = tenant_manager.get_tenant_quota(tenant_id)
+    quota = await async_tenant_manager.get_tenant_quota(tenant_id)
     if not quota:
         raise HTTPException(status_code=404, detail="Tenant not found")
     
@@ -0,0 +1,259 @@
+"""
+Tenant Cache - In-process tenant resolution cache
+TTL + LRU cache keyed by tenant_id, subdomain and domain, with explicit
+invalidation and optional cross-node invalidation over the event bus
+"""
+
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Event type used to broadcast invalidations to other nodes
+TENANT_CACHE_INVALIDATE_EVENT = "tenant_cache_invalidate"
+
+# Lookup kinds
+BY_ID = "tenant_id"
+BY_SUBDOMAIN = "subdomain"
+BY_DOMAIN = "domain"
+
+# Returned by get() when the key is not cached (None is a cached "not found")
+MISS = object()
+
+CacheKey = Tuple[str, str]
+
+
+class TenantCache:
+    """TTL + LRU cache of tenant lookups
+
+    Cached Tenant objects are shared between callers and must be treated
+    as read-only. Lookups that found no tenant are cached for a shorter
+    negative TTL so unknown hosts don't hit the database on every request.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        ttl_seconds: float = 300,
+        negative_ttl_seconds: float = 5
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._keys_by_tenant: Dict[str, Set[CacheKey]] = {}
+        self._listeners: List[Callable[[str, List[CacheKey], Optional[str]], None]] = []
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, kind: str, value: Optional[str]) -> Any:
+        """Get a cached tenant (or cached None), or MISS"""
+        if not value:
+            return MISS
+
+        key = (kind, value)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISS
+
+            expires_at, tenant = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._unindex_key(key, tenant)
+                self.misses += 1
+                return MISS
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return tenant
+
+    def begin_load(self) -> int:
+        """Get a token to pass to put() after loading from the database
+
+        If the tenant is invalidated while the caller is reading, the put
+        is dropped so a stale row can't be cached over a newer write.
+        """
+        return self._generation
+
+    def put(self, kind: str, value: Optional[str], tenant: Any, token: Optional[int] = None):
+        """Cache a lookup result (a Tenant, or None for not found)"""
+        if not value:
+            return
+
+        ttl = self.ttl_seconds if tenant is not None else self.negative_ttl_seconds
+        expires_at = time.monotonic() + ttl
+
+        with self._lock:
+            if token is not None and token != self._generation:
+                return
+
+            key = (kind, value)
+            self._entries[key] = (expires_at, tenant)
+            self._entries.move_to_end(key)
+
+            if tenant is not None:
+                # Index every key that resolves to this tenant so one
+                # invalidation drops the id, subdomain and domain entries
+                keys = self._keys_by_tenant.setdefault(tenant.tenant_id, set())
+                keys.add(key)
+                keys.add((BY_ID, tenant.tenant_id))
+                if tenant.subdomain:
+                    keys.add((BY_SUBDOMAIN, tenant.subdomain))
+                if tenant.domain:
+                    keys.add((BY_DOMAIN, tenant.domain))
+
+            while len(self._entries) > self.max_size:
+                oldest_key, (_, oldest_tenant) = self._entries.popitem(last=False)
+                self._unindex_key(oldest_key, oldest_tenant)
+                self.evictions += 1
+
+    def invalidate_tenant(
+        self,
+        tenant_id: str,
+        extra_keys: Optional[List[CacheKey]] = None,
+        origin: Optional[str] = None
+    ):
+        """Drop every cached entry for a tenant
+
+        extra_keys covers lookups that may be cached as "not found", e.g.
+        the subdomain of a tenant that was just created. origin is set when
+        the invalidation came from another node, so it isn't re-broadcast.
+        """
+        with self._lock:
+            self._generation += 1
+            keys = set(self._keys_by_tenant.pop(tenant_id, set()))
+            keys.add((BY_ID, tenant_id))
+            for key in extra_keys or []:
+                keys.add(tuple(key))
+
+            for key in keys:
+                self._entries.pop(key, None)
+
+            self.invalidations += 1
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            try:
+                listener(tenant_id, sorted(keys), origin)
+            except Exception as e:
+                logger.error(f"Error in tenant cache listener: {str(e)}")
+
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys_by_tenant.clear()
+
+    def add_listener(self, listener: Callable[[str, List[CacheKey], Optional[str]], None]):
+        """Register a callback invoked as listener(tenant_id, keys, origin) on invalidation"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            size = len(self._entries)
+
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+    def _unindex_key(self, key: CacheKey, tenant: Any):
+        """Remove a dropped key from its tenant's index (lock held)"""
+        if tenant is None:
+            return
+        keys = self._keys_by_tenant.get(tenant.tenant_id)
+        if keys is not None:
+            keys.discard(key)
+            if not any(k in self._entries for k in keys):
+                del self._keys_by_tenant[tenant.tenant_id]
+
+
+# Shared caches, one per platform database
+_caches: Dict[str, TenantCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_tenant_cache(platform_db_path: str = "platform.db") -> TenantCache:
+    """Get the shared tenant cache for a platform database
+
+    TenantManager instances in one process share a cache, so an update made
+    through one of them is seen by all the others immediately.
+    """
+    key = str(Path(platform_db_path).resolve())
+    cache = _caches.get(key)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(key)
+            if cache is None:
+                cache = TenantCache(
+                    max_size=int(os.getenv("TENANT_CACHE_SIZE", "10000")),
+                    ttl_seconds=float(os.getenv("TENANT_CACHE_TTL", "300"))
+                )
+                _caches[key] = cache
+    return cache
+
+
+def bind_tenant_cache_to_event_bus(cache: TenantCache, event_bus: Any, node_id: Optional[str] = None) -> str:
+    """Keep tenant caches coherent across nodes via the event bus
+
+    Local invalidations are published as TENANT_CACHE_INVALIDATE_EVENT and
+    invalidations published by other nodes are applied to this cache.
+    Returns the node ID used to ignore this node's own messages.
+    """
+    node_id = node_id or f"node_{uuid.uuid4().hex[:8]}"
+
+    def publish_invalidation(tenant_id: str, keys: List[CacheKey], origin: Optional[str]):
+        if origin is not None:
+            return  # Came from another node, don't echo it back
+        try:
+            event_bus.publish_event(
+                tenant_id=tenant_id,
+                event_type=TENANT_CACHE_INVALIDATE_EVENT,
+                source="tenant_cache",
+                data={"origin": node_id, "keys": [list(key) for key in keys]},
+                work=False
+            )
+        except Exception as e:
+            logger.error(f"Error publishing tenant cache invalidation: {str(e)}")
+
+    def apply_invalidation(event: Any):
+        origin = event.data.get("origin")
+        if origin == node_id:
+            return
+        cache.invalidate_tenant(
+            event.tenant_id,
+            extra_keys=[tuple(key) for key in event.data.get("keys", [])],
+            origin=origin or "remote"
+        )
+
+    cache.add_listener(publish_invalidation)
+    event_bus.subscribe(TENANT_CACHE_INVALIDATE_EVENT, apply_invalidation)
+
+    logger.info(f"Tenant cache bound to event bus (node {node_id})")
+    return node_id
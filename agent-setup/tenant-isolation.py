@@ -53,21 +53,36 @@ class TenantIsolation:
         self.tenant_manager = tenant_manager
         self.tenant_db_dir = Path(tenant_db_dir)
         self.tenant_db_dir.mkdir(exist_ok=True)
+        
+        # Resolved database paths, dropped whenever the tenant is invalidated
+        self._db_paths: Dict[str, Path] = {}
+        tenant_manager.cache.add_listener(self._on_tenant_invalidated)
+    
+    def _on_tenant_invalidated(self, tenant_id: str, keys, origin):
+        """Drop the cached database path for an invalidated tenant"""
+        self._db_paths.pop(tenant_id, None)
     
     def get_tenant_database_path(self, tenant_id: str) -> Optional[Path]:
         """Get tenant database path"""
-        # First check platform database
-        import sqlite3
-        platform_db = sqlite3.connect(self.tenant_manager.platform_db_path)
-        platform_db.row_factory = sqlite3.Row
-        cursor = platform_db.cursor()
-        
-        cursor.execute("""
-            SELECT database_name, connection_string FROM tenant_databases WHERE tenant_id = ?
-        """, (tenant_id,))
+        db_path = self._db_paths.get(tenant_id)
+        if db_path is not None:
+            return db_path
         
-        row = cursor.fetchone()
-        platform_db.close()
+        db_path = self._load_tenant_database_path(tenant_id)
+        self._db_paths[tenant_id] = db_path
+        return db_path
+    
+    def get_cached_database_path(self, tenant_id: str) -> Optional[Path]:
+        """Get tenant database path if already resolved (never touches the database)"""
+        return self._db_paths.get(tenant_id)
+    
+    def _load_tenant_database_path(self, tenant_id: str) -> Path:
+        """Resolve tenant database path from the platform database"""
+        # First check platform database
+        with self.tenant_manager.db.connection() as conn:
+            row = conn.execute("""
+                SELECT database_name, connection_string FROM tenant_databases WHERE tenant_id = ?
+            """, (tenant_id,)).fetchone()
         
         if row:
             if row["connection_string"]:
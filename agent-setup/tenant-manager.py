@@ -13,6 +13,9 @@ from enum import Enum
 import sqlite3
 from pathlib import Path
 
+from platform_db import get_platform_db
+from tenant_cache import TenantCache, get_tenant_cache, MISS, BY_ID, BY_SUBDOMAIN, BY_DOMAIN
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -43,40 +46,40 @@ class Tenant:
 class TenantManager:
     """Manages tenants in the multi-tenant SaaS platform"""
     
-    def __init__(self, platform_db_path: str = "platform.db"):
+    def __init__(self, platform_db_path: str = "platform.db", cache: Optional[TenantCache] = None):
         self.platform_db_path = platform_db_path
+        self.db = get_platform_db(platform_db_path)
+        self.cache = cache or get_tenant_cache(platform_db_path)
         self._init_platform_database()
     
     def _init_platform_database(self):
         """Initialize platform database with schema"""
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
-        
-        # Read and execute schema
-        schema_path = Path(__file__).parent / "tenant-schema.sql"
-        if schema_path.exists():
-            with open(schema_path, 'r') as f:
-                schema = f.read()
-                # SQLite doesn't support all PostgreSQL features, adapt as needed
-                # Execute statements one by one
-                for statement in schema.split(';'):
-                    statement = statement.strip()
-                    if statement and not statement.startswith('--'):
-                        try:
-                            # Adapt PostgreSQL syntax to SQLite
-                            statement = statement.replace('SERIAL PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT')
-                            statement = statement.replace('JSONB', 'TEXT')  # Store JSON as TEXT in SQLite
-                            statement = statement.replace('TIMESTAMP DEFAULT CURRENT_TIMESTAMP', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP')
-                            # Remove unsupported features
-                            if 'INDEX' in statement and 'CREATE' not in statement.upper():
-                                continue  # Skip standalone index creation
-                            cursor.execute(statement)
-                        except sqlite3.OperationalError as e:
-                            if "already exists" not in str(e).lower():
-                                logger.warning(f"Schema execution warning: {e}")
-        
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            # Read and execute schema
+            schema_path = Path(__file__).parent / "tenant-schema.sql"
+            if schema_path.exists():
+                with open(schema_path, 'r') as f:
+                    schema = f.read()
+                    # SQLite doesn't support all PostgreSQL features, adapt as needed
+                    # Execute statements one by one
+                    for statement in schema.split(';'):
+                        statement = statement.strip()
+                        if statement and not statement.startswith('--'):
+                            try:
+                                # Adapt PostgreSQL syntax to SQLite
+                                statement = statement.replace('SERIAL PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT')
+                                statement = statement.replace('JSONB', 'TEXT')  # Store JSON as TEXT in SQLite
+                                statement = statement.replace('TIMESTAMP DEFAULT CURRENT_TIMESTAMP', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP')
+                                # Remove unsupported features
+                                if 'INDEX' in statement and 'CREATE' not in statement.upper():
+                                    continue  # Skip standalone index creation
+                                cursor.execute(statement)
+                            except sqlite3.OperationalError as e:
+                                if "already exists" not in str(e).lower():
+                                    logger.warning(f"Schema execution warning: {e}")
+        
         logger.info("Platform database initialized")
     
     def create_tenant(
@@ -114,85 +117,60 @@ class TenantManager:
         )
         
         # Save to database
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO tenants (tenant_id, name, domain, subdomain, status, subscription_tier, 
-                                created_at, updated_at, trial_end_date, metadata)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            tenant.tenant_id,
-            tenant.name,
-            tenant.domain,
-            tenant.subdomain,
-            tenant.status,
-            tenant.subscription_tier,
-            tenant.created_at.isoformat() if tenant.created_at else None,
-            tenant.updated_at.isoformat() if tenant.updated_at else None,
-            tenant.trial_end_date.isoformat() if tenant.trial_end_date else None,
-            str(tenant.metadata) if tenant.metadata else None
-        ))
-        
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            conn.execute("""
+                INSERT INTO tenants (tenant_id, name, domain, subdomain, status, subscription_tier, 
+                                    created_at, updated_at, trial_end_date, metadata)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                tenant.tenant_id,
+                tenant.name,
+                tenant.domain,
+                tenant.subdomain,
+                tenant.status,
+                tenant.subscription_tier,
+                tenant.created_at.isoformat() if tenant.created_at else None,
+                tenant.updated_at.isoformat() if tenant.updated_at else None,
+                tenant.trial_end_date.isoformat() if tenant.trial_end_date else None,
+                str(tenant.metadata) if tenant.metadata else None
+            ))
+        
+        # Drop cached "not found" lookups for the new tenant's keys
+        self.cache.invalidate_tenant(
+            tenant_id,
+            extra_keys=[(BY_SUBDOMAIN, subdomain)] + ([(BY_DOMAIN, domain)] if domain else [])
+        )
         
         logger.info(f"Tenant created: {tenant_id} ({name})")
         return tenant
     
     def get_tenant(self, tenant_id: str) -> Optional[Tenant]:
         """Get tenant by ID"""
-        conn = sqlite3.connect(self.platform_db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT * FROM tenants WHERE tenant_id = ?
-        """, (tenant_id,))
-        
-        row = cursor.fetchone()
-        conn.close()
-        
-        if not row:
-            return None
-        
-        return self._row_to_tenant(row)
+        return self._get_tenant_cached(BY_ID, "tenant_id", tenant_id)
     
     def get_tenant_by_subdomain(self, subdomain: str) -> Optional[Tenant]:
         """Get tenant by subdomain"""
-        conn = sqlite3.connect(self.platform_db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT * FROM tenants WHERE subdomain = ?
-        """, (subdomain,))
-        
-        row = cursor.fetchone()
-        conn.close()
-        
-        if not row:
-            return None
-        
-        return self._row_to_tenant(row)
+        return self._get_tenant_cached(BY_SUBDOMAIN, "subdomain", subdomain)
     
     def get_tenant_by_domain(self, domain: str) -> Optional[Tenant]:
         """Get tenant by domain"""
-        conn = sqlite3.connect(self.platform_db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT * FROM tenants WHERE domain = ?
-        """, (domain,))
-        
-        row = cursor.fetchone()
-        conn.close()
-        
-        if not row:
-            return None
-        
-        return self._row_to_tenant(row)
+        return self._get_tenant_cached(BY_DOMAIN, "domain", domain)
+    
+    def _get_tenant_cached(self, kind: str, column: str, value: str) -> Optional[Tenant]:
+        """Look up a tenant through the cache, loading from the database on miss"""
+        tenant = self.cache.get(kind, value)
+        if tenant is not MISS:
+            return tenant
+        
+        token = self.cache.begin_load()
+        with self.db.connection() as conn:
+            row = conn.execute(
+                f"SELECT * FROM tenants WHERE {column} = ?", (value,)
+            ).fetchone()
+        
+        tenant = self._row_to_tenant(row) if row else None
+        self.cache.put(kind, value, tenant, token)
+        return tenant
     
     def list_tenants(
         self,
@@ -202,10 +180,6 @@ class TenantManager:
         offset: int = 0
     ) -> List[Tenant]:
         """List tenants with filters"""
-        conn = sqlite3.connect(self.platform_db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
         query = "SELECT * FROM tenants WHERE 1=1"
         params = []
         
@@ -220,9 +194,8 @@ class TenantManager:
         query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
         params.extend([limit, offset])
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        conn.close()
+        with self.db.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
         
         return [self._row_to_tenant(row) for row in rows]
     
@@ -235,9 +208,6 @@ class TenantManager:
         metadata: Optional[Dict] = None
     ) -> bool:
         """Update tenant information"""
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
-        
         updates = []
         params = []
         
@@ -258,7 +228,6 @@ class TenantManager:
             params.append(str(metadata))
         
         if not updates:
-            conn.close()
             return False
         
         updates.append("updated_at = ?")
@@ -266,10 +235,10 @@ class TenantManager:
         params.append(tenant_id)
         
         query = f"UPDATE tenants SET {', '.join(updates)} WHERE tenant_id = ?"
-        cursor.execute(query, params)
+        with self.db.connection() as conn:
+            conn.execute(query, params)
         
-        conn.commit()
-        conn.close()
+        self.cache.invalidate_tenant(tenant_id)
         
         logger.info(f"Tenant updated: {tenant_id}")
         return True
@@ -288,13 +257,10 @@ class TenantManager:
     
     def delete_tenant(self, tenant_id: str) -> bool:
         """Delete a tenant (cascade deletes related data)"""
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
+        with self.db.connection() as conn:
+            conn.execute("DELETE FROM tenants WHERE tenant_id = ?", (tenant_id,))
         
-        cursor.execute("DELETE FROM tenants WHERE tenant_id = ?", (tenant_id,))
-        
-        conn.commit()
-        conn.close()
+        self.cache.invalidate_tenant(tenant_id)
         
         logger.info(f"Tenant deleted: {tenant_id}")
         return True
@@ -305,17 +271,15 @@ class TenantManager:
         if not tenant:
             return {}
         
+        return self.get_plan_quota(tenant.subscription_tier)
+    
+    def get_plan_quota(self, tier: str) -> Dict[str, Any]:
+        """Get resource quotas for a subscription tier"""
         # Get subscription plan details
-        conn = sqlite3.connect(self.platform_db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT * FROM subscription_plans WHERE tier = ?
-        """, (tenant.subscription_tier,))
-        
-        plan = cursor.fetchone()
-        conn.close()
+        with self.db.connection() as conn:
+            plan = conn.execute(
+                "SELECT * FROM subscription_plans WHERE tier = ?", (tier,)
+            ).fetchone()
         
         if not plan:
             # Default quotas
@@ -336,17 +300,14 @@ class TenantManager:
     
     def check_trial_expiry(self) -> List[str]:
         """Check for expired trials and return tenant IDs"""
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT tenant_id FROM tenants 
-            WHERE status = 'trial' 
-            AND trial_end_date < datetime('now')
-        """)
-        
-        expired = [row[0] for row in cursor.fetchall()]
-        conn.close()
+        with self.db.connection() as conn:
+            rows = conn.execute("""
+                SELECT tenant_id FROM tenants 
+                WHERE status = 'trial' 
+                AND trial_end_date < datetime('now')
+            """).fetchall()
+        
+        expired = [row[0] for row in rows]
         
         # Update expired tenants
         for tenant_id in expired:
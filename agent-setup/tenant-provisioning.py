@@ -416,23 +416,19 @@ class TenantProvisioner:
     
     def _register_tenant_database(self, tenant: Tenant, db_path: Path):
         """Register tenant database in platform database"""
-        import sqlite3
-        
-        platform_db = sqlite3.connect(self.tenant_manager.platform_db_path)
-        cursor = platform_db.cursor()
-        
-        cursor.execute("""
-            INSERT OR REPLACE INTO tenant_databases (tenant_id, database_name, database_type, connection_string)
-            VALUES (?, ?, ?, ?)
-        """, (
-            tenant.tenant_id,
-            db_path.name,
-            "sqlite",
-            str(db_path)
-        ))
+        with self.tenant_manager.db.connection() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO tenant_databases (tenant_id, database_name, database_type, connection_string)
+                VALUES (?, ?, ?, ?)
+            """, (
+                tenant.tenant_id,
+                db_path.name,
+                "sqlite",
+                str(db_path)
+            ))
         
-        platform_db.commit()
-        platform_db.close()
+        # Drop any database path resolved before registration
+        self.tenant_manager.cache.invalidate_tenant(tenant.tenant_id)
         
         logger.info(f"Registered database for tenant {tenant.tenant_id}")
 
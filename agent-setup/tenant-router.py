@@ -4,11 +4,12 @@ Supports subdomain, path, and header-based routing
 """
 
 from fastapi import Request, HTTPException
-from typing import Optional
+from typing import Any, List, Optional, Tuple
 import logging
 
 from tenant_manager import TenantManager
 from tenant_isolation import TenantIsolation, set_tenant_context
+from tenant_cache import BY_ID, BY_SUBDOMAIN, MISS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,41 +22,80 @@ class TenantRouter:
         self.tenant_manager = tenant_manager
         self.tenant_isolation = tenant_isolation
     
-    def get_tenant_from_request(self, request: Request) -> Optional[str]:
-        """Extract tenant ID from request"""
+    def _tenant_lookups(self, request: Request) -> List[Tuple[str, str]]:
+        """Get (lookup kind, value) candidates in routing priority order"""
+        lookups = []
+        
         # Method 1: Subdomain-based routing
         host = request.headers.get("host", "")
         if "." in host:
-            subdomain = host.split(".")[0]
-            tenant = self.tenant_manager.get_tenant_by_subdomain(subdomain)
-            if tenant:
-                return tenant.tenant_id
+            lookups.append((BY_SUBDOMAIN, host.split(".")[0]))
         
         # Method 2: Path-based routing (/api/tenant/{tenant_id}/...)
         path_parts = request.url.path.split("/")
-        if len(path_parts) >= 3 and path_parts[1] == "api" and path_parts[2] == "tenant":
-            if len(path_parts) >= 4:
-                tenant_id = path_parts[3]
-                tenant = self.tenant_manager.get_tenant(tenant_id)
-                if tenant:
-                    return tenant_id
+        if len(path_parts) >= 4 and path_parts[1] == "api" and path_parts[2] == "tenant":
+            lookups.append((BY_ID, path_parts[3]))
         
         # Method 3: Header-based routing (X-Tenant-ID)
         tenant_id = request.headers.get("X-Tenant-ID")
         if tenant_id:
-            tenant = self.tenant_manager.get_tenant(tenant_id)
-            if tenant:
-                return tenant_id
+            lookups.append((BY_ID, tenant_id))
         
         # Method 4: Query parameter
         tenant_id = request.query_params.get("tenant_id")
         if tenant_id:
-            tenant = self.tenant_manager.get_tenant(tenant_id)
+            lookups.append((BY_ID, tenant_id))
+        
+        return lookups
+    
+    def get_tenant_from_request(self, request: Request) -> Optional[str]:
+        """Extract tenant ID from request"""
+        for kind, value in self._tenant_lookups(request):
+            if kind == BY_SUBDOMAIN:
+                tenant = self.tenant_manager.get_tenant_by_subdomain(value)
+            else:
+                tenant = self.tenant_manager.get_tenant(value)
+            if tenant:
+                return tenant.tenant_id
+        
+        return None
+    
+    def get_cached_tenant_from_request(self, request: Request) -> Any:
+        """Extract tenant ID using only the tenant cache
+        
+        Returns MISS if any lookup would need the database.
+        """
+        for kind, value in self._tenant_lookups(request):
+            tenant = self.tenant_manager.cache.get(kind, value)
+            if tenant is MISS:
+                return MISS
             if tenant:
-                return tenant_id
+                return tenant.tenant_id
         
         return None
     
+    async def resolve_tenant(self, request: Request, db_executor) -> Optional[str]:
+        """Resolve the request's tenant and set its context from async code
+        
+        Cache hits are served inline; anything that needs the database runs
+        on the DB executor so the event loop is never blocked.
+        """
+        tenant_id = self.get_cached_tenant_from_request(request)
+        if tenant_id is None:
+            return None
+        
+        if tenant_id is not MISS and self.tenant_isolation.get_cached_database_path(tenant_id):
+            self.set_tenant_context(tenant_id)
+            return tenant_id
+        
+        def resolve():
+            resolved = self.get_tenant_from_request(request)
+            if resolved:
+                self.set_tenant_context(resolved)
+            return resolved
+        
+        return await db_executor.run(resolve)
+    
     def set_tenant_context(self, tenant_id: str):
         """Set tenant context for current request"""
         set_tenant_context(tenant_id, self.tenant_isolation)
@@ -87,6 +87,7 @@ CREATE TABLE IF NOT EXISTS usage_records (
     period_end TIMESTAMP NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (tenant_id) REFERENCES tenants(tenant_id) ON DELETE CASCADE,
+    UNIQUE (tenant_id, metric_name, period_start), -- one row per period, incremented atomically
     INDEX idx_usage_tenant_period (tenant_id, period_start, period_end),
     INDEX idx_usage_metric (metric_name, period_start)
 );
@@ -7,7 +7,6 @@ import hmac
 import hashlib
 from typing import Dict, Optional, Any
 from datetime import datetime
-import sqlite3
 
 from tenant_isolation import TenantIsolation, get_current_tenant_id
 from tenant_manager import TenantManager
@@ -26,6 +25,7 @@ class TenantSecurity:
     ):
         self.tenant_manager = tenant_manager
         self.tenant_isolation = tenant_isolation
+        self.db = tenant_manager.db
     
     def generate_api_key(self, tenant_id: str, name: str = "default") -> Dict[str, str]:
         """Generate API key for tenant"""
@@ -35,26 +35,20 @@ class TenantSecurity:
         api_secret = f"as_{uuid.uuid4().hex[:32]}"
         
         # Save to platform database
-        import sqlite3
-        conn = sqlite3.connect(self.tenant_manager.platform_db_path)
-        cursor = conn.cursor()
-        
         key_id = f"key_{uuid.uuid4().hex[:12]}"
-        cursor.execute("""
-            INSERT INTO tenant_api_keys
-            (key_id, tenant_id, api_key, api_secret, name, created_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (
-            key_id,
-            tenant_id,
-            api_key,
-            api_secret,
-            name,
-            datetime.now().isoformat()
-        ))
-        
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            conn.execute("""
+                INSERT INTO tenant_api_keys
+                (key_id, tenant_id, api_key, api_secret, name, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (
+                key_id,
+                tenant_id,
+                api_key,
+                api_secret,
+                name,
+                datetime.now().isoformat()
+            ))
         
         logger.info(f"API key generated for tenant {tenant_id}")
         
@@ -66,32 +60,21 @@ class TenantSecurity:
     
     def verify_api_key(self, api_key: str) -> Optional[str]:
         """Verify API key and return tenant ID"""
-        import sqlite3
-        conn = sqlite3.connect(self.tenant_manager.platform_db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT tenant_id FROM tenant_api_keys
-            WHERE api_key = ? AND expires_at IS NULL OR expires_at > datetime('now')
-        """, (api_key,))
-        
-        row = cursor.fetchone()
-        conn.close()
-        
-        if not row:
-            return None
-        
-        # Update last_used
-        conn = sqlite3.connect(self.tenant_manager.platform_db_path)
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE tenant_api_keys
-            SET last_used = datetime('now')
-            WHERE api_key = ?
-        """, (api_key,))
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            row = conn.execute("""
+                SELECT tenant_id FROM tenant_api_keys
+                WHERE api_key = ? AND expires_at IS NULL OR expires_at > datetime('now')
+            """, (api_key,)).fetchone()
+            
+            if not row:
+                return None
+            
+            # Update last_used
+            conn.execute("""
+                UPDATE tenant_api_keys
+                SET last_used = datetime('now')
+                WHERE api_key = ?
+            """, (api_key,))
         
         return row["tenant_id"]
     
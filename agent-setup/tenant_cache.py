@@ -0,0 +1 @@
+tenant-cache.py
\ No newline at end of file
@@ -0,0 +1 @@
+tenant-manager.py
\ No newline at end of file
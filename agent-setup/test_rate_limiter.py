@@ -0,0 +1,79 @@
+"""
+Rate Limiter Tests - Token buckets per tenant and per API key
+Runs against the in-process backend and the Redis backend, whose Lua
+script is executed by fakeredis (needs lupa) exactly as a server would
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from subscription_plans import SubscriptionPlanManager
+from rate_limiter import RateLimiter, InMemoryRateLimitBackend, RedisRateLimitBackend
+
+
+@pytest.fixture(params=["memory", "redis"])
+def limiter(request):
+    """Limiter on a fresh backend of each kind"""
+    if request.param == "redis":
+        fakeredis = pytest.importorskip("fakeredis")
+        backend = RedisRateLimitBackend(fakeredis.FakeRedis())
+    else:
+        backend = InMemoryRateLimitBackend()
+    yield RateLimiter(SubscriptionPlanManager(), backend=backend)
+    if request.param == "redis":
+        assert backend.errors == 0, "Lua script failed"
+
+
+def test_burst_then_limited(limiter):
+    tenant_limit, _ = limiter.get_limits("starter")
+
+    # A burst is allowed up to the bucket size, then throttled
+    results = [limiter.check("tenant_burst", "starter").allowed for _ in range(tenant_limit.burst + 1)]
+    assert all(results[:-1])
+    assert not results[-1]
+
+    decision = limiter.check("tenant_burst", "starter")
+    assert decision.scope == "tenant"
+    assert int(decision.headers()["Retry-After"]) >= 1
+    assert limiter.get_stats()["limited_tenant"] == 2
+
+
+def test_api_key_bucket(limiter):
+    _, key_limit = limiter.get_limits("starter")
+
+    # API keys get their own, smaller bucket within the tenant's
+    results = [
+        limiter.check("tenant_keys", "starter", api_key="ak_test").allowed
+        for _ in range(key_limit.burst + 1)
+    ]
+    assert all(results[:-1])
+    assert not results[-1]
+    assert limiter.check("tenant_keys", "starter", api_key="ak_test").scope == "api_key"
+    assert limiter.check("tenant_keys", "starter", api_key="ak_other").allowed
+
+
+def test_rejected_request_keeps_tenant_tokens(limiter):
+    _, key_limit = limiter.get_limits("starter")
+    for _ in range(key_limit.burst):
+        assert limiter.check("tenant_refund", "starter", api_key="ak_test").allowed
+
+    # Requests the API key bucket rejects don't use up the tenant's tokens
+    before = limiter.check("tenant_refund", "starter").remaining
+    for _ in range(5):
+        assert not limiter.check("tenant_refund", "starter", api_key="ak_test").allowed
+    after = limiter.check("tenant_refund", "starter").remaining
+    assert after >= before - 1
+
+
+def test_tenants_are_isolated(limiter):
+    tenant_limit, _ = limiter.get_limits("starter")
+    for _ in range(tenant_limit.burst + 1):
+        limiter.check("tenant_busy", "starter")
+
+    assert not limiter.check("tenant_busy", "starter").allowed
+    assert limiter.check("tenant_quiet", "starter").allowed
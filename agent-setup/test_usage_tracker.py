@@ -0,0 +1,199 @@
+"""
+Usage Tracker Tests - Period records in the platform database
+Covers the migration that merges duplicate period rows and the atomic
+INSERT ... ON CONFLICT increments under concurrent writers, and that
+write-behind reads count each flushed batch exactly once
+"""
+
+import sys
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from platform_db import close_all_pools
+from usage_tracker import UsageTracker, UsageMetric
+
+PERIOD_START = datetime(2024, 1, 1)
+PERIOD_END = datetime(2024, 1, 31)
+
+# Usage table as created before the unique period key existed
+LEGACY_SCHEMA = """
+    CREATE TABLE usage_records (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tenant_id VARCHAR(50) NOT NULL,
+        metric_name VARCHAR(100) NOT NULL,
+        usage_count INTEGER NOT NULL DEFAULT 0,
+        period_start TIMESTAMP NOT NULL,
+        period_end TIMESTAMP NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Path of a fresh platform database, pools closed afterwards"""
+    yield str(tmp_path / "platform.db")
+    close_all_pools()
+
+
+def seed_legacy_rows(db_path, rows):
+    """Create the legacy table holding (tenant, metric, count, period_end) rows"""
+    conn = sqlite3.connect(db_path)
+    conn.execute(LEGACY_SCHEMA)
+    conn.executemany(
+        """INSERT INTO usage_records (tenant_id, metric_name, usage_count, period_start, period_end)
+           VALUES (?, ?, ?, ?, ?)""",
+        [
+            (tenant_id, metric, count, PERIOD_START.isoformat(), period_end.isoformat())
+            for tenant_id, metric, count, period_end in rows
+        ]
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_migration_merges_duplicate_periods(db_path):
+    seed_legacy_rows(db_path, [
+        ("t1", "api_calls", 3, PERIOD_END),
+        ("t1", "api_calls", 4, PERIOD_END),
+        ("t1", "api_calls", 5, datetime(2024, 1, 31, 23, 59)),
+        ("t1", "storage_gb", 7, PERIOD_END),
+        ("t1", "storage_gb", 9, PERIOD_END),
+        ("t1", "storage_gb", 2, PERIOD_END),
+        ("t1", "emails", 6, PERIOD_END),
+        ("t2", "api_calls", 10, PERIOD_END)
+    ])
+
+    tracker = UsageTracker(None, platform_db_path=db_path)
+
+    with tracker.db.connection() as conn:
+        rows = conn.execute("""
+            SELECT tenant_id, metric_name, usage_count, period_end, COUNT(*) OVER (
+                PARTITION BY tenant_id, metric_name, period_start
+            ) AS copies
+            FROM usage_records
+        """).fetchall()
+        indexes = {row["name"]: row["unique"] for row in conn.execute("PRAGMA index_list(usage_records)")}
+
+    merged = {(row["tenant_id"], row["metric_name"]): row for row in rows}
+    assert len(rows) == 4
+    assert all(row["copies"] == 1 for row in rows)
+    # Counters are summed, storage keeps its largest reading
+    assert merged[("t1", "api_calls")]["usage_count"] == 12
+    assert merged[("t1", "api_calls")]["period_end"] == datetime(2024, 1, 31, 23, 59).isoformat()
+    assert merged[("t1", "storage_gb")]["usage_count"] == 9
+    assert merged[("t1", "emails")]["usage_count"] == 6
+    assert merged[("t2", "api_calls")]["usage_count"] == 10
+    assert indexes.get("idx_usage_period_key") == 1
+
+    # The unique key now rejects a second row for the period
+    with pytest.raises(sqlite3.IntegrityError):
+        with tracker.db.connection() as conn:
+            conn.execute(
+                """INSERT INTO usage_records (tenant_id, metric_name, usage_count, period_start, period_end)
+                   VALUES ('t1', 'api_calls', 1, ?, ?)""",
+                (PERIOD_START.isoformat(), PERIOD_END.isoformat())
+            )
+
+    # Increments land on the merged row
+    tracker.record_usage("t1", UsageMetric.API_CALLS, 3, PERIOD_START, PERIOD_END)
+    usage = tracker.get_usage("t1", period_start=PERIOD_START, period_end=datetime(2024, 2, 1))
+    assert usage["usage"]["api_calls"] == 15
+
+
+def test_migration_runs_once(db_path):
+    seed_legacy_rows(db_path, [("t1", "api_calls", 3, PERIOD_END)])
+    UsageTracker(None, platform_db_path=db_path)
+    tracker = UsageTracker(None, platform_db_path=db_path)
+
+    tracker.record_usage("t1", UsageMetric.API_CALLS, 2, PERIOD_START, PERIOD_END)
+    assert tracker.get_usage("t1", period_start=PERIOD_START, period_end=PERIOD_END)["usage"] == {"api_calls": 5}
+
+
+def test_concurrent_record_usage_is_exact(db_path):
+    tracker = UsageTracker(None, platform_db_path=db_path)
+    threads, increments = 8, 1000
+
+    def record():
+        for _ in range(increments):
+            tracker.record_usage("t1", UsageMetric.API_CALLS, 1, PERIOD_START, PERIOD_END)
+        tracker.db.close_thread_connection()
+
+    workers = [threading.Thread(target=record) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    with tracker.db.connection() as conn:
+        rows = conn.execute("SELECT usage_count FROM usage_records WHERE tenant_id = 't1'").fetchall()
+    assert [row["usage_count"] for row in rows] == [threads * increments]
+
+
+def test_write_behind_reads_count_each_batch_once(db_path):
+    tracker = UsageTracker(None, platform_db_path=db_path, write_behind=True, flush_interval=3600)
+    write_batch = tracker.buffer.flush_callback
+
+    def slow_write(rows):
+        # Widen both windows around the commit a reader could fall into
+        time.sleep(0.05)
+        write_batch(rows)
+        time.sleep(0.05)
+
+    tracker.buffer.flush_callback = slow_write
+    for _ in range(100):
+        tracker.record_usage("t1", UsageMetric.API_CALLS, 1, PERIOD_START, PERIOD_END)
+
+    flusher = threading.Thread(target=tracker.flush)
+    flusher.start()
+    seen = set()
+    while flusher.is_alive():
+        seen.add(tracker.get_usage("t1", period_start=PERIOD_START, period_end=PERIOD_END)["usage"]["api_calls"])
+        seen.add(tracker.get_period_usage("t1", [UsageMetric.API_CALLS], PERIOD_START)["api_calls"])
+    flusher.join()
+    tracker.close()
+
+    assert seen == {100}
+    assert tracker.buffer.get_stats()["pending_increments"] == 0
+
+
+def test_write_behind_concurrent_totals_are_exact(db_path):
+    tracker = UsageTracker(None, platform_db_path=db_path, write_behind=True, flush_interval=0.01)
+    threads, increments = 4, 2000
+    added = [0] * threads
+    errors = []
+
+    def record(index):
+        for _ in range(increments):
+            tracker.record_usage("t1", UsageMetric.API_CALLS, 1, PERIOD_START, PERIOD_END)
+            added[index] += 1
+
+    def read():
+        while any(worker.is_alive() for worker in workers):
+            low = sum(added)
+            usage = tracker.get_usage("t1", period_start=PERIOD_START, period_end=PERIOD_END)["usage"]
+            high = sum(added)
+            if not low <= usage.get("api_calls", 0) <= high:
+                errors.append((low, usage.get("api_calls"), high))
+        tracker.db.close_thread_connection()
+
+    workers = [threading.Thread(target=record, args=(i,)) for i in range(threads)]
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    for thread in workers + readers:
+        thread.start()
+    for thread in workers + readers:
+        thread.join()
+    tracker.close()
+
+    assert errors == []
+    assert tracker.get_usage("t1", period_start=PERIOD_START, period_end=PERIOD_END)["usage"] == {
+        "api_calls": threads * increments
+    }
@@ -0,0 +1,159 @@
+"""
+Workflow Checkpoints Tests - Recovery of executions cut off by a crash
+Each "process" is an engine with its own checkpoint store and runtime on
+one database; a crash is a process that stops writing anything
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from platform_db import close_all_pools
+from workflow_runtime import WorkflowRuntime
+from workflow_checkpoints import WorkflowCheckpointStore
+from autonomous_workflow import AutonomousWorkflowEngine, AutonomousWorkflow, WorkflowStep, TriggerType
+
+
+class FakeERPNext:
+    """Async ERPNext stand-in recording creates
+
+    Creates of doctypes in hang never return; on_create[doctype] is called
+    before a create of that doctype returns.
+    """
+
+    def __init__(self, calls, hang=(), on_create=None):
+        self.calls = calls
+        self.hang = set(hang)
+        self.on_create = on_create or {}
+
+    async def post(self, resource_type, data, timeout=None):
+        self.calls.append(resource_type)
+        if resource_type in self.on_create:
+            self.on_create[resource_type]()
+        if resource_type in self.hang:
+            await asyncio.Event().wait()
+        return {"name": f"{resource_type}-{len(self.calls)}"}
+
+
+def make_workflow():
+    """Create a lead, then a note about it"""
+    return AutonomousWorkflow(
+        workflow_id="lead_followup",
+        name="Lead Follow-up",
+        description="Create a lead and a note",
+        trigger_type=TriggerType.API,
+        trigger_config={},
+        steps=[
+            WorkflowStep(
+                step_id="create_lead", name="Create Lead", action_type="erpnext_create",
+                action_config={"resource_type": "Lead", "data": {"lead_name": "{{trigger_data.name}}"}},
+                retry_count=0
+            ),
+            WorkflowStep(
+                step_id="create_note", name="Create Note", action_type="erpnext_create",
+                action_config={"resource_type": "Note", "data": {"title": "Follow up"}},
+                retry_count=0, depends_on=["create_lead"]
+            )
+        ]
+    )
+
+
+class Process:
+    """An engine, its checkpoint store and its event loop thread"""
+
+    def __init__(self, db_path, calls, hang=(), on_create=None):
+        self.checkpoints = WorkflowCheckpointStore(db_path, flush_interval=3600)
+        self.runtime = WorkflowRuntime(name="test-runtime", blocking_workers=4)
+        self.engine = AutonomousWorkflowEngine(
+            None, None, None, checkpoints=self.checkpoints, runtime=self.runtime
+        )
+        self.engine.async_erpnext = FakeERPNext(calls, hang, on_create)
+        self.engine.register_workflow(make_workflow())
+
+    def crash(self):
+        """Die without writing another checkpoint"""
+        self.checkpoints.save = lambda *args, **kwargs: None
+        self.checkpoints.flush = lambda: 0
+        self.runtime.shutdown(timeout=2)
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll until condition() holds"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def execution_status(store, execution_id):
+    """Status column of an execution's row"""
+    with store.db.connection() as conn:
+        row = conn.execute(
+            "SELECT status FROM workflow_executions WHERE execution_id = ?", (execution_id,)
+        ).fetchone()
+    return row["status"] if row else None
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Path of a fresh tenant database, pools closed afterwards"""
+    yield str(tmp_path / "tenant.db")
+    close_all_pools()
+
+
+def test_effect_journal(db_path):
+    store = WorkflowCheckpointStore(db_path)
+    assert store.get_effect("exec_1:create_lead") is None
+
+    store.record_effect("exec_1:create_lead", "exec_1", {"success": True, "data": {"name": "LEAD-1"}})
+    assert store.get_effect("exec_1:create_lead") == {"success": True, "data": {"name": "LEAD-1"}}
+
+    # Finishing the execution drops its journal
+    store.save("exec_1", "lead_followup", "completed", {"started_at": None})
+    assert store.get_effect("exec_1:create_lead") is None
+
+
+def test_crash_mid_execution_is_resumed_once(db_path):
+    calls = []
+
+    # First process: its last checkpoint is written while the lead is being
+    # created, the lead is journaled, then it dies creating the note
+    first = Process(db_path, calls, hang={"Note"}, on_create={"Lead": lambda: first.checkpoints.flush()})
+    first.runtime.submit(first.engine.execute_workflow("lead_followup", {"name": "ACME"}))
+    wait_for(lambda: calls == ["Lead", "Note"])
+    execution_id = next(iter(first.engine.running_workflows))
+    first.crash()
+    assert execution_status(first.checkpoints, execution_id) == "running"
+
+    # Second process claims it and reruns the lead step from the journal,
+    # then dies before writing its next checkpoint
+    second = Process(db_path, calls, hang={"Note"})
+    assert second.engine.recover_executions() == 1
+    wait_for(lambda: calls == ["Lead", "Note", "Note"])
+    second.crash()
+    assert second.checkpoints.get_stats()["replayed_effects"] == 1
+    assert execution_status(second.checkpoints, execution_id) == "recovering"
+
+    # Third process still finds it and finishes it without a second lead
+    third = Process(db_path, calls)
+    assert third.engine.recover_executions() == 1
+    wait_for(lambda: execution_id in third.engine.finished_executions)
+    third.checkpoints.flush()
+
+    execution = third.engine.finished_executions[execution_id]
+    assert execution.status.value == "completed"
+    assert calls == ["Lead", "Note", "Note", "Note"]
+    assert execution.context["step_create_lead_result"]["data"] == {"name": "Lead-1"}
+    assert execution_status(third.checkpoints, execution_id) == "completed"
+    assert third.checkpoints.get_effect(f"{execution_id}:create_lead") is None
+    assert third.checkpoints.get_stats()["replayed_effects"] == 1
+
+    third.checkpoints.stop()
+    third.runtime.shutdown(timeout=2)
+    assert third.engine.recover_executions() == 0
@@ -10,6 +10,9 @@ import os
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import threading
+import time
+import zlib
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -30,9 +33,19 @@ from ksa_localization import KSALocalizationManager, KSALocalization
 # ERPNext integration
 from erpnext_tenant_integration import ERPNextTenantIntegration
 from agent_orchestrator import ERPNextClient, AgentOrchestrator
+from task_pool import get_task_pool
+from erpnext_cache import get_erpnext_cache, ERPNEXT_CACHE_INVALIDATE_EVENT
+from single_flight import get_erpnext_single_flight_stats
+from circuit_breaker import get_circuit_breaker_stats
+from tenant_cache import TENANT_CACHE_INVALIDATE_EVENT
+from subscription_plans import SubscriptionPlanManager
 
 # Autonomous systems
 from autonomous_workflow import AutonomousWorkflowEngine, AutonomousWorkflow, WorkflowStep, TriggerType
+from workflow_timers import WorkflowTimerService
+from workflow_checkpoints import WorkflowCheckpointStore
+from workflow_scheduler import get_workflow_scheduler
+from workflow_runtime import get_workflow_runtime
 from self_healing_system import SelfHealingSystem
 from email_integration import EmailManager, ERPNextEmailIntegration
 
@@ -47,6 +60,10 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Cache coherence traffic on the event bus, not tenant activity
+INTERNAL_EVENT_TYPES = {TENANT_CACHE_INVALIDATE_EVENT, ERPNEXT_CACHE_INVALIDATE_EVENT}
+
+
 @dataclass
 class UnifiedSystemConfig:
     """Configuration for unified integrated system"""
@@ -80,10 +97,23 @@ class UnifiedSystemConfig:
     # Auto-provisioning
     auto_provision_new_tenants: bool = True
     default_subscription_tier: str = "starter"
+    
+    # On-demand tenant activation
+    max_active_tenants: int = 100  # LRU tenants are stopped beyond this
+    tenant_idle_timeout: int = 900  # Seconds without activity before a tenant is stopped
+    tenant_schedule_stagger: int = 900  # Seconds over which first scheduled activations are spread
+    maintenance_interval: int = 30  # Seconds between idle/schedule sweeps
 
 
 class UnifiedOrchestrator:
-    """Unified orchestrator integrating all system components"""
+    """Unified orchestrator integrating all system components
+    
+    Tenant orchestrators are activated on demand - by a request, an event or
+    a scheduled workflow falling due - and torn down after
+    tenant_idle_timeout seconds without activity. At most max_active_tenants
+    are kept running; past that the least recently used one is evicted, so
+    startup time and thread count don't grow with the number of tenants.
+    """
     
     def __init__(self, config: UnifiedSystemConfig):
         self.config = config
@@ -115,31 +145,242 @@ class UnifiedOrchestrator:
         self.metrics_collector = MetricsCollector(self.tenant_isolation)
         self.usage_tracker = UsageTracker(self.tenant_manager)
         
-        # Per-tenant orchestrators
-        self.tenant_orchestrators: Dict[str, 'TenantOrchestrator'] = {}
+        # Agent tasks of all tenants share one worker pool, weighted by plan
+        self.task_pool = get_task_pool()
+        self.plan_manager = SubscriptionPlanManager()
+        
+        # Active per-tenant orchestrators, least recently used first
+        self.tenant_orchestrators: 'OrderedDict[str, TenantOrchestrator]' = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._activation_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        
+        # Scheduled workflow state of inactive tenants
+        self._schedule_due: Dict[str, float] = {}  # tenant_id -> epoch time next workflow is due
+        self._last_runs: Dict[str, Dict[str, datetime]] = {}  # tenant_id -> workflow_id -> last run
+        
+        self._stop_event = threading.Event()
+        self._maintenance_thread: Optional[threading.Thread] = None
         
         # System status
         self.running = False
         self.start_time: Optional[datetime] = None
         
+        # Statistics
+        self.activations = 0
+        self.idle_evictions = 0
+        self.lru_evictions = 0
+        
         logger.info("Unified orchestrator initialized")
     
     def get_or_create_tenant_orchestrator(self, tenant_id: str) -> 'TenantOrchestrator':
         """Get or create orchestrator for a specific tenant"""
-        if tenant_id not in self.tenant_orchestrators:
-            tenant = self.tenant_manager.get_tenant(tenant_id)
-            if not tenant:
-                raise ValueError(f"Tenant {tenant_id} not found")
+        return self.activate_tenant(tenant_id)
+    
+    def activate_tenant(self, tenant_id: str, reason: str = "request") -> 'TenantOrchestrator':
+        """Get a tenant's orchestrator, creating and starting it if it isn't active"""
+        orchestrator = self._touch(tenant_id)
+        if orchestrator:
+            return orchestrator
+        
+        with self._lock:
+            activation_lock = self._activation_locks.setdefault(tenant_id, threading.Lock())
+        
+        # One activation per tenant at a time; other tenants aren't blocked
+        with activation_lock:
+            try:
+                orchestrator = self._touch(tenant_id)
+                if orchestrator:
+                    return orchestrator
+                
+                tenant = self.tenant_manager.get_tenant(tenant_id)
+                if not tenant:
+                    raise ValueError(f"Tenant {tenant_id} not found")
+                if tenant.status not in ["trial", "active"]:
+                    raise ValueError(f"Tenant {tenant_id} is not active (status: {tenant.status})")
+                
+                orchestrator = TenantOrchestrator(
+                    tenant=tenant,
+                    unified_orchestrator=self,
+                    config=self.config
+                )
+                orchestrator.initialize()
+                
+                with self._lock:
+                    last_runs = self._last_runs.pop(tenant_id, {})
+                # Scheduled workflows pick up where the last activation left off
+                orchestrator.restore_schedule(last_runs)
+                if self.running:
+                    orchestrator.start()
+                
+                with self._lock:
+                    # A caller that arrived after a failed activation dropped
+                    # the lock may have activated the tenant meanwhile
+                    existing = self.tenant_orchestrators.get(tenant_id)
+                    evicted = []
+                    if existing is None:
+                        self._schedule_due.pop(tenant_id, None)
+                        self.tenant_orchestrators[tenant_id] = orchestrator
+                        self._last_used[tenant_id] = time.monotonic()
+                        self.activations += 1
+                        evicted = self._evict_lru(keep=tenant_id)
+            finally:
+                with self._lock:
+                    self._activation_locks.pop(tenant_id, None)
+            
+            if existing is not None:
+                self._stop_tenant(tenant_id, orchestrator, "activated concurrently")
+                return existing
             
-            orchestrator = TenantOrchestrator(
-                tenant=tenant,
-                unified_orchestrator=self,
-                config=self.config
+            logger.info(f"✓ Activated orchestrator for tenant: {tenant.name} ({tenant_id}, {reason})")
+        
+        for evicted_id, evicted_orchestrator in evicted:
+            self._stop_tenant(evicted_id, evicted_orchestrator, "least recently used")
+        
+        return orchestrator
+    
+    def touch_tenant(self, tenant_id: str) -> bool:
+        """Record activity for a tenant without activating it, returns whether it is active"""
+        return self._touch(tenant_id) is not None
+    
+    def _touch(self, tenant_id: str) -> Optional['TenantOrchestrator']:
+        """Mark an active tenant as most recently used"""
+        with self._lock:
+            orchestrator = self.tenant_orchestrators.get(tenant_id)
+            if orchestrator is not None:
+                self.tenant_orchestrators.move_to_end(tenant_id)
+                self._last_used[tenant_id] = time.monotonic()
+            return orchestrator
+    
+    def _detach(self, tenant_id: str) -> 'TenantOrchestrator':
+        """Remove an active tenant, keeping its schedule so it can be reactivated (lock held)"""
+        orchestrator = self.tenant_orchestrators.pop(tenant_id)
+        self._last_used.pop(tenant_id, None)
+        
+        engine = orchestrator.workflow_engine
+        if engine:
+            self._last_runs[tenant_id] = {
+                workflow_id: workflow.last_run
+                for workflow_id, workflow in engine.workflows.items()
+                if workflow.last_run
+            }
+            # Suspended executions (long waits, retry delays) resume from the
+            # timer table, which only runs while the tenant is active
+            next_run = engine.next_scheduled_run()
+            due = [next_run.timestamp()] if next_run else []
+            if engine.timers:
+                try:
+                    timer_due = engine.timers.next_due()
+                except Exception as e:
+                    logger.error(f"Error reading workflow timers of tenant {tenant_id}: {str(e)}")
+                    timer_due = None
+                if timer_due is not None:
+                    due.append(timer_due)
+            if due:
+                self._schedule_due[tenant_id] = min(due)
+        return orchestrator
+    
+    def _evict_lru(self, keep: str) -> List[tuple]:
+        """Detach least recently used idle tenants until under the cap (lock held)
+
+        Busy tenants are never stopped mid-execution; while every other
+        tenant has work in flight the cap is exceeded until some finish.
+        """
+        evicted = []
+        while len(self.tenant_orchestrators) > self.config.max_active_tenants:
+            victim = next(
+                (
+                    tenant_id for tenant_id, orchestrator in self.tenant_orchestrators.items()
+                    if tenant_id != keep and not orchestrator.is_busy()
+                ),
+                None
             )
-            self.tenant_orchestrators[tenant_id] = orchestrator
-            orchestrator.initialize()
+            if victim is None:
+                break
+            evicted.append((victim, self._detach(victim)))
+            self.lru_evictions += 1
+        return evicted
+    
+    def _stop_tenant(self, tenant_id: str, orchestrator: 'TenantOrchestrator', reason: str):
+        """Stop a detached tenant orchestrator"""
+        try:
+            orchestrator.stop()
+            logger.info(f"Deactivated orchestrator for tenant {tenant_id} ({reason})")
+        except Exception as e:
+            logger.error(f"Error stopping tenant {tenant_id}: {str(e)}")
+    
+    def evict_idle_tenants(self) -> int:
+        """Stop tenants idle for longer than tenant_idle_timeout, returns how many"""
+        cutoff = time.monotonic() - self.config.tenant_idle_timeout
+        evicted = []
+        with self._lock:
+            for tenant_id, orchestrator in list(self.tenant_orchestrators.items()):
+                if self._last_used.get(tenant_id, 0) > cutoff:
+                    continue
+                if orchestrator.is_busy():
+                    # Work in flight counts as activity
+                    self._last_used[tenant_id] = time.monotonic()
+                    continue
+                evicted.append((tenant_id, self._detach(tenant_id)))
+                self.idle_evictions += 1
+        
+        for tenant_id, orchestrator in evicted:
+            self._stop_tenant(tenant_id, orchestrator, "idle")
+        return len(evicted)
+    
+    def activate_due_tenants(self) -> int:
+        """Activate inactive tenants whose scheduled workflows are due, returns how many"""
+        now = time.time()
+        with self._lock:
+            due = sorted(
+                (due_at, tenant_id) for tenant_id, due_at in self._schedule_due.items()
+                if due_at <= now and tenant_id not in self.tenant_orchestrators
+            )
+            # Don't evict tenants to make room for scheduled work; the rest wait for the next sweep
+            capacity = self.config.max_active_tenants - len(self.tenant_orchestrators)
+            due = [tenant_id for _, tenant_id in due[:max(0, capacity)]]
         
-        return self.tenant_orchestrators[tenant_id]
+        activated = 0
+        for tenant_id in due:
+            tenant = self.tenant_manager.get_tenant(tenant_id)
+            if not tenant or tenant.status not in ["trial", "active"]:
+                with self._lock:
+                    self._schedule_due.pop(tenant_id, None)
+                    self._last_runs.pop(tenant_id, None)
+                continue
+            
+            try:
+                self.activate_tenant(tenant_id, reason="schedule")
+                activated += 1
+            except Exception as e:
+                logger.error(f"Error activating tenant {tenant_id} for scheduled workflows: {str(e)}")
+        return activated
+    
+    def bind_event_bus(self, event_bus):
+        """Activate a tenant's orchestrator when an event arrives for it and
+        start the tenant's workflows triggered by the event
+
+        With Redis each event is taken by one gateway node (subscribe_once),
+        so a webhook starts its workflows once however many nodes run.
+        """
+        def on_event(event):
+            if self.running and event.tenant_id and event.event_type not in INTERNAL_EVENT_TYPES:
+                orchestrator = self.activate_tenant(event.tenant_id, reason=f"event {event.event_type}")
+                if orchestrator.workflow_engine:
+                    orchestrator.workflow_engine.trigger_workflows_by_event(
+                        event.tenant_id, event.event_type, event.data
+                    )
+        
+        event_bus.subscribe_once("*", on_event)
+    
+    def _maintenance_loop(self):
+        """Evict idle tenants and activate tenants with scheduled work due"""
+        while not self._stop_event.wait(self.config.maintenance_interval):
+            try:
+                self.evict_idle_tenants()
+                self.activate_due_tenants()
+            except Exception as e:
+                logger.error(f"Error in orchestrator maintenance loop: {str(e)}")
     
     def start(self):
         """Start the unified system"""
@@ -151,17 +392,28 @@ class UnifiedOrchestrator:
         self.running = True
         self.start_time = datetime.now()
         
-        # Initialize all active tenants
-        active_tenants = self.tenant_manager.list_tenants(status="active")
-        logger.info(f"Found {len(active_tenants)} active tenants")
-        
-        for tenant in active_tenants:
-            try:
-                orchestrator = self.get_or_create_tenant_orchestrator(tenant.tenant_id)
-                orchestrator.start()
-                logger.info(f"✓ Started orchestrator for tenant: {tenant.name} ({tenant.tenant_id})")
-            except Exception as e:
-                logger.error(f"Error starting tenant {tenant.tenant_id}: {str(e)}")
+        # Tenants are started on demand; only plan when their scheduled
+        # workflows first run, staggered so they don't all start at once
+        if self.config.enable_autonomous_workflows:
+            active_tenants = self.tenant_manager.list_tenants(status="active")
+            now = time.time()
+            stagger = max(1, self.config.tenant_schedule_stagger)
+            with self._lock:
+                for tenant in active_tenants:
+                    if tenant.tenant_id not in self.tenant_orchestrators:
+                        offset = zlib.crc32(tenant.tenant_id.encode()) % stagger
+                        self._schedule_due.setdefault(tenant.tenant_id, now + offset)
+            logger.info(f"Found {len(active_tenants)} active tenants, activating on demand")
+        
+        # Orchestrators activated before start()
+        with self._lock:
+            pending = [o for o in self.tenant_orchestrators.values() if not o.running]
+        for orchestrator in pending:
+            orchestrator.start()
+        
+        self._stop_event.clear()
+        self._maintenance_thread = threading.Thread(target=self._maintenance_loop, daemon=True)
+        self._maintenance_thread.start()
         
         logger.info("="*60)
         logger.info("Unified system fully operational")
@@ -171,12 +423,16 @@ class UnifiedOrchestrator:
         """Stop the unified system"""
         logger.info("Stopping unified system...")
         self.running = False
+        self._stop_event.set()
+        if self._maintenance_thread:
+            self._maintenance_thread.join(timeout=5)
+            self._maintenance_thread = None
         
-        for tenant_id, orchestrator in self.tenant_orchestrators.items():
-            try:
-                orchestrator.stop()
-            except Exception as e:
-                logger.error(f"Error stopping tenant {tenant_id}: {str(e)}")
+        with self._lock:
+            stopped = [(tenant_id, self._detach(tenant_id)) for tenant_id in list(self.tenant_orchestrators)]
+        
+        for tenant_id, orchestrator in stopped:
+            self._stop_tenant(tenant_id, orchestrator, "shutdown")
         
         logger.info("Unified system stopped")
     
@@ -184,18 +440,35 @@ class UnifiedOrchestrator:
         """Get comprehensive system status"""
         uptime = (datetime.now() - self.start_time).total_seconds() if self.start_time else 0
         
+        with self._lock:
+            active = list(self.tenant_orchestrators.items())
+            scheduled = len(self._schedule_due)
+        
         tenant_statuses = {}
-        for tenant_id, orchestrator in self.tenant_orchestrators.items():
+        for tenant_id, orchestrator in active:
             tenant_statuses[tenant_id] = orchestrator.get_status()
         
+        erpnext_cache = get_erpnext_cache()
         return {
             "status": "running" if self.running else "stopped",
             "uptime_seconds": uptime,
             "start_time": self.start_time.isoformat() if self.start_time else None,
             "tenants": {
-                "total": len(self.tenant_orchestrators),
+                "total": len(active),
+                "max_active": self.config.max_active_tenants,
+                "idle_timeout_seconds": self.config.tenant_idle_timeout,
+                "scheduled_inactive": scheduled,
+                "activations": self.activations,
+                "idle_evictions": self.idle_evictions,
+                "lru_evictions": self.lru_evictions,
                 "statuses": tenant_statuses
             },
+            "task_pool": self.task_pool.get_stats(),
+            "workflow_scheduler": get_workflow_scheduler().get_stats(),
+            "workflow_runtime": get_workflow_runtime().get_stats(),
+            "erpnext_cache": erpnext_cache.get_stats() if erpnext_cache else None,
+            "erpnext_coalescing": get_erpnext_single_flight_stats(),
+            "erpnext_sites": get_circuit_breaker_stats(),
             "features": {
                 "multi_tenant": self.config.enable_multi_tenant,
                 "autonomous_workflows": self.config.enable_autonomous_workflows,
@@ -235,6 +508,7 @@ class TenantOrchestrator:
         # Status
         self.running = False
         self.start_time: Optional[datetime] = None
+        self._stop_event = threading.Event()
     
     def initialize(self):
         """Initialize tenant-specific components"""
@@ -278,15 +552,32 @@ class TenantOrchestrator:
         
         # Initialize agent orchestrator
         if self.config.enable_employee_agents and self.erpnext_client:
-            self.agent_orchestrator = AgentOrchestrator(self.erpnext_client, max_agents=20)
+            self.agent_orchestrator = AgentOrchestrator(
+                self.erpnext_client,
+                max_agents=20,
+                task_pool=self.unified.task_pool,
+                tenant_id=self.tenant.tenant_id
+            )
+            plan = self.unified.plan_manager.get_plan_by_tier(self.tenant.subscription_tier)
+            if plan:
+                self.unified.task_pool.set_tenant_limits(
+                    self.tenant.tenant_id,
+                    weight=plan.task_weight,
+                    max_concurrent=plan.max_concurrent_tasks
+                )
             logger.info(f"✓ Agent orchestrator initialized for tenant {self.tenant.tenant_id}")
         
         # Initialize workflow engine
         if self.config.enable_autonomous_workflows and self.erpnext_client:
+            # Suspended executions and checkpoints live in the tenant's own database
+            tenant_db_path = self.unified.tenant_isolation.get_tenant_database_path(self.tenant.tenant_id)
             self.workflow_engine = AutonomousWorkflowEngine(
                 self.erpnext_client,
                 self.email_manager,
-                self.agent_orchestrator
+                self.agent_orchestrator,
+                timers=WorkflowTimerService(str(tenant_db_path)),
+                checkpoints=WorkflowCheckpointStore(str(tenant_db_path), tenant_id=self.tenant.tenant_id),
+                tenant_id=self.tenant.tenant_id
             )
             self._initialize_tenant_workflows()
             logger.info(f"✓ Workflow engine initialized for tenant {self.tenant.tenant_id}")
@@ -348,7 +639,7 @@ class TenantOrchestrator:
                     action_type="erpnext_get",
                     action_config={
                         "resource_type": "Quotation",
-                        "filters": {"status": "Submitted"}
+                        "filters": {"name": "{{trigger_data.name}}"}
                     }
                 ),
                 WorkflowStep(
@@ -363,7 +654,8 @@ class TenantOrchestrator:
                     depends_on=["get_quotation"]
                 )
             ],
-            enabled=True
+            enabled=True,
+            max_concurrent=10  # One execution per event, each for its own document
         )
         self.workflow_engine.register_workflow(quotation_workflow)
         
@@ -381,7 +673,7 @@ class TenantOrchestrator:
                     action_type="erpnext_get",
                     action_config={
                         "resource_type": "Sales Invoice",
-                        "filters": {"status": "Submitted"}
+                        "filters": {"name": "{{trigger_data.name}}"}
                     }
                 ),
                 WorkflowStep(
@@ -396,7 +688,8 @@ class TenantOrchestrator:
                     depends_on=["get_invoice"]
                 )
             ],
-            enabled=True
+            enabled=True,
+            max_concurrent=10  # One execution per event, each for its own document
         )
         self.workflow_engine.register_workflow(invoice_workflow)
         
@@ -437,6 +730,23 @@ class TenantOrchestrator:
         )
         self.workflow_engine.register_workflow(followup_workflow)
     
+    def restore_schedule(self, last_runs: Dict[str, datetime]):
+        """Restore scheduled workflow run times from a previous activation"""
+        if not self.workflow_engine:
+            return
+        for workflow_id, last_run in last_runs.items():
+            workflow = self.workflow_engine.workflows.get(workflow_id)
+            if workflow:
+                workflow.last_run = last_run
+    
+    def is_busy(self) -> bool:
+        """Check whether workflows or agent tasks are in flight"""
+        if self.workflow_engine and self.workflow_engine.running_workflows:
+            return True
+        if self.agent_orchestrator and self.agent_orchestrator.has_pending_work():
+            return True
+        return False
+    
     def start(self):
         """Start tenant orchestrator"""
         logger.info(f"Starting orchestrator for tenant: {self.tenant.name}")
@@ -461,7 +771,7 @@ class TenantOrchestrator:
         
         # Start agent orchestrator
         if self.agent_orchestrator and self.config.enable_employee_agents:
-            self.agent_orchestrator.start(num_workers=10)
+            self.agent_orchestrator.start()  # Tasks run on the shared task pool
             logger.info(f"  ✓ Agent orchestrator started")
         
         logger.info(f"✓ Tenant orchestrator started: {self.tenant.name}")
@@ -475,10 +785,10 @@ class TenantOrchestrator:
                         processed = self.email_integration.process_incoming_emails()
                         if processed:
                             logger.info(f"[{self.tenant.name}] Processed {len(processed)} emails automatically")
-                    asyncio.sleep(900)  # 15 minutes
+                    self._stop_event.wait(900)  # 15 minutes, or until stopped
                 except Exception as e:
                     logger.error(f"[{self.tenant.name}] Error in email processor: {str(e)}")
-                    asyncio.sleep(60)
+                    self._stop_event.wait(60)
         
         email_thread = threading.Thread(target=email_processor_loop, daemon=True)
         email_thread.start()
@@ -487,13 +797,20 @@ class TenantOrchestrator:
         """Stop tenant orchestrator"""
         logger.info(f"Stopping orchestrator for tenant: {self.tenant.name}")
         self.running = False
+        self._stop_event.set()
         
         if self.workflow_engine:
-            self.workflow_engine.running = False
+            self.workflow_engine.stop_scheduler()
         
         if self.self_healing:
             self.self_healing.running = False
         
+        if self.agent_orchestrator:
+            self.agent_orchestrator.stop()
+        
+        if self.erpnext_client:
+            self.erpnext_client.flush_writes()
+        
         logger.info(f"✓ Tenant orchestrator stopped: {self.tenant.name}")
     
     def get_status(self) -> Dict:
@@ -513,11 +830,13 @@ class TenantOrchestrator:
             "workflows": {
                 "enabled": self.config.enable_autonomous_workflows,
                 "total": len(self.workflow_engine.workflows) if self.workflow_engine else 0,
-                "running": len(self.workflow_engine.running_workflows) if self.workflow_engine else 0
+                "running": len(self.workflow_engine.running_workflows) if self.workflow_engine else 0,
+                "admission": self.workflow_engine.get_admission_stats() if self.workflow_engine else None
             },
             "agents": {
                 "enabled": self.config.enable_employee_agents,
-                "total": len(self.agent_orchestrator.agents) if self.agent_orchestrator else 0
+                "total": len(self.agent_orchestrator.agents) if self.agent_orchestrator else 0,
+                "tasks": self.unified.task_pool.get_tenant_stats(self.tenant.tenant_id)
             }
         }
 
@@ -546,7 +865,9 @@ if __name__ == "__main__":
         enable_email_processing=True,
         enable_employee_agents=True,
         enable_ksa_localization=True,
-        enable_monitoring=True
+        enable_monitoring=True,
+        max_active_tenants=int(os.getenv("MAX_ACTIVE_TENANTS", "100")),
+        tenant_idle_timeout=int(os.getenv("TENANT_IDLE_TIMEOUT", "900"))
     )
     
     orchestrator = UnifiedOrchestrator(config)
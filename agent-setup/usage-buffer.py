@@ -0,0 +1,293 @@
+"""
+Usage Buffer - Write-behind sharded counters for usage tracking
+Aggregates usage increments in memory and flushes them to the platform
+database in periodic batches instead of one write per increment
+"""
+
+import atexit
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# (tenant_id, metric_name, period_start, period_end) with ISO period bounds
+UsageKey = Tuple[str, str, str, str]
+
+
+class _Shard:
+    """One lock-protected slice of the pending counters"""
+
+    __slots__ = ("lock", "deltas", "increments")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.deltas: Dict[UsageKey, int] = {}
+        self.increments: Dict[UsageKey, int] = {}  # add() calls folded into each delta
+
+
+class UsageCounterBuffer:
+    """Sharded in-memory usage counters with periodic batched flush
+
+    Loss bound: on a hard crash at most flush_interval seconds of
+    increments, and never much more than max_pending increments, are
+    lost. A clean stop() (also registered with atexit) flushes everything.
+    Failed flushes are merged back and retried.
+    """
+
+    def __init__(
+        self,
+        flush_callback: Callable[[List[Tuple[UsageKey, int]]], None],
+        flush_interval: float = 5.0,
+        num_shards: int = 16,
+        max_pending: int = 10000
+    ):
+        self.flush_callback = flush_callback
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._shards = [_Shard() for _ in range(num_shards)]
+        self._pending = 0
+        self._inflight: Dict[UsageKey, int] = {}
+        self._flush_listeners: List[Callable[[List[Tuple[UsageKey, int]]], None]] = []
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Odd while a batch is being committed, bumped again once readers
+        # see it only in the database (or, on failure, only pending again)
+        self._flush_seq = 0
+        self._flush_cond = threading.Condition()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.running = False
+
+        # Statistics
+        self.flush_count = 0
+        self.flushed_rows = 0
+        self.failed_flushes = 0
+        self.last_flush: Optional[float] = None
+
+    def _shard_for(self, tenant_id: str) -> _Shard:
+        """Pick the shard for a tenant"""
+        return self._shards[hash(tenant_id) % len(self._shards)]
+
+    def add(self, tenant_id: str, metric_name: str, count: int, period_start: str, period_end: str):
+        """Add an increment to the pending counters"""
+        key = (tenant_id, metric_name, period_start, period_end)
+        shard = self._shard_for(tenant_id)
+        with shard.lock:
+            shard.deltas[key] = shard.deltas.get(key, 0) + count
+            shard.increments[key] = shard.increments.get(key, 0) + 1
+            # Counted before flush() can take the increment and subtract it
+            with self._pending_lock:
+                self._pending += 1
+                over_limit = self._pending >= self.max_pending
+
+        if over_limit:
+            # Bound the unflushed window by count as well as by time
+            self._wakeup.set()
+
+    def discard(self, tenant_id: str, metric_name: str, period_start: str, period_end: str):
+        """Drop pending increments for a key (used when a value is replaced)"""
+        key = (tenant_id, metric_name, period_start, period_end)
+        shard = self._shard_for(tenant_id)
+        with shard.lock:
+            shard.deltas.pop(key, None)
+            dropped = shard.increments.pop(key, 0)
+
+        if dropped:
+            with self._pending_lock:
+                self._pending = max(0, self._pending - dropped)
+
+    def pending_count(self, key: UsageKey) -> int:
+        """Get the unflushed total for one exact key in O(1)"""
+        shard = self._shard_for(key[0])
+        with shard.lock:
+            # flush() moves deltas to _inflight and back holding every shard lock
+            return shard.deltas.get(key, 0) + self._inflight.get(key, 0)
+
+    def add_flush_listener(self, listener: Callable[[List[Tuple[UsageKey, int]]], None]):
+        """Register a callback invoked with the rows of each committed flush
+
+        Readers see each increment either pending or in-flight until the
+        flush callback returns, then in the database only. A reader adding
+        database totals to pending ones must not let a commit fall between
+        its two reads (it would count the batch twice, or miss it): see
+        flush_sequence(). Listeners run after the switch, so database
+        totals they read include the batch and the in-flight counts don't.
+        """
+        self._flush_listeners.append(listener)
+
+    def flush_sequence(self) -> int:
+        """Counter that changes whenever a batch starts or finishes committing
+
+        Read it before and after reading pending and database totals; if it
+        changed (or was odd, a commit in progress) the two reads may disagree.
+        """
+        return self._flush_seq
+
+    def wait_committed(self, timeout: Optional[float] = None) -> int:
+        """Wait until no batch is being committed, returns flush_sequence()"""
+        with self._flush_cond:
+            self._flush_cond.wait_for(lambda: self._flush_seq % 2 == 0, timeout)
+            return self._flush_seq
+
+    def _bump_sequence(self):
+        """Mark the start or end of a commit"""
+        with self._flush_cond:
+            self._flush_seq += 1
+            self._flush_cond.notify_all()
+
+    def pending_for(
+        self,
+        tenant_id: str,
+        metric_name: Optional[str] = None,
+        period_start: Optional[str] = None,
+        period_end: Optional[str] = None
+    ) -> Dict[str, int]:
+        """Get unflushed totals per metric for a tenant within a period range"""
+        shard = self._shard_for(tenant_id)
+        with shard.lock:
+            # A batch being written is still visible until its commit lands
+            items = list(shard.deltas.items()) + list(self._inflight.items())
+
+        totals: Dict[str, int] = {}
+        for (key_tenant, key_metric, key_start, key_end), delta in items:
+            if key_tenant != tenant_id:
+                continue
+            if metric_name and key_metric != metric_name:
+                continue
+            if period_start and key_start < period_start:
+                continue
+            if period_end and key_end > period_end:
+                continue
+            totals[key_metric] = totals.get(key_metric, 0) + delta
+        return totals
+
+    def _lock_shards(self):
+        """Take every shard lock, in order"""
+        for shard in self._shards:
+            shard.lock.acquire()
+
+    def _unlock_shards(self):
+        """Release every shard lock"""
+        for shard in reversed(self._shards):
+            shard.lock.release()
+
+    def flush(self) -> int:
+        """Write all pending increments in one batch, returns rows written"""
+        with self._flush_lock:
+            batch: Dict[UsageKey, int] = {}
+            increments: Dict[UsageKey, int] = {}
+            # Moving the deltas to _inflight under every shard lock means
+            # readers (which hold one) see them in exactly one of the two
+            self._lock_shards()
+            try:
+                for shard in self._shards:
+                    for key, delta in shard.deltas.items():
+                        batch[key] = batch.get(key, 0) + delta
+                    for key, count in shard.increments.items():
+                        increments[key] = increments.get(key, 0) + count
+                    shard.deltas, shard.increments = {}, {}
+                self._inflight = batch
+            finally:
+                self._unlock_shards()
+
+            with self._pending_lock:
+                self._pending = max(0, self._pending - sum(increments.values()))
+
+            if not batch:
+                return 0
+
+            rows = [(key, delta) for key, delta in batch.items() if delta]
+            self._bump_sequence()
+            try:
+                self.flush_callback(rows)
+            except Exception as e:
+                # Put the deltas back so the next flush retries them
+                try:
+                    self._restore(batch, increments)
+                finally:
+                    self._bump_sequence()
+                self.failed_flushes += 1
+                logger.error(f"Usage flush failed, {len(rows)} rows kept for retry: {str(e)}")
+                return 0
+
+            # Committed: the rows count in the database from here on
+            self._lock_shards()
+            try:
+                self._inflight = {}
+            finally:
+                self._unlock_shards()
+            self._bump_sequence()
+
+            for listener in self._flush_listeners:
+                try:
+                    listener(rows)
+                except Exception as e:
+                    logger.error(f"Error in usage flush listener: {str(e)}")
+
+            self.flush_count += 1
+            self.flushed_rows += len(rows)
+            self.last_flush = time.time()
+            logger.debug(f"Flushed {len(rows)} usage rows")
+            return len(rows)
+
+    def _restore(self, batch: Dict[UsageKey, int], increments: Dict[UsageKey, int]):
+        """Merge a failed in-flight batch back into the pending counters"""
+        self._lock_shards()
+        try:
+            for key, delta in batch.items():
+                shard = self._shard_for(key[0])
+                shard.deltas[key] = shard.deltas.get(key, 0) + delta
+                shard.increments[key] = shard.increments.get(key, 0) + increments.get(key, 0)
+            self._inflight = {}
+        finally:
+            self._unlock_shards()
+
+        with self._pending_lock:
+            self._pending += sum(increments.values())
+
+    def start(self):
+        """Start the background flush thread"""
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info(f"Usage buffer started (flush every {self.flush_interval}s)")
+
+    def _flush_loop(self):
+        """Flush periodically, or early when max_pending is reached"""
+        while self.running:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error in usage flush loop: {str(e)}")
+
+    def stop(self):
+        """Stop the flush thread and flush what's left"""
+        if self.running:
+            self.running = False
+            self._wakeup.set()
+            if self._thread and self._thread is not threading.current_thread():
+                self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def get_stats(self) -> Dict[str, object]:
+        """Get buffer statistics"""
+        with self._pending_lock:
+            pending = self._pending
+
+        return {
+            "pending_increments": pending,
+            "flush_interval": self.flush_interval,
+            "flush_count": self.flush_count,
+            "flushed_rows": self.flushed_rows,
+            "failed_flushes": self.failed_flushes,
+            "last_flush": self.last_flush
+        }
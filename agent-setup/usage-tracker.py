@@ -2,18 +2,24 @@
 Usage Tracker - Track tenant usage for billing
 """
 
-import sqlite3
+import os
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
 
 from tenant_manager import TenantManager
+from platform_db import get_platform_db
+from usage_buffer import UsageCounterBuffer, UsageKey
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Reads of database plus pending totals retried when a flush commits between them
+USAGE_READ_ATTEMPTS = 3
+USAGE_READ_WAIT_SECONDS = 1.0
+
 
 class UsageMetric(Enum):
     AGENTS = "agents"
@@ -38,41 +44,122 @@ class UsageRecord:
 class UsageTracker:
     """Tracks usage per tenant for billing"""
     
-    def __init__(self, tenant_manager: TenantManager, platform_db_path: str = "platform.db"):
+    def __init__(
+        self,
+        tenant_manager: TenantManager,
+        platform_db_path: str = "platform.db",
+        write_behind: bool = False,
+        flush_interval: Optional[float] = None
+    ):
         self.tenant_manager = tenant_manager
         self.platform_db_path = platform_db_path
+        self.db = get_platform_db(platform_db_path)
         self._init_usage_tables()
+        
+        # Write-behind mode buffers increments in memory and flushes them
+        # in batches, keeping database writes off the request path
+        self.buffer: Optional[UsageCounterBuffer] = None
+        if write_behind:
+            self.buffer = UsageCounterBuffer(
+                self._write_usage_batch,
+                flush_interval=flush_interval or float(os.getenv("USAGE_FLUSH_INTERVAL", "5")),
+                max_pending=int(os.getenv("USAGE_MAX_PENDING", "10000"))
+            )
+            self.buffer.start()
+        
+        # Set by QuotaEngine to answer quota checks from memory
+        self.quota_engine = None
     
     def _init_usage_tables(self):
         """Initialize usage tracking tables"""
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            # Usage records table (already in schema, but ensure it exists)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS usage_records (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tenant_id VARCHAR(50) NOT NULL,
+                    metric_name VARCHAR(100) NOT NULL,
+                    usage_count INTEGER NOT NULL DEFAULT 0,
+                    period_start TIMESTAMP NOT NULL,
+                    period_end TIMESTAMP NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_usage_tenant_period 
+                ON usage_records(tenant_id, period_start, period_end)
+            """)
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_usage_metric 
+                ON usage_records(metric_name, period_start)
+            """)
+            
+            cursor.execute("""
+                SELECT 1 FROM sqlite_master
+                WHERE type = 'index' AND name = 'idx_usage_period_key'
+            """)
+            if not cursor.fetchone():
+                self._migrate_usage_period_key(cursor)
+    
+    def _migrate_usage_period_key(self, cursor):
+        """Merge duplicate period rows and add the unique period key
         
-        # Usage records table (already in schema, but ensure it exists)
+        Older versions could insert several rows for one period under
+        concurrent writes. Counters are summed into the lowest id; storage
+        is a replaced value, so its largest reading is kept instead.
+        """
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS usage_records (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tenant_id VARCHAR(50) NOT NULL,
-                metric_name VARCHAR(100) NOT NULL,
-                usage_count INTEGER NOT NULL DEFAULT 0,
-                period_start TIMESTAMP NOT NULL,
-                period_end TIMESTAMP NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            UPDATE usage_records
+            SET usage_count = (
+                    SELECT CASE WHEN usage_records.metric_name = ?
+                                THEN MAX(d.usage_count) ELSE SUM(d.usage_count) END
+                    FROM usage_records d
+                    WHERE d.tenant_id = usage_records.tenant_id
+                    AND d.metric_name = usage_records.metric_name
+                    AND d.period_start = usage_records.period_start
+                ),
+                period_end = (
+                    SELECT MAX(d.period_end) FROM usage_records d
+                    WHERE d.tenant_id = usage_records.tenant_id
+                    AND d.metric_name = usage_records.metric_name
+                    AND d.period_start = usage_records.period_start
+                )
+            WHERE id IN (
+                SELECT MIN(id) FROM usage_records
+                GROUP BY tenant_id, metric_name, period_start
+                HAVING COUNT(*) > 1
             )
-        """)
+        """, (UsageMetric.STORAGE_GB.value,))
+        merged = cursor.rowcount
         
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_usage_tenant_period 
-            ON usage_records(tenant_id, period_start, period_end)
+            DELETE FROM usage_records
+            WHERE id NOT IN (
+                SELECT MIN(id) FROM usage_records
+                GROUP BY tenant_id, metric_name, period_start
+            )
         """)
+        removed = cursor.rowcount
         
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_usage_metric 
-            ON usage_records(metric_name, period_start)
+            CREATE UNIQUE INDEX idx_usage_period_key
+            ON usage_records(tenant_id, metric_name, period_start)
         """)
         
-        conn.commit()
-        conn.close()
+        if removed:
+            logger.info(f"Merged {removed} duplicate usage rows into {merged} period records")
+    
+    @staticmethod
+    def _current_period() -> Tuple[datetime, datetime]:
+        """Get the (start, end) of the current monthly billing period"""
+        now = datetime.now()
+        period_start = datetime(now.year, now.month, 1)
+        period_end = (period_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        return period_start, period_end
     
     def record_usage(
         self,
@@ -84,49 +171,67 @@ class UsageTracker:
     ):
         """Record usage for a tenant"""
         if period_start is None:
-            # Current month
-            now = datetime.now()
-            period_start = datetime(now.year, now.month, 1)
-            period_end = (period_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            period_start, period_end = self._current_period()
         
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
+        if self.buffer:
+            self.buffer.add(tenant_id, metric.value, count, period_start.isoformat(), period_end.isoformat())
+            return
         
-        # Check if record exists for this period
-        cursor.execute("""
-            SELECT id, usage_count FROM usage_records
-            WHERE tenant_id = ? AND metric_name = ? 
-            AND period_start = ? AND period_end = ?
-        """, (tenant_id, metric.value, period_start.isoformat(), period_end.isoformat()))
-        
-        existing = cursor.fetchone()
+        key = (tenant_id, metric.value, period_start.isoformat(), period_end.isoformat())
+        self._write_usage_batch([(key, count)])
         
-        if existing:
-            # Update existing record
-            new_count = existing[1] + count
-            cursor.execute("""
-                UPDATE usage_records 
-                SET usage_count = ?
-                WHERE id = ?
-            """, (new_count, existing[0]))
-        else:
-            # Create new record
-            cursor.execute("""
+        logger.debug(f"Recorded usage: {tenant_id} - {metric.value} = {count}")
+    
+    def _write_usage_batch(self, rows: List[Tuple[UsageKey, int]]):
+        """Atomically add a batch of increments to their period records"""
+        with self.db.connection() as conn:
+            conn.executemany("""
                 INSERT INTO usage_records 
                 (tenant_id, metric_name, usage_count, period_start, period_end)
                 VALUES (?, ?, ?, ?, ?)
-            """, (
-                tenant_id,
-                metric.value,
-                count,
-                period_start.isoformat(),
-                period_end.isoformat()
-            ))
+                ON CONFLICT(tenant_id, metric_name, period_start)
+                DO UPDATE SET usage_count = usage_count + excluded.usage_count
+            """, [
+                (tenant_id, metric_name, count, period_start, period_end)
+                for (tenant_id, metric_name, period_start, period_end), count in rows
+            ])
+    
+    def flush(self) -> int:
+        """Flush buffered usage to the database, returns rows written"""
+        if not self.buffer:
+            return 0
+        return self.buffer.flush()
+    
+    def close(self):
+        """Stop the write-behind buffer, flushing pending usage"""
+        if self.buffer:
+            self.buffer.stop()
+    
+    def _read_with_pending(
+        self,
+        read_rows: Callable[[], List[Any]],
+        tenant_id: str,
+        metric_name: Optional[str],
+        period_start: str,
+        period_end: str
+    ) -> Tuple[List[Any], Dict[str, int]]:
+        """Read database rows and unflushed totals as of one flush state
         
-        conn.commit()
-        conn.close()
+        A flush committing between the two reads would count its batch in
+        both or in neither, so the pair is retried until none did. Pending
+        totals are read first: if flushes keep racing, the last attempt can
+        count a batch twice but never miss one.
+        """
+        if not self.buffer:
+            return read_rows(), {}
         
-        logger.debug(f"Recorded usage: {tenant_id} - {metric.value} = {count}")
+        for _ in range(USAGE_READ_ATTEMPTS):
+            sequence = self.buffer.wait_committed(USAGE_READ_WAIT_SECONDS)
+            pending = self.buffer.pending_for(tenant_id, metric_name, period_start, period_end)
+            rows = read_rows()
+            if self.buffer.flush_sequence() == sequence:
+                break
+        return rows, pending
     
     def get_usage(
         self,
@@ -137,17 +242,12 @@ class UsageTracker:
     ) -> Dict[str, Any]:
         """Get usage for a tenant"""
         if period_start is None:
-            # Current month
-            now = datetime.now()
-            period_start = datetime(now.year, now.month, 1)
-            period_end = (period_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
-        conn = sqlite3.connect(self.platform_db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+            period_start, period_end = self._current_period()
         
+        # One row per (metric, period), so only ranges spanning several
+        # periods have more than one row per metric to add up
         query = """
-            SELECT metric_name, SUM(usage_count) as total_usage
+            SELECT metric_name, usage_count
             FROM usage_records
             WHERE tenant_id = ? 
             AND period_start >= ? AND period_end <= ?
@@ -158,15 +258,24 @@ class UsageTracker:
             query += " AND metric_name = ?"
             params.append(metric.value)
         
-        query += " GROUP BY metric_name"
+        def read_rows():
+            with self.db.connection() as conn:
+                return conn.execute(query, params).fetchall()
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        conn.close()
+        # Read through increments that haven't been flushed yet
+        rows, pending = self._read_with_pending(
+            read_rows,
+            tenant_id,
+            metric.value if metric else None,
+            period_start.isoformat(),
+            period_end.isoformat()
+        )
         
         usage = {}
         for row in rows:
-            usage[row["metric_name"]] = row["total_usage"]
+            usage[row["metric_name"]] = usage.get(row["metric_name"], 0) + row["usage_count"]
+        for metric_name, count in pending.items():
+            usage[metric_name] = usage.get(metric_name, 0) + count
         
         return {
             "tenant_id": tenant_id,
@@ -177,13 +286,45 @@ class UsageTracker:
     
     def get_current_month_usage(self, tenant_id: str) -> Dict[str, int]:
         """Get current month usage"""
-        now = datetime.now()
-        period_start = datetime(now.year, now.month, 1)
-        period_end = (period_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        period_start, period_end = self._current_period()
         
         result = self.get_usage(tenant_id, period_start=period_start, period_end=period_end)
         return result.get("usage", {})
     
+    def get_period_usage(
+        self,
+        tenant_id: str,
+        metrics: List[UsageMetric],
+        period_start: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """Get usage for specific metrics in one period via the unique period key"""
+        if period_start is None:
+            period_start, period_end = self._current_period()
+        else:
+            period_end = (period_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        
+        metric_names = [metric.value for metric in metrics]
+        placeholders = ", ".join("?" for _ in metric_names)
+        
+        def read_rows():
+            with self.db.connection() as conn:
+                return conn.execute(f"""
+                    SELECT metric_name, usage_count FROM usage_records
+                    WHERE tenant_id = ? AND metric_name IN ({placeholders})
+                    AND period_start = ?
+                """, [tenant_id, *metric_names, period_start.isoformat()]).fetchall()
+        
+        rows, pending = self._read_with_pending(
+            read_rows, tenant_id, None, period_start.isoformat(), period_end.isoformat()
+        )
+        
+        usage = {row["metric_name"]: row["usage_count"] for row in rows}
+        for metric_name in metric_names:
+            if metric_name in pending:
+                usage[metric_name] = usage.get(metric_name, 0) + pending[metric_name]
+        
+        return usage
+    
     def increment_agent_usage(self, tenant_id: str, count: int = 1):
         """Increment agent usage"""
         self.record_usage(tenant_id, UsageMetric.AGENTS, count)
@@ -202,43 +343,41 @@ class UsageTracker:
     
     def set_storage_usage(self, tenant_id: str, storage_gb: float):
         """Set storage usage (replaces, doesn't increment)"""
-        now = datetime.now()
-        period_start = datetime(now.year, now.month, 1)
-        period_end = (period_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
-        conn = sqlite3.connect(self.platform_db_path)
-        cursor = conn.cursor()
-        
-        # Delete existing record for this period
-        cursor.execute("""
-            DELETE FROM usage_records
-            WHERE tenant_id = ? AND metric_name = ?
-            AND period_start = ? AND period_end = ?
-        """, (tenant_id, UsageMetric.STORAGE_GB.value, period_start.isoformat(), period_end.isoformat()))
+        period_start, period_end = self._current_period()
         
-        # Insert new record
-        cursor.execute("""
-            INSERT INTO usage_records 
-            (tenant_id, metric_name, usage_count, period_start, period_end)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            tenant_id,
-            UsageMetric.STORAGE_GB.value,
-            int(storage_gb * 100) / 100,  # Round to 2 decimals
-            period_start.isoformat(),
-            period_end.isoformat()
-        ))
+        if self.buffer:
+            self.buffer.discard(tenant_id, UsageMetric.STORAGE_GB.value, period_start.isoformat(), period_end.isoformat())
         
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            conn.execute("""
+                INSERT INTO usage_records 
+                (tenant_id, metric_name, usage_count, period_start, period_end)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(tenant_id, metric_name, period_start)
+                DO UPDATE SET usage_count = excluded.usage_count
+            """, (
+                tenant_id,
+                UsageMetric.STORAGE_GB.value,
+                int(storage_gb * 100) / 100,  # Round to 2 decimals
+                period_start.isoformat(),
+                period_end.isoformat()
+            ))
     
     def check_quota_exceeded(self, tenant_id: str) -> Dict[str, Any]:
         """Check if tenant has exceeded any quotas"""
+        if self.quota_engine:
+            return self.quota_engine.check(tenant_id)
+        
         quota = self.tenant_manager.get_tenant_quota(tenant_id)
         if not quota:
             return {"exceeded": False, "violations": []}
         
-        current_usage = self.get_current_month_usage(tenant_id)
+        current_usage = self.get_period_usage(tenant_id, [
+            UsageMetric.AGENTS,
+            UsageMetric.WORKFLOWS,
+            UsageMetric.API_CALLS,
+            UsageMetric.STORAGE_GB
+        ])
         violations = []
         
         # Check each quota
@@ -0,0 +1 @@
+usage-buffer.py
\ No newline at end of file
@@ -0,0 +1 @@
+usage-tracker.py
\ No newline at end of file
@@ -1,5 +1,8 @@
 """
 Webhook Receiver - Receives ERPNext webhooks and routes to tenants
+Webhook events reach the API gateway's workflow engines through the Redis
+event bus; without REDIS_HOST they only invalidate this process's cache
+and trigger no workflows
 """
 
 from fastapi import FastAPI, Request, HTTPException, Header
@@ -13,6 +16,8 @@ import json
 from tenant_manager import TenantManager
 from tenant_isolation import TenantIsolation
 from autonomous_workflow import AutonomousWorkflowEngine, TriggerType
+from event_bus import EventBus
+from erpnext_cache import get_erpnext_cache, bind_erpnext_cache_to_event_bus
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -34,6 +39,18 @@ app.add_middleware(
 tenant_manager = TenantManager()
 tenant_isolation = TenantIsolation(tenant_manager)
 
+# Webhooks invalidate cached ERPNext reads; with Redis the invalidations
+# also reach the API gateway nodes
+erpnext_cache = get_erpnext_cache()
+event_bus = EventBus(
+    tenant_isolation,
+    redis_host=os.getenv("REDIS_HOST"),
+    redis_port=int(os.getenv("REDIS_PORT", "6379")),
+    redis_password=os.getenv("REDIS_PASSWORD")
+)
+if erpnext_cache and event_bus.redis_client:
+    bind_erpnext_cache_to_event_bus(erpnext_cache, event_bus)
+
 
 @app.post("/webhook/erpnext/{tenant_id}")
 async def receive_webhook(
@@ -67,9 +84,16 @@ async def receive_webhook(
         
         logger.info(f"Webhook received for tenant {tenant_id}: {event_type}")
         
-        # Trigger workflows that listen to this event
-        # This would integrate with workflow engine
-        # workflow_engine.trigger_workflows_by_event(tenant_id, event_type, event_data)
+        # Drop cached reads of the changed doctype (all doctypes if not given)
+        if erpnext_cache:
+            erpnext_cache.invalidate(tenant_id, event_data.get("doctype") or data.get("doctype"))
+        
+        # Trigger workflows that listen to this event; one API gateway node
+        # takes it off the Redis work stream and starts the tenant's workflows
+        if event_bus.redis_client:
+            event_bus.publish_event(tenant_id, event_type, "erpnext", event_data)
+        else:
+            logger.warning(f"No Redis event bus, {event_type} for tenant {tenant_id} triggers no workflows")
         
         return {
             "success": True,
@@ -0,0 +1,190 @@
+"""
+Workflow Admission - Concurrency limits and latency histograms for workflow executions
+Each workflow and each tenant's engine admits a bounded number of
+executions at a time; triggers beyond that wait in a bounded FIFO queue
+and are rejected once it is full
+"""
+
+import bisect
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimit:
+    """Counting semaphore with a bounded wait queue
+
+    Admitting and releasing are O(1). Unlike asyncio.Semaphore it isn't
+    bound to one event loop: each waiter's future belongs to the loop that
+    awaits it and is woken through that loop, so a limit can be shared by
+    executions on the workflow runtime and on other loops.
+    """
+
+    def __init__(self, limit: int, max_queued: Optional[int] = None):
+        self.limit = max(1, limit)
+        self.max_queued = max_queued  # None means unbounded
+        self.running = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, queue: bool = True, force: bool = False) -> bool:
+        """Take a slot, waiting for one if queue is set; False if rejected
+
+        force waits even when the queue is full (for executions already
+        admitted once, e.g. resumed ones).
+        """
+        with self._lock:
+            if self.running < self.limit and not self._waiters:
+                self.running += 1
+                self.admitted += 1
+                return True
+            if not force and (not queue or (self.max_queued is not None and len(self._waiters) >= self.max_queued)):
+                self.rejected += 1
+                return False
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self.queued += 1
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # Cancelled after being handed the slot; pass it on (_wake does
+            # if it hadn't run yet, since it finds the waiter cancelled)
+            if not waiter.cancelled():
+                self.release()
+            raise
+        return True
+
+    def release(self):
+        """Free a slot, handing it straight to the longest waiter if any"""
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if waiter.done():
+                    continue
+                # The slot stays taken on the waiter's behalf
+                self.admitted += 1
+                waiter.get_loop().call_soon_threadsafe(self._wake, waiter)
+                return
+            self.running = max(0, self.running - 1)
+
+    def _wake(self, waiter: asyncio.Future):
+        """Resolve a waiter on its own loop, passing the slot on if it was cancelled"""
+        if waiter.done():
+            self.release()
+        else:
+            waiter.set_result(True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limit statistics"""
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "running": self.running,
+                "waiting": len(self._waiters),
+                "max_queued": self.max_queued,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": self.rejected
+            }
+
+
+# Bucket upper bounds in seconds, roughly x2.5 apart, from 10ms to 6h
+LATENCY_BUCKETS = [
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 60, 150, 300, 600, 1800, 3600, 10800, 21600
+]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; recording is O(log buckets)
+
+    Percentiles are the upper bound of the bucket they fall in, so they
+    overstate by at most one bucket width.
+    """
+
+    def __init__(self, buckets: Optional[List[float]] = None):
+        self.buckets = buckets or LATENCY_BUCKETS
+        self.counts = [0] * (len(self.buckets) + 1)  # Last one is overflow
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """Add one observation"""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given fraction of observations"""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = fraction * self.count
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank and count:
+                    return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get count, mean, max and p50/p95/p99"""
+        with self._lock:
+            count, total, maximum = self.count, self.total, self.max
+        return {
+            "count": count,
+            "mean": round(total / count, 3) if count else None,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": round(maximum, 3) if count else None
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    limit = ConcurrencyLimit(2, max_queued=3)
+    waits = LatencyHistogram()
+
+    async def execution(i: int):
+        queued_at = time.monotonic()
+        if not await limit.acquire():
+            print(f"Execution {i} rejected")
+            return
+        waits.record(time.monotonic() - queued_at)
+        try:
+            await asyncio.sleep(0.1)
+        finally:
+            limit.release()
+
+    async def main():
+        await asyncio.gather(*(execution(i) for i in range(8)))
+
+    asyncio.run(main())
+    print(f"Limit: {limit.get_stats()}")
+    print(f"Queue wait: {waits.get_stats()}")
@@ -0,0 +1,256 @@
+"""
+Workflow Checkpoints - Write-behind checkpoints of workflow executions
+Each execution's latest state (context, step states, retry counters) is
+kept in memory and written to workflow_executions in periodic batches, so
+executions cut off by a crash can be resumed on startup; ERPNext writes
+are recorded under idempotency keys so resumed steps don't repeat them
+"""
+
+import json
+import time
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from platform_db import get_platform_db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Execution statuses after which the execution is never resumed
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class WorkflowCheckpointStore:
+    """Batched execution checkpoints plus an idempotency journal
+
+    save() only replaces the execution's pending checkpoint in memory; a
+    flush thread writes all pending checkpoints in one transaction every
+    flush_interval seconds. A hard crash loses at most that window, whose
+    steps then run again on recovery. Rows use the workflow_executions
+    layout PersistenceLayer reads (state JSON in result), so they also
+    serve as execution history.
+
+    recover() claims executions still "running" in the database, i.e. cut
+    off by the previous process, and "recovering" ones, claimed by a
+    process that died before the resumed execution's next checkpoint was
+    written; it assumes one engine per database.
+    """
+
+    def __init__(self, db_path: str = "workflows.db", tenant_id: str = "default", flush_interval: float = 0.5):
+        self.db = get_platform_db(db_path)
+        self.tenant_id = tenant_id
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, Tuple[str, str, Dict[str, Any]]] = {}  # execution_id -> (workflow_id, status, state)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.running = False
+
+        # Statistics
+        self.saves = 0
+        self.flush_count = 0
+        self.flushed_rows = 0
+        self.failed_flushes = 0
+        self.recovered = 0
+        self.replayed_effects = 0
+
+        self._init_tables()
+
+    def _init_tables(self):
+        """Create the execution and idempotency tables"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            # Same layout as tenant provisioning creates
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS workflow_executions (
+                    execution_id VARCHAR(50) PRIMARY KEY,
+                    tenant_id VARCHAR(50) NOT NULL,
+                    workflow_id VARCHAR(50) NOT NULL,
+                    status VARCHAR(20),
+                    started_at TIMESTAMP,
+                    completed_at TIMESTAMP,
+                    result TEXT, -- JSON as text
+                    error TEXT
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_executions_status ON workflow_executions(status)")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS workflow_step_effects (
+                    idempotency_key VARCHAR(255) PRIMARY KEY,
+                    execution_id VARCHAR(100) NOT NULL,
+                    result TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_step_effects_execution ON workflow_step_effects(execution_id)")
+
+    def save(self, execution_id: str, workflow_id: str, status: str, state: Dict[str, Any]):
+        """Replace an execution's pending checkpoint (written by the next flush)
+
+        state is serialized at flush time, so pass copies of anything the
+        execution keeps mutating.
+        """
+        with self._lock:
+            self._pending[execution_id] = (workflow_id, status, state)
+            self.saves += 1
+        if status != "running" and not self.running:
+            self.flush()  # No flush thread; don't leave the final state behind
+
+    def flush(self) -> int:
+        """Write every pending checkpoint in one transaction, returns rows written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            rows = []
+            finished = []
+            for execution_id, (workflow_id, status, state) in batch.items():
+                completed_at = datetime.now().isoformat() if status in TERMINAL_STATUSES else None
+                rows.append((
+                    execution_id, self.tenant_id, workflow_id, status,
+                    state.get("started_at"), completed_at,
+                    json.dumps(state, default=str), state.get("error")
+                ))
+                if completed_at:
+                    finished.append((execution_id,))
+
+            try:
+                with self.db.connection() as conn:
+                    conn.executemany("""
+                        INSERT OR REPLACE INTO workflow_executions
+                        (execution_id, tenant_id, workflow_id, status, started_at, completed_at, result, error)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """, rows)
+                    # Finished executions are never replayed, so their journal can go
+                    conn.executemany("DELETE FROM workflow_step_effects WHERE execution_id = ?", finished)
+            except Exception as e:
+                # Keep the batch unless a newer checkpoint replaced it meanwhile
+                with self._lock:
+                    for execution_id, checkpoint in batch.items():
+                        self._pending.setdefault(execution_id, checkpoint)
+                self.failed_flushes += 1
+                logger.error(f"Checkpoint flush failed, {len(rows)} kept for retry: {str(e)}")
+                return 0
+
+            self.flush_count += 1
+            self.flushed_rows += len(rows)
+            return len(rows)
+
+    def recover(self) -> List[Dict[str, Any]]:
+        """Claim executions left running (or left claimed) by a previous process"""
+        claimed = []
+        with self.db.connection() as conn:
+            rows = conn.execute("""
+                SELECT execution_id, workflow_id, status, result FROM workflow_executions
+                WHERE status IN ('running', 'recovering') AND tenant_id = ?
+            """, (self.tenant_id,)).fetchall()
+
+            for row in rows:
+                updated = conn.execute("""
+                    UPDATE workflow_executions SET status = 'recovering'
+                    WHERE execution_id = ? AND status = ?
+                """, (row["execution_id"], row["status"])).rowcount
+                if not updated:
+                    continue
+                try:
+                    state = json.loads(row["result"]) if row["result"] else {}
+                except ValueError:
+                    logger.error(f"Unreadable checkpoint for execution {row['execution_id']}")
+                    continue
+                claimed.append({"execution_id": row["execution_id"], "workflow_id": row["workflow_id"], "state": state})
+
+        self.recovered += len(claimed)
+        return claimed
+
+    def get_effect(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        """Get the recorded result of a write already made under this key"""
+        with self.db.connection() as conn:
+            row = conn.execute(
+                "SELECT result FROM workflow_step_effects WHERE idempotency_key = ?", (idempotency_key,)
+            ).fetchone()
+        if row is None:
+            return None
+        self.replayed_effects += 1
+        return json.loads(row["result"])
+
+    def record_effect(self, idempotency_key: str, execution_id: str, result: Dict[str, Any]):
+        """Record a completed write (synchronously, unlike checkpoints)"""
+        with self.db.connection() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO workflow_step_effects (idempotency_key, execution_id, result)
+                VALUES (?, ?, ?)
+            """, (idempotency_key, execution_id, json.dumps(result, default=str)))
+
+    def start(self):
+        """Start the background flush thread"""
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._flush_loop, name="workflow-checkpoints", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _flush_loop(self):
+        """Flush every flush_interval seconds"""
+        while self.running:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error in checkpoint flush loop: {str(e)}")
+
+    def stop(self):
+        """Stop the flush thread and write what is pending"""
+        self.running = False
+        self._wakeup.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._thread = None
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get checkpoint statistics"""
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "saves": self.saves,
+            "flushes": self.flush_count,
+            "flushed_rows": self.flushed_rows,
+            "saves_per_write": round(self.saves / self.flushed_rows, 2) if self.flushed_rows else 0.0,
+            "failed_flushes": self.failed_flushes,
+            "recovered": self.recovered,
+            "replayed_effects": self.replayed_effects
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    store = WorkflowCheckpointStore(os.path.join(tempfile.mkdtemp(), "tenant.db"), flush_interval=0.2)
+    store.start()
+    for step in range(20):
+        store.save("invoice_1", "invoice_reminders", "running", {
+            "started_at": datetime.now().isoformat(),
+            "context": {"step": step},
+            "checkpoint": {"states": {}, "routed": []}
+        })
+    store.record_effect("invoice_1:send_reminder", "invoice_1", {"success": True})
+    time.sleep(0.5)
+    print(f"Stats: {store.get_stats()}")
+
+    # A new process finds the execution still running and resumes it
+    for execution in WorkflowCheckpointStore(store.db.db_path).recover():
+        print(f"Recovering {execution['execution_id']} at {execution['state']['context']}")
+    print(f"Already sent: {store.get_effect('invoice_1:send_reminder')}")
+    store.stop()
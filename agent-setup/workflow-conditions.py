@@ -0,0 +1,390 @@
+"""
+Workflow Conditions - Compiled condition trees for workflow steps and record filters
+Conditions are compiled once into closures instead of being interpreted on
+every evaluation; over a list of ERPNext records they evaluate column by
+column with NumPy when it is installed
+"""
+
+import logging
+import operator as op
+from itertools import repeat
+from typing import Any, Callable, Dict, List
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+from workflow_templates import MISSING, compile_path, lookup
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Lists shorter than this are filtered row by row; NumPy's setup costs more
+BATCH_MIN_RECORDS = 500
+
+# Membership in up to this many values is batch-evaluated as chained ==
+BATCH_MAX_IN_VALUES = 8
+
+NUMERIC_TYPES = {int, float, bool, type(None)}
+COMPARISONS = {"==": op.eq, "!=": op.ne, ">": op.gt, ">=": op.ge, "<": op.lt, "<=": op.le}
+ORDERINGS = (">", ">=", "<", "<=")
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float))
+
+
+def _is_scalar(value: Any) -> bool:
+    return value is None or isinstance(value, (str, int, float))
+
+
+def _test(operator: str, value: Any) -> Callable[[Any], bool]:
+    """Predicate of a field value for one operator (False on incomparable types)"""
+    if operator in ("==", "!="):
+        compare = COMPARISONS[operator]
+        return lambda field_value: compare(field_value, value)
+
+    if operator in ORDERINGS:
+        compare = COMPARISONS[operator]
+
+        def ordered(field_value):
+            try:
+                return field_value is not None and compare(field_value, value)
+            except TypeError:
+                return False
+        return ordered
+
+    if operator in ("in", "not_in"):
+        try:
+            values = frozenset(value)
+        except TypeError:
+            values = list(value)
+        negate = operator == "not_in"
+
+        def member(field_value):
+            try:
+                return (field_value in values) != negate
+            except TypeError:
+                return negate
+        return member
+
+    if operator == "contains":
+        def contains(field_value):
+            try:
+                return field_value is not None and value in field_value
+            except TypeError:
+                return False
+        return contains
+
+    if operator == "exists":
+        return lambda field_value: field_value is not None
+
+    raise ValueError(f"Unknown condition operator: {operator}")
+
+
+class _Columns:
+    """Field columns of a record list, extracted once per field"""
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        self.records = records
+        self.size = len(records)
+        self._raw: Dict[str, List[Any]] = {}
+        self._objects: Dict[str, Any] = {}
+        self._numeric: Dict[str, Any] = {}
+
+    def raw(self, field: str, candidates) -> List[Any]:
+        """Field values as a list (None where absent)"""
+        column = self._raw.get(field)
+        if column is None:
+            if len(candidates) == 1:
+                column = list(map(dict.get, self.records, repeat(field)))
+            else:
+                column = [None if value is MISSING else value for value in (lookup(record, candidates) for record in self.records)]
+            self._raw[field] = column
+        return column
+
+    def objects(self, field: str, candidates) -> Any:
+        """Field values as a NumPy object array, which compares in C with Python semantics"""
+        column = self._objects.get(field)
+        if column is None:
+            # fromiter keeps list values as elements where np.array would nest them
+            column = np.fromiter(self.raw(field, candidates), dtype=object, count=self.size)
+            self._objects[field] = column
+        return column
+
+    def numeric(self, field: str, candidates) -> Any:
+        """Field values as floats, NaN for anything not a number (which compares False)"""
+        column = self._numeric.get(field)
+        if column is None:
+            raw = self.raw(field, candidates)
+            if set(map(type, raw)) <= NUMERIC_TYPES:
+                column = np.array(raw, dtype=float)  # None becomes NaN
+            else:
+                column = np.fromiter(
+                    (value if isinstance(value, (int, float)) else np.nan for value in raw),
+                    dtype=float, count=self.size
+                )
+            self._numeric[field] = column
+        return column
+
+    def subset(self, rows) -> "_Columns":
+        """Columns of the records at the given indices, reusing what was extracted"""
+        indices = rows.tolist()
+        columns = _Columns([self.records[i] for i in indices])
+        columns._raw = {field: [column[i] for i in indices] for field, column in self._raw.items()}
+        columns._objects = {field: column[rows] for field, column in self._objects.items()}
+        columns._numeric = {field: column[rows] for field, column in self._numeric.items()}
+        return columns
+
+
+class Condition:
+    """A compiled condition tree
+
+    Trees are leaves {"field": "a.b", "operator": ">", "value": 10} and
+    groups {"all": [...]}, {"any": [...]}, {"not": {...}}; keys of one dict
+    are ANDed and a dict with none of them is always true. field is a key
+    or a dotted path, as in templates; absent fields are None. Operators
+    are ==, !=, >, >=, <, <=, in, not_in, contains and exists; comparing
+    incompatible types (None > 5) is false rather than an error.
+
+    condition(context) evaluates one context or record; filter(records)
+    and mask(records) evaluate a list of records at once.
+    """
+
+    __slots__ = ("source", "fields", "evaluate", "_batch")
+
+    def __init__(self, source: Any, fields: List[str], evaluate: Callable[[Dict], bool], batch: Callable):
+        self.source = source
+        self.fields = fields
+        self.evaluate = evaluate
+        self._batch = batch
+
+    def __call__(self, context: Dict[str, Any]) -> bool:
+        return self.evaluate(context)
+
+    def mask(self, records: List[Dict[str, Any]]) -> List[bool]:
+        """Whether each record matches"""
+        if NUMPY_AVAILABLE and len(records) >= BATCH_MIN_RECORDS:
+            return self._batch(_Columns(records)).tolist()
+        return [self.evaluate(record) for record in records]
+
+    def filter(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """The records that match, in order"""
+        if NUMPY_AVAILABLE and len(records) >= BATCH_MIN_RECORDS:
+            matches = np.flatnonzero(self._batch(_Columns(records)))
+            return [records[i] for i in matches.tolist()]
+        return [record for record in records if self.evaluate(record)]
+
+
+def _compile_leaf(node: Dict[str, Any]) -> Condition:
+    """Compile {"field", "operator", "value"}"""
+    field = node["field"]
+    operator = node.get("operator", "==")
+    value = node.get("value")
+    test = _test(operator, value)
+    candidates = compile_path(field)
+
+    if len(candidates) == 1:
+        # The common operators get their own closure, saving a call per record
+        if operator == "==":
+            def evaluate(context):
+                return context.get(field) == value
+        elif operator == "!=":
+            def evaluate(context):
+                return context.get(field) != value
+        elif operator == "exists":
+            def evaluate(context):
+                return context.get(field) is not None
+        else:
+            def evaluate(context):
+                return test(context.get(field))
+    else:
+        def evaluate(context):
+            field_value = lookup(context, candidates)
+            return test(None if field_value is MISSING else field_value)
+
+    def by_row(columns):
+        return np.fromiter(map(test, columns.raw(field, candidates)), dtype=bool, count=columns.size)
+
+    def batch(columns):
+        if operator in ORDERINGS and _is_number(value):
+            return COMPARISONS[operator](columns.numeric(field, candidates), value)
+        if operator in ("==", "!=") and _is_scalar(value):
+            return COMPARISONS[operator](columns.objects(field, candidates), value)
+        if operator in ("in", "not_in") and isinstance(value, (list, tuple)) and (
+            len(value) <= BATCH_MAX_IN_VALUES and all(map(_is_scalar, value))
+        ):
+            objects = columns.objects(field, candidates)
+            mask = np.zeros(columns.size, dtype=bool)
+            for member in value:
+                mask |= objects == member
+            return ~mask if operator == "not_in" else mask
+        if operator == "exists":
+            return columns.objects(field, candidates) != None  # noqa: E711 (elementwise)
+        if operator in ORDERINGS and isinstance(value, str):
+            try:
+                # Strings (e.g. ISO dates); a None or number in the column raises
+                return COMPARISONS[operator](columns.objects(field, candidates), value).astype(bool)
+            except TypeError:
+                pass
+        return by_row(columns)
+
+    return Condition(node, [field], evaluate, batch)
+
+
+def _mask(condition: Condition, columns: _Columns) -> Any:
+    """Batch-evaluate a condition, row by row if there are too few records to pay off"""
+    if columns.size >= BATCH_MIN_RECORDS:
+        return condition._batch(columns)
+    return np.fromiter(map(condition.evaluate, columns.records), dtype=bool, count=columns.size)
+
+
+def _compile_group(kind: str, children: List[Condition]) -> Condition:
+    """Combine compiled children with all/any
+
+    Like the row evaluator short-circuits, the batch one evaluates each
+    child only on the rows the children before it left undecided.
+    """
+    evaluators = [child.evaluate for child in children]
+    fields = list(dict.fromkeys(field for child in children for field in child.fields))
+    decided = kind == "any"  # The value that decides a row
+
+    if kind == "all":
+        def evaluate(context):
+            for evaluate in evaluators:
+                if not evaluate(context):
+                    return False
+            return True
+    else:
+        def evaluate(context):
+            for evaluate in evaluators:
+                if evaluate(context):
+                    return True
+            return False
+
+    def batch(columns):
+        mask = np.full(columns.size, decided)
+        rows = np.arange(columns.size)
+        subset = columns
+        for child in children:
+            child_mask = _mask(child, subset)
+            mask[rows[child_mask == decided]] = decided
+            undecided = np.flatnonzero(child_mask != decided)
+            if not len(undecided):
+                return mask
+            if len(undecided) < len(rows):
+                rows = rows[undecided]
+                subset = subset.subset(undecided)
+        mask[rows] = not decided
+        return mask
+
+    return Condition(None, fields, evaluate, batch)
+
+
+def compile_condition(node: Any) -> Condition:
+    """Compile a condition tree (ValueError if it is malformed)"""
+    if not isinstance(node, dict):
+        raise ValueError(f"Condition must be a dict, got {type(node).__name__}")
+
+    parts = []
+    for kind in ("all", "any"):
+        if kind in node:
+            parts.append(_compile_group(kind, [compile_condition(child) for child in node[kind]]))
+    if "not" in node:
+        inner = compile_condition(node["not"])
+        parts.append(Condition(
+            None, inner.fields,
+            lambda context: not inner.evaluate(context),
+            lambda columns: ~inner._batch(columns)
+        ))
+    if "field" in node:
+        parts.append(_compile_leaf(node))
+
+    if not parts:
+        compiled = Condition(None, [], lambda context: True, lambda columns: np.ones(columns.size, dtype=bool))
+    else:
+        compiled = parts[0] if len(parts) == 1 else _compile_group("all", parts)
+    compiled.source = node
+    return compiled
+
+
+class ConditionCache:
+    """Compiled conditions of registered workflows
+
+    prepare() compiles a condition tree at registration; compile() finds
+    it again by identity. Trees that weren't prepared (e.g. rendered from
+    a template per execution) are compiled on each call, without being
+    cached.
+    """
+
+    def __init__(self):
+        self._conditions: Dict[int, Condition] = {}
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+    def prepare(self, node: Any) -> Condition:
+        """Compile a condition tree and cache it"""
+        compiled = compile_condition(node)
+        self._conditions[id(node)] = compiled
+        return compiled
+
+    def forget(self, node: Any):
+        """Drop a prepared condition tree"""
+        self._conditions.pop(id(node), None)
+
+    def compile(self, node: Any) -> Condition:
+        """Get the compiled form of a condition tree"""
+        compiled = self._conditions.get(id(node))
+        if compiled is not None and compiled.source is node:
+            self.hits += 1
+            return compiled
+        self.misses += 1
+        return compile_condition(node)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            "conditions": len(self._conditions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "numpy": NUMPY_AVAILABLE
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    import random
+
+    overdue_over_10k = compile_condition({
+        "all": [
+            {"field": "status", "value": "Overdue"},
+            {"field": "outstanding_amount", "operator": ">", "value": 10000},
+            {"any": [
+                {"field": "currency", "value": "SAR"},
+                {"field": "customer_group", "operator": "in", "value": ["Government", "Enterprise"]}
+            ]}
+        ]
+    })
+
+    rng = random.Random(7)
+    invoices = [
+        {
+            "name": f"ACC-SINV-{i:05d}",
+            "status": rng.choice(["Paid", "Unpaid", "Overdue"]),
+            "outstanding_amount": rng.choice([0, 500, 12000, 48000, None]),
+            "currency": rng.choice(["SAR", "USD"]),
+            "customer_group": rng.choice(["Retail", "Government", "Enterprise"])
+        }
+        for i in range(10000)
+    ]
+
+    matches = overdue_over_10k.filter(invoices)
+    assert matches == [invoice for invoice in invoices if overdue_over_10k(invoice)]
+    print(f"{len(matches)} of {len(invoices)} invoices are overdue over 10,000 (numpy: {NUMPY_AVAILABLE})")
+    print(f"Fields: {overdue_over_10k.fields}")
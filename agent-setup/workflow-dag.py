@@ -0,0 +1,319 @@
+"""
+Workflow DAG - Dependency graph scheduling of workflow steps
+A workflow's steps are indexed once into a graph of depends_on and
+on_success / on_failure edges; each execution then starts a step as soon
+as its inputs are done, running independent steps concurrently
+"""
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class StepState(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+    SUSPENDED = "suspended"
+
+
+@dataclass
+class DAGResult:
+    """Outcome of one execution of a workflow DAG"""
+    states: Dict[str, StepState]
+    results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    failed_step: Optional[str] = None  # First failure no on_failure step handled
+    routed: Set[str] = field(default_factory=set)
+
+    @property
+    def success(self) -> bool:
+        return self.failed_step is None
+
+    @property
+    def suspended(self) -> bool:
+        """Whether the execution stopped at suspended steps and can be resumed"""
+        return self.success and StepState.SUSPENDED in self.states.values()
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """JSON-serializable state to resume the execution from"""
+        return {
+            "states": {step_id: state.value for step_id, state in self.states.items()},
+            "routed": sorted(self.routed)
+        }
+
+    def steps_in(self, state: StepState) -> List[str]:
+        """Step IDs that ended in a state"""
+        return [step_id for step_id, step_state in self.states.items() if step_state == state]
+
+
+def _as_list(value: Any) -> List[str]:
+    """Normalize a step reference (None, one ID or a list of IDs) to a list"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+
+class WorkflowDAG:
+    """Indexed dependency graph of a workflow's steps
+
+    A step runs once every step in its depends_on has succeeded. Steps
+    named in another step's on_success / on_failure (or a decision's
+    on_true / on_false) are branches: they run only when routed to, and
+    then still wait for their own depends_on. Every other step without
+    depends_on is a root and starts the workflow. A step runs at most once
+    per execution; steps behind a failed or skipped dependency are skipped.
+    """
+
+    def __init__(self, steps: List[Any]):
+        self.steps: Dict[str, Any] = {}
+        for step in steps:
+            if step.step_id in self.steps:
+                raise ValueError(f"Duplicate step ID: {step.step_id}")
+            self.steps[step.step_id] = step
+
+        self.dependencies: Dict[str, List[str]] = {}
+        self.dependents: Dict[str, List[str]] = {step_id: [] for step_id in self.steps}
+        self.branches: Set[str] = set()
+        for step_id, step in self.steps.items():
+            dependencies = list(dict.fromkeys(step.depends_on or []))
+            self._check_known(step_id, dependencies)
+            self.dependencies[step_id] = dependencies
+            for dependency in dependencies:
+                self.dependents[dependency].append(step_id)
+
+            targets = self.routes(step)
+            self._check_known(step_id, targets)
+            self.branches.update(targets)
+
+        self.roots = [
+            step_id for step_id in self.steps
+            if not self.dependencies[step_id] and step_id not in self.branches
+        ]
+        self.order = self._topological_order()
+
+    @staticmethod
+    def routes(step: Any) -> List[str]:
+        """Every step a step can route to"""
+        targets = _as_list(step.on_success) + _as_list(step.on_failure)
+        if step.action_type == "decision":
+            config = step.action_config or {}
+            targets += _as_list(config.get("on_true")) + _as_list(config.get("on_false"))
+        return targets
+
+    def _check_known(self, step_id: str, references: List[str]):
+        """Raise ValueError for references to steps that don't exist"""
+        unknown = [reference for reference in references if reference not in self.steps]
+        if unknown:
+            raise ValueError(f"Step {step_id} references unknown steps: {', '.join(unknown)}")
+
+    def _topological_order(self) -> List[str]:
+        """Order steps so each comes after its dependencies and routers (Kahn's algorithm)"""
+        successors: Dict[str, Set[str]] = {step_id: set(self.dependents[step_id]) for step_id in self.steps}
+        for step_id, step in self.steps.items():
+            successors[step_id].update(self.routes(step))
+
+        in_degree = {step_id: 0 for step_id in self.steps}
+        for targets in successors.values():
+            for target in targets:
+                in_degree[target] += 1
+
+        queue = deque(step_id for step_id, degree in in_degree.items() if degree == 0)
+        order = []
+        while queue:
+            step_id = queue.popleft()
+            order.append(step_id)
+            for target in successors[step_id]:
+                in_degree[target] -= 1
+                if in_degree[target] == 0:
+                    queue.append(target)
+
+        if len(order) < len(self.steps):
+            cyclic = [step_id for step_id, degree in in_degree.items() if degree > 0]
+            raise ValueError(f"Workflow steps form a cycle: {', '.join(cyclic)}")
+        return order
+
+    async def run(
+        self,
+        run_step: Callable[[Any], Awaitable[Dict[str, Any]]],
+        max_parallel: int = 10,
+        checkpoint: Optional[Dict[str, Any]] = None,
+        wake: Optional[List[str]] = None,
+        on_step: Optional[Callable[[str, DAGResult], None]] = None
+    ) -> DAGResult:
+        """Execute the workflow, at most max_parallel steps at a time
+
+        run_step(step) returns the step's result: {"success": True, ...},
+        {"skipped": True, ...} when its conditions aren't met,
+        {"suspended": True, ...} when it should run again later, or a
+        failure. A failure routes to the step's on_failure; without one, no
+        further steps start and the result names the failed step.
+
+        A suspended step holds back its dependents while the rest of the
+        workflow carries on. To resume, pass the result's checkpoint() and
+        the suspended steps to run again as wake; steps that were running
+        when the checkpoint was taken run again. on_step(step_id, result)
+        is called after each step finishes, e.g. to checkpoint.
+        """
+        states = {step_id: StepState.PENDING for step_id in self.steps}
+        waiting_on = {step_id: len(dependencies) for step_id, dependencies in self.dependencies.items()}
+        routed: Set[str] = set()
+        outcome = DAGResult(states=states, routed=routed)
+        ready: Deque[str] = deque()
+        running: Dict[asyncio.Task, str] = {}
+
+        if checkpoint:
+            for step_id, value in checkpoint.get("states", {}).items():
+                if step_id in states and value != StepState.RUNNING.value:
+                    states[step_id] = StepState(value)
+            routed.update(step_id for step_id in checkpoint.get("routed", []) if step_id in self.steps)
+            for step_id, state in states.items():
+                if state == StepState.SUCCEEDED:
+                    for dependent in self.dependents[step_id]:
+                        waiting_on[dependent] -= 1
+            for step_id in wake or []:
+                if states.get(step_id) == StepState.SUSPENDED:
+                    states[step_id] = StepState.PENDING
+            ready.extend(
+                step_id for step_id in self.order
+                if states[step_id] == StepState.PENDING
+                and waiting_on[step_id] == 0
+                and (step_id not in self.branches or step_id in routed)
+            )
+        else:
+            ready.extend(self.roots)
+
+        def route(targets: List[str]):
+            for target in targets:
+                if target in routed:
+                    continue
+                routed.add(target)
+                if states[target] == StepState.PENDING and waiting_on[target] == 0:
+                    ready.append(target)
+
+        def skip_dependents(step_id: str):
+            stack = list(self.dependents[step_id])
+            while stack:
+                dependent = stack.pop()
+                if states[dependent] == StepState.PENDING:
+                    states[dependent] = StepState.SKIPPED
+                    stack.extend(self.dependents[dependent])
+
+        def finish(step_id: str, result: Dict[str, Any]):
+            step = self.steps[step_id]
+            outcome.results[step_id] = result
+            if result.get("suspended"):
+                states[step_id] = StepState.SUSPENDED
+            elif result.get("success"):
+                states[step_id] = StepState.SUCCEEDED
+                for dependent in self.dependents[step_id]:
+                    waiting_on[dependent] -= 1
+                    if (
+                        waiting_on[dependent] == 0
+                        and states[dependent] == StepState.PENDING
+                        and (dependent not in self.branches or dependent in routed)
+                    ):
+                        ready.append(dependent)
+                next_steps = _as_list(step.on_success)
+                if step.action_type == "decision":
+                    next_steps += [target for target in _as_list(result.get("next_step")) if target in self.steps]
+                route(next_steps)
+            elif result.get("skipped"):
+                states[step_id] = StepState.SKIPPED
+                skip_dependents(step_id)
+            else:
+                states[step_id] = StepState.FAILED
+                skip_dependents(step_id)
+                if step.on_failure:
+                    route(_as_list(step.on_failure))
+                elif outcome.failed_step is None:
+                    outcome.failed_step = step_id
+                    ready.clear()
+
+        async def guarded(step: Any) -> Dict[str, Any]:
+            try:
+                return await run_step(step)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                return {"success": False, "error": str(e)}
+
+        loop = asyncio.get_running_loop()
+        drained = loop.create_future()
+
+        def launch():
+            while ready and len(running) < max(1, max_parallel) and outcome.failed_step is None:
+                step_id = ready.popleft()
+                if states[step_id] != StepState.PENDING:
+                    continue
+                states[step_id] = StepState.RUNNING
+                task = loop.create_task(guarded(self.steps[step_id]))
+                running[task] = step_id
+                task.add_done_callback(on_done)
+            if not running and not drained.done():
+                drained.set_result(None)
+
+        def on_done(task: asyncio.Task):
+            step_id = running.pop(task)
+            if task.cancelled():
+                return
+            finish(step_id, task.result())
+            if on_step:
+                try:
+                    on_step(step_id, outcome)
+                except Exception as e:
+                    logger.error(f"Error in step callback for {step_id}: {str(e)}")
+            launch()
+
+        try:
+            launch()
+            await drained
+        finally:
+            for task in list(running):
+                task.cancel()
+
+        if not outcome.suspended:
+            for step_id, state in states.items():
+                if state == StepState.PENDING:
+                    states[step_id] = StepState.SKIPPED  # Never routed to, or behind the failure
+        return outcome
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+    from types import SimpleNamespace
+
+    def make_step(step_id, depends_on=None, on_failure=None):
+        return SimpleNamespace(
+            step_id=step_id, action_type="wait", action_config={},
+            depends_on=depends_on, on_success=None, on_failure=on_failure
+        )
+
+    dag = WorkflowDAG([
+        make_step("fetch_leads"),
+        make_step("fetch_quotations"),
+        make_step("score_leads", depends_on=["fetch_leads"], on_failure=["alert"]),
+        make_step("follow_up", depends_on=["score_leads", "fetch_quotations"]),
+        make_step("alert")
+    ])
+    print(f"Roots: {dag.roots}, order: {dag.order}")
+
+    async def run_step(step):
+        await asyncio.sleep(0.1)
+        return {"success": step.step_id != "score_leads"}
+
+    start = time.monotonic()
+    result = asyncio.run(dag.run(run_step, max_parallel=4))
+    print(f"Finished in {time.monotonic() - start:.2f}s, success: {result.success}")
+    for state in StepState:
+        print(f"  {state.value}: {result.steps_in(state)}")
@@ -0,0 +1,171 @@
+"""
+Workflow Runtime - One long-lived event loop for workflow executions
+Executions are scheduled onto a loop running on a dedicated thread rather
+than each getting its own asyncio.run() loop, so any number of them can be
+in flight at once without per-execution loop setup and teardown
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Coroutine, Dict, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class WorkflowRuntime:
+    """Event loop thread that runs coroutines submitted from any thread
+
+    submit() is thread-safe and returns a concurrent.futures.Future, which
+    callers can wait on, add callbacks to, or ignore. Blocking work inside
+    an execution must go to an executor (loop.run_in_executor(None, ...))
+    since it would stall every other execution on the loop; the loop's
+    default executor has blocking_workers threads for it.
+    """
+
+    def __init__(self, name: str = "workflow-runtime", blocking_workers: Optional[int] = None):
+        self.name = name
+        self.blocking_workers = blocking_workers or int(os.getenv("WORKFLOW_BLOCKING_WORKERS", "32"))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The runtime's event loop, started on first use"""
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    self._start()
+        return self._loop
+
+    def _start(self):
+        """Start the loop thread and wait until the loop runs (lock held)"""
+        loop = asyncio.new_event_loop()
+        loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=self.blocking_workers, thread_name_prefix=f"{self.name}-blocking")
+        )
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(started.set)
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+        self._thread.start()
+        started.wait()
+        self._loop = loop
+        logger.info("Workflow runtime event loop started")
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Schedule a coroutine on the loop (from any thread), returns its future"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+        future.add_done_callback(self._done)
+        return future
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and wait for its result (not from the loop thread)"""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("WorkflowRuntime.run() would deadlock on its own loop thread")
+        return self.submit(coro).result(timeout)
+
+    def _done(self, future: Future):
+        """Count a finished coroutine"""
+        with self._lock:
+            self.in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def shutdown(self, timeout: float = 5.0):
+        """Cancel what is still running and stop the loop"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+            thread, self._thread = self._thread, None
+        if loop is None:
+            return
+
+        async def cancel_all():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await loop.shutdown_asyncgens()
+            await loop.shutdown_default_executor()
+
+        try:
+            asyncio.run_coroutine_threadsafe(cancel_all(), loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"Workflow runtime didn't wind down cleanly: {str(e)}")
+        loop.call_soon_threadsafe(loop.stop)
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout)
+        loop.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get runtime statistics"""
+        with self._lock:
+            return {
+                "running": self._loop is not None,
+                "blocking_workers": self.blocking_workers,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "in_flight": self.in_flight
+            }
+
+
+_runtime: Optional[WorkflowRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_workflow_runtime() -> WorkflowRuntime:
+    """Get the shared process-wide workflow runtime"""
+    global _runtime
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                _runtime = WorkflowRuntime()
+    return _runtime
+
+
+def shutdown_workflow_runtime():
+    """Shut down the shared workflow runtime (call on shutdown)"""
+    global _runtime
+    with _runtime_lock:
+        runtime, _runtime = _runtime, None
+    if runtime:
+        runtime.shutdown()
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    runtime = WorkflowRuntime()
+
+    async def execution(i: int) -> int:
+        await asyncio.sleep(0.5)
+        return i
+
+    start = time.perf_counter()
+    futures = [runtime.submit(execution(i)) for i in range(5000)]
+    print(f"Submitted 5000 executions, in flight: {runtime.get_stats()['in_flight']}")
+    total = sum(future.result() for future in futures)
+    print(f"All done in {time.perf_counter() - start:.2f}s (sum {total})")
+    print(f"Stats: {runtime.get_stats()}")
+    runtime.shutdown()
@@ -0,0 +1,271 @@
+"""
+Workflow Scheduler - Process-wide timer heap for scheduled workflows
+Every engine's scheduled workflows share one heap of next-fire times and
+one thread that sleeps until the earliest is due; due workflows are
+started by a small worker pool and run concurrently, bounded by each
+engine's admission limits, instead of one after another
+"""
+
+import os
+import heapq
+import logging
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from croniter import croniter
+    CRONITER_AVAILABLE = True
+except ImportError:
+    CRONITER_AVAILABLE = False
+    croniter = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def next_run_time(schedule: Optional[Dict[str, Any]], last_run: Optional[datetime]) -> Optional[datetime]:
+    """When a schedule next fires after last_run (None if it never does)
+
+    Schedules are {"type": "interval", "interval": minutes}, {"type":
+    "hourly"}, {"type": "daily", "time": "HH:MM"} (midnight without time)
+    or {"type": "cron", "expression": "*/15 * * * *"}. A workflow that
+    never ran is due now, except cron schedules, which wait for their next
+    matching time.
+    """
+    schedule = schedule or {}
+    schedule_type = schedule.get("type")
+
+    if schedule_type == "cron":
+        if not CRONITER_AVAILABLE:
+            raise ValueError("Cron schedules need croniter (pip install croniter)")
+        return croniter(schedule["expression"], last_run or datetime.now()).get_next(datetime)
+
+    if not last_run:
+        return datetime.now()
+    if schedule_type == "interval":
+        return last_run + timedelta(minutes=schedule.get("interval", 60))
+    elif schedule_type == "hourly":
+        return last_run + timedelta(hours=1)
+    elif schedule_type == "daily":
+        at = datetime.strptime(schedule["time"], "%H:%M").time() if schedule.get("time") else datetime.min.time()
+        return datetime.combine(last_run.date() + timedelta(days=1), at)
+    return None
+
+
+class WorkflowScheduler:
+    """Min-heap of (due time, workflow) across all workflow engines
+
+    Firing a workflow costs O(log n) for n scheduled workflows, and the
+    thread sleeps until the next due time rather than polling, so runs
+    start within milliseconds of being due. A workflow isn't fired again
+    while its previous run is in flight; its next due time is computed from
+    its last_run once that run finishes. Replaced and removed entries stay
+    in the heap until popped (or a compaction) and are skipped.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("WORKFLOW_SCHEDULER_WORKERS", "8"))
+        self._heap: List[Tuple[float, int, Tuple[Any, str]]] = []
+        self._entries: Dict[Tuple[Any, str], int] = {}  # (engine, workflow_id) -> seq of its live heap entry
+        self._in_flight: Dict[Tuple[Any, str], int] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="workflow-scheduler")
+        self._thread: Optional[threading.Thread] = None
+        self.running = False
+
+        # Statistics
+        self.fired = 0
+        self.failed = 0
+        self.max_lag = 0.0
+
+    def schedule(self, engine, workflow):
+        """Add or replace a scheduled workflow of an engine"""
+        key = (engine, workflow.workflow_id)
+        due = next_run_time(workflow.trigger_config.get("schedule"), workflow.last_run) if workflow.enabled else None
+        with self._cond:
+            if due is None:
+                self._entries.pop(key, None)
+                return
+            self._push(key, due.timestamp())
+            self._ensure_running()
+
+    def unschedule(self, engine, workflow_id: str):
+        """Remove a workflow from the schedule (a run in flight finishes)"""
+        with self._cond:
+            self._entries.pop((engine, workflow_id), None)
+            self._in_flight.pop((engine, workflow_id), None)
+
+    def remove_engine(self, engine):
+        """Remove all of an engine's workflows"""
+        with self._cond:
+            for key in [key for key in self._entries if key[0] is engine]:
+                del self._entries[key]
+            for key in [key for key in self._in_flight if key[0] is engine]:
+                del self._in_flight[key]
+
+    def _push(self, key: Tuple[Any, str], due_at: float):
+        """Push a heap entry superseding the key's previous one (lock held)"""
+        seq = next(self._seq)
+        self._entries[key] = seq
+        heapq.heappush(self._heap, (due_at, seq, key))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [entry for entry in self._heap if self._entries.get(entry[2]) == entry[1]]
+            heapq.heapify(self._heap)
+        # A new earliest entry shortens the current sleep
+        if self._heap[0][1] == seq:
+            self._cond.notify()
+
+    def _ensure_running(self):
+        """Start the scheduler thread on first use (lock held)"""
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="workflow-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Workflow scheduler started with {self.max_workers} workers")
+
+    def _run(self):
+        """Pop due entries and fire them, sleeping until the next is due"""
+        with self._cond:
+            while self.running:
+                now = datetime.now().timestamp()
+                while self._heap and self._heap[0][0] <= now:
+                    due_at, seq, key = heapq.heappop(self._heap)
+                    if self._entries.get(key) != seq:
+                        continue  # Replaced or removed
+                    del self._entries[key]
+                    self._in_flight[key] = seq
+                    self.fired += 1
+                    self.max_lag = max(self.max_lag, now - due_at)
+                    self._executor.submit(self._fire, key, seq)
+
+                timeout = self._heap[0][0] - now if self._heap else None
+                self._cond.wait(timeout)
+
+    def _fire(self, key: Tuple[Any, str], seq: int):
+        """Start a due workflow; its next run is scheduled once it finishes"""
+        engine, workflow_id = key
+        fired_at = datetime.now()
+        try:
+            # Workers only start runs; the execution itself (including time
+            # queued for admission) doesn't hold one, so one tenant's long
+            # runs can't delay other tenants' due workflows
+            future = engine.trigger_workflow(workflow_id)
+        except Exception as e:
+            self._finished(key, seq, fired_at, e)
+            return
+        future.add_done_callback(
+            lambda future: self._finished(key, seq, fired_at, None if future.cancelled() else future.exception())
+        )
+
+    def _finished(self, key: Tuple[Any, str], seq: int, fired_at: datetime, error: Optional[BaseException]):
+        """Schedule a workflow's next run after its run finished"""
+        engine, workflow_id = key
+        if error is not None:
+            self.failed += 1
+            logger.error(f"Error running scheduled workflow {workflow_id}: {str(error)}")
+
+        with self._cond:
+            if self._in_flight.get(key) != seq:
+                return  # Unscheduled meanwhile
+            del self._in_flight[key]
+            if key in self._entries:
+                return  # Re-registered meanwhile
+
+            workflow = engine.workflows.get(workflow_id)
+            if not workflow or not workflow.enabled:
+                return
+            # A run that didn't start (e.g. at max_concurrent) counts as run now
+            last_run = workflow.last_run if workflow.last_run and workflow.last_run >= fired_at else fired_at
+            try:
+                due = next_run_time(workflow.trigger_config.get("schedule"), last_run)
+            except Exception as e:
+                logger.error(f"Invalid schedule for workflow {workflow_id}: {str(e)}")
+                return
+            if due is not None:
+                self._push(key, due.timestamp())
+
+    def shutdown(self, wait: bool = True):
+        """Stop the thread; runs being started finish starting unless wait is False"""
+        with self._cond:
+            self.running = False
+            self._entries.clear()
+            self._in_flight.clear()
+            self._cond.notify()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._executor.shutdown(wait=wait)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler statistics"""
+        with self._cond:
+            return {
+                "scheduled": len(self._entries),
+                "in_flight": len(self._in_flight),
+                "heap_size": len(self._heap),
+                "workers": self.max_workers,
+                "fired": self.fired,
+                "failed": self.failed,
+                "max_lag_seconds": round(self.max_lag, 3)
+            }
+
+
+_scheduler: Optional[WorkflowScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_workflow_scheduler() -> WorkflowScheduler:
+    """Get the shared process-wide workflow scheduler"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = WorkflowScheduler()
+    return _scheduler
+
+
+def shutdown_workflow_scheduler(wait: bool = True):
+    """Shut down the shared workflow scheduler (call on shutdown)"""
+    global _scheduler
+    with _scheduler_lock:
+        scheduler, _scheduler = _scheduler, None
+    if scheduler:
+        scheduler.shutdown(wait=wait)
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+    from types import SimpleNamespace
+
+    class PrintEngine:
+        """Stands in for AutonomousWorkflowEngine"""
+        def __init__(self):
+            self.workflows = {}
+
+        def trigger_workflow(self, workflow_id: str) -> Future:
+            self.workflows[workflow_id].last_run = datetime.now()
+            print(f"{datetime.now():%H:%M:%S.%f} running {workflow_id}")
+            future = Future()
+            future.set_result(None)
+            return future
+
+    engine = PrintEngine()
+    scheduler = WorkflowScheduler(max_workers=2)
+    for workflow_id, schedule in [
+        ("every_second", {"type": "interval", "interval": 1 / 60}),
+        ("every_minute", {"type": "cron", "expression": "* * * * *"})
+    ]:
+        engine.workflows[workflow_id] = SimpleNamespace(
+            workflow_id=workflow_id, enabled=True, last_run=None, trigger_config={"schedule": schedule}
+        )
+        if schedule["type"] != "cron" or CRONITER_AVAILABLE:
+            scheduler.schedule(engine, engine.workflows[workflow_id])
+
+    time.sleep(3.5)
+    print(f"Stats: {scheduler.get_stats()}")
+    scheduler.shutdown()
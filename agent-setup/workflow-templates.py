@@ -0,0 +1,212 @@
+"""
+Workflow Templates - Compiled {{variable}} templates for workflow steps
+Step configs are compiled once into literal/variable parts, so resolving
+a template looks up only the variables it references instead of trying
+every context key against every string
+"""
+
+import re
+import logging
+from typing import Any, Callable, Dict, List, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+PLACEHOLDER = re.compile(r"\{\{([^{}]+)\}\}")
+
+MISSING = object()
+
+
+def compile_path(name: str) -> List[Tuple[str, List[str]]]:
+    """Ways to read a variable: the whole name as a context key, then each
+    shorter dotted prefix as a key with the rest as a path into its value"""
+    parts = name.split(".")
+    candidates = [(name, [])]
+    for i in range(len(parts) - 1, 0, -1):
+        candidates.append((".".join(parts[:i]), parts[i:]))
+    return candidates
+
+
+def lookup(context: Dict[str, Any], candidates: List[Tuple[str, List[str]]]) -> Any:
+    """Resolve a compiled variable against a context (MISSING if absent)"""
+    for key, path in candidates:
+        if key not in context:
+            continue
+        value = context[key]
+        for part in path:
+            if isinstance(value, dict) and part in value:
+                value = value[part]
+            elif isinstance(value, (list, tuple)) and part.isdigit() and int(part) < len(value):
+                value = value[int(part)]
+            else:
+                value = MISSING
+                break
+        if value is not MISSING:
+            return value
+    return MISSING
+
+
+class Template:
+    """A compiled template; render() costs O(placeholders)
+
+    Strings render to strings, with each {{name}} replaced by str() of its
+    value. name is a context key (which may itself contain dots, as
+    {{record.name}} does) or a dotted path into a context value, e.g.
+    {{step_get_quotation_result.data.data.0.name}}. Unknown variables are
+    left as they are. Dicts and lists render item by item; anything
+    without placeholders renders to itself.
+    """
+
+    __slots__ = ("source", "variables", "render")
+
+    def __init__(self, source: Any, variables: List[str], render: Callable[[Dict[str, Any]], Any]):
+        self.source = source
+        self.variables = variables
+        self.render = render
+
+    @property
+    def constant(self) -> bool:
+        return not self.variables
+
+
+def _constant(source: Any) -> Template:
+    """Template of a value without placeholders"""
+    return Template(source, [], lambda context: source)
+
+
+def _compile_string(source: str) -> Template:
+    """Compile a string into literal and variable parts"""
+    pieces = PLACEHOLDER.split(source)
+    if len(pieces) == 1:
+        return _constant(source)
+
+    # pieces alternates literal, variable name, literal, ...
+    literals = pieces[0::2]
+    names = pieces[1::2]
+    lookups = [compile_path(name) for name in names]
+    placeholders = [f"{{{{{name}}}}}" for name in names]
+
+    def render(context: Dict[str, Any]) -> str:
+        out = [literals[0]]
+        for i, candidates in enumerate(lookups):
+            value = lookup(context, candidates)
+            out.append(placeholders[i] if value is MISSING else str(value))
+            out.append(literals[i + 1])
+        return "".join(out)
+
+    return Template(source, list(dict.fromkeys(names)), render)
+
+
+class TemplateCache:
+    """Compiled templates of registered step configs
+
+    prepare() compiles a config and every dict, list and string inside it;
+    compile() then finds them by identity (containers) or value (strings).
+    Containers that weren't prepared are compiled on each call, without
+    being cached, so ad-hoc values can't grow the cache.
+    """
+
+    def __init__(self, max_strings: int = 10000):
+        self.max_strings = max_strings
+        self._strings: Dict[str, Template] = {}
+        self._containers: Dict[int, Template] = {}
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+    def prepare(self, template: Any) -> Template:
+        """Compile a config and cache every part of it"""
+        return self._compile(template, cache=True)
+
+    def forget(self, template: Any):
+        """Drop a prepared config (e.g. when its workflow is replaced)"""
+        if isinstance(template, dict):
+            for value in template.values():
+                self.forget(value)
+        elif isinstance(template, list):
+            for item in template:
+                self.forget(item)
+        else:
+            return
+        self._containers.pop(id(template), None)
+
+    def compile(self, template: Any) -> Template:
+        """Get the compiled form of a template"""
+        if isinstance(template, (dict, list)):
+            compiled = self._containers.get(id(template))
+            if compiled is not None and compiled.source is template:
+                self.hits += 1
+                return compiled
+            self.misses += 1
+            return self._compile(template, cache=False)
+        return self._compile(template, cache=True)
+
+    def render(self, template: Any, context: Dict[str, Any]) -> Any:
+        """Resolve a template against a context"""
+        return self.compile(template).render(context)
+
+    def _compile(self, template: Any, cache: bool) -> Template:
+        """Compile any template value"""
+        if isinstance(template, str):
+            compiled = self._strings.get(template)
+            if compiled is None:
+                compiled = _compile_string(template)
+                if len(self._strings) >= self.max_strings:
+                    self._strings.clear()
+                self._strings[template] = compiled
+            return compiled
+
+        if isinstance(template, dict):
+            items = [(key, self._compile(value, cache)) for key, value in template.items()]
+            compiled = self._container(template, items, lambda rendered: dict(rendered))
+        elif isinstance(template, list):
+            items = list(enumerate(self._compile(item, cache) for item in template))
+            compiled = self._container(template, items, lambda rendered: [value for _, value in rendered])
+        else:
+            return _constant(template)
+
+        if cache:
+            self._containers[id(template)] = compiled
+        return compiled
+
+    @staticmethod
+    def _container(source: Any, items: List[Tuple[Any, Template]], build: Callable) -> Template:
+        """Template of a dict or list from its compiled items"""
+        variables = list(dict.fromkeys(name for _, item in items for name in item.variables))
+        if not variables:
+            return _constant(source)
+
+        def render(context: Dict[str, Any]) -> Any:
+            return build((key, item.render(context)) for key, item in items)
+
+        return Template(source, variables, render)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            "strings": len(self._strings),
+            "containers": len(self._containers),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    cache = TemplateCache()
+    config = {
+        "resource_type": "Quotation",
+        "name": "{{step_get_quotation_result.data.data.0.name}}",
+        "data": {"status": "Replied", "notes": "Follow-up sent to {{customer_email}} on {{date}}"}
+    }
+    cache.prepare(config)
+
+    context = {
+        "customer_email": "buyer@example.com",
+        "step_get_quotation_result": {"success": True, "data": {"data": [{"name": "QTN-0001"}]}}
+    }
+    print(cache.render(config["name"], context))
+    print(cache.render(config["data"], context))
+    print(f"Variables: {cache.compile(config).variables}, stats: {cache.get_stats()}")
@@ -0,0 +1,205 @@
+"""
+Workflow Timers - Durable timers for suspended workflow executions
+An execution waiting at a long wait or retry step is saved to a timer
+table instead of holding a coroutine; the timer thread hands it back to
+the engine when it is due, including after a restart
+"""
+
+import json
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from platform_db import get_platform_db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class WorkflowTimerService:
+    """Timer table of suspended workflow executions, one row per execution
+
+    Rows are ordered by due time through an index, so the table is the
+    timer heap and nothing is held in memory while executions wait. A due
+    row is claimed by pushing its due time claim_seconds ahead (compare-
+    and-set on the old due time), so only one process resumes it, and an
+    execution whose resumer died becomes due again. complete() deletes the
+    row once the execution finishes; schedule() replaces it when the
+    execution suspends again.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "workflows.db",
+        poll_interval: float = 30.0,
+        claim_seconds: float = 600.0,
+        batch_size: int = 100
+    ):
+        self.db = get_platform_db(db_path)
+        self.poll_interval = poll_interval
+        self.claim_seconds = claim_seconds
+        self.batch_size = batch_size
+        self._on_due: Optional[Callable[[Dict[str, Any]], None]] = None
+        self._cond = threading.Condition()
+        self._woken = False
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        # Statistics
+        self.scheduled = 0
+        self.fired = 0
+        self.completed = 0
+
+        self._init_timer_table()
+
+    def _init_timer_table(self):
+        """Create the timer table"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS workflow_timers (
+                    execution_id VARCHAR(100) PRIMARY KEY,
+                    workflow_id VARCHAR(50) NOT NULL,
+                    due_at REAL NOT NULL,
+                    state TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_workflow_timers_due ON workflow_timers(due_at)")
+
+    def schedule(self, execution_id: str, workflow_id: str, due_at: float, state: Dict[str, Any]):
+        """Save a suspended execution to resume at due_at (epoch seconds)"""
+        with self.db.connection() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO workflow_timers (execution_id, workflow_id, due_at, state)
+                VALUES (?, ?, ?, ?)
+            """, (execution_id, workflow_id, due_at, json.dumps(state, default=str)))
+        self.scheduled += 1
+        self._wake()
+
+    def complete(self, execution_id: str) -> bool:
+        """Delete an execution's timer"""
+        with self.db.connection() as conn:
+            deleted = conn.execute(
+                "DELETE FROM workflow_timers WHERE execution_id = ?", (execution_id,)
+            ).rowcount
+        if deleted:
+            self.completed += 1
+        return bool(deleted)
+
+    def claim_due(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Claim up to batch_size due timers"""
+        now = now if now is not None else time.time()
+        claimed = []
+        with self.db.connection() as conn:
+            rows = conn.execute("""
+                SELECT execution_id, workflow_id, due_at, state FROM workflow_timers
+                WHERE due_at <= ? ORDER BY due_at LIMIT ?
+            """, (now, self.batch_size)).fetchall()
+
+            for row in rows:
+                updated = conn.execute("""
+                    UPDATE workflow_timers SET due_at = ?
+                    WHERE execution_id = ? AND due_at = ?
+                """, (now + self.claim_seconds, row["execution_id"], row["due_at"])).rowcount
+                if updated:
+                    claimed.append({
+                        "execution_id": row["execution_id"],
+                        "workflow_id": row["workflow_id"],
+                        "due_at": row["due_at"],
+                        "state": json.loads(row["state"])
+                    })
+        return claimed
+
+    def next_due(self) -> Optional[float]:
+        """Get the earliest due time (None if no execution is suspended)"""
+        with self.db.connection() as conn:
+            row = conn.execute("SELECT MIN(due_at) FROM workflow_timers").fetchone()
+        return row[0] if row else None
+
+    def pending(self) -> int:
+        """Number of suspended executions"""
+        with self.db.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM workflow_timers").fetchone()[0]
+
+    def start(self, on_due: Callable[[Dict[str, Any]], None]):
+        """Start the timer thread, calling on_due(timer) for each due timer"""
+        with self._cond:
+            self._on_due = on_due
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="workflow-timers", daemon=True)
+            self._thread.start()
+        logger.info("Workflow timer service started")
+
+    def stop(self):
+        """Stop the timer thread; suspended executions stay in the table"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _wake(self):
+        """Re-check the table now (a new timer may be due sooner)"""
+        with self._cond:
+            self._woken = True
+            self._cond.notify()
+
+    def _run(self):
+        """Fire due timers, then sleep until the next one (or the poll interval)"""
+        while self._running:
+            try:
+                for timer in self.claim_due():
+                    self.fired += 1
+                    try:
+                        self._on_due(timer)
+                    except Exception as e:
+                        logger.error(f"Error resuming execution {timer['execution_id']}: {str(e)}")
+                next_due = self.next_due()
+            except Exception as e:
+                logger.error(f"Error in workflow timer loop: {str(e)}")
+                next_due = None
+
+            # Other processes may add timers too, so never sleep past the poll interval
+            delay = self.poll_interval
+            if next_due is not None:
+                delay = max(0.0, min(delay, next_due - time.time()))
+            with self._cond:
+                if self._running and not self._woken:
+                    self._cond.wait(delay)
+                self._woken = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get timer statistics"""
+        return {
+            "pending": self.pending(),
+            "next_due": self.next_due(),
+            "scheduled": self.scheduled,
+            "fired": self.fired,
+            "completed": self.completed
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    timers = WorkflowTimerService(os.path.join(tempfile.mkdtemp(), "timers.db"), poll_interval=1.0)
+    fired = threading.Event()
+
+    def resume(timer):
+        print(f"Resuming {timer['execution_id']} at step {timer['state']['step']}")
+        timers.complete(timer["execution_id"])
+        fired.set()
+
+    timers.start(resume)
+    timers.schedule("follow_up_1", "follow_up", time.time() + 0.5, {"step": "wait_3_days"})
+    print(f"Stats: {timers.get_stats()}")
+    fired.wait(5)
+    timers.stop()
+    print(f"Stats: {timers.get_stats()}")
@@ -0,0 +1 @@
+workflow-admission.py
\ No newline at end of file
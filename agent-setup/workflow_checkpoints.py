@@ -0,0 +1 @@
+workflow-checkpoints.py
\ No newline at end of file
@@ -0,0 +1 @@
+workflow-conditions.py
\ No newline at end of file
@@ -0,0 +1 @@
+workflow-dag.py
\ No newline at end of file
@@ -0,0 +1 @@
+workflow-runtime.py
\ No newline at end of file
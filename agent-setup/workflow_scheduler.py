@@ -0,0 +1 @@
+workflow-scheduler.py
\ No newline at end of file
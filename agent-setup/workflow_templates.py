@@ -0,0 +1 @@
+workflow-templates.py
\ No newline at end of file
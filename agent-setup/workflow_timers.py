@@ -0,0 +1 @@
+workflow-timers.py
\ No newline at end of file